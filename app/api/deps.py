@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status, Request
+from fastapi import Depends, HTTPException, Query, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from typing import Optional
@@ -9,15 +9,19 @@ from app.models.user import User
 security = HTTPBearer()
 security_optional = HTTPBearer(auto_error=False)
 
+# Назначение короткоживущего токена живой ленты (передаётся в URL)
+LIVE_FEED_SCOPE = "live_feed"
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    token = credentials.credentials
+
+def user_from_token(token: str, db: Session, scope: Optional[str] = None) -> User:
+    """
+    Пользователь по JWT. Токен с назначением (scope) принимается только
+    там, где ждут именно это назначение, — токен из URL ленты не открывает
+    остальной API.
+    """
     payload = decode_token(token)
     
-    if payload is None:
+    if payload is None or payload.get("scope") != scope:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Невалидный токен"
@@ -46,6 +50,13 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    return user_from_token(credentials.credentials, db)
+
+
 async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security_optional),
     db: Session = Depends(get_db)
@@ -60,7 +71,7 @@ async def get_current_user_optional(
     token = credentials.credentials
     payload = decode_token(token)
     
-    if payload is None:
+    if payload is None or payload.get("scope"):
         return None
     
     user_id = payload.get("sub")
@@ -85,6 +96,28 @@ async def get_current_business_user(
     return current_user
 
 
+async def get_live_feed_business_user(
+    token: Optional[str] = Query(None, description="Токен ленты из POST /business/bookings/live/token"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security_optional),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Бизнес-пользователь живой ленты: EventSource в браузере не умеет
+    передавать заголовок Authorization, поэтому принимается и
+    короткоживущий токен ленты в query string.
+    """
+    if token:
+        current_user = user_from_token(token, db, scope=LIVE_FEED_SCOPE)
+    elif credentials:
+        current_user = user_from_token(credentials.credentials, db)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Не авторизован"
+        )
+    return await get_current_business_user(current_user)
+
+
 async def get_current_customer_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -3,23 +3,34 @@
 API эндпоинты для управления бронированиями (CRM - для бизнеса)
 С мультитенантностью — каждый бизнес видит только свои бронирования
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, desc, or_
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from sqlalchemy import func
 from typing import Optional, List
-from datetime import datetime, date
+from datetime import datetime, date, time, timedelta
 
 from app.core.database import get_db
-from app.api.deps import get_current_business_user
+from app.api.deps import get_current_business_user, get_live_feed_business_user, LIVE_FEED_SCOPE
+from app.core.security import create_access_token
 from app.models.user import User
-from app.models.booking import Booking, BookingResource
+from app.models.booking import Booking, BookingResource, WaitlistEntry
 from app.models.tour import Tour, TourSchedule
 from app.models.resource import Resource
 from app.schemas.booking_schemas import (
-    BookingCreate, BookingCreateCRM, BookingUpdate, BookingStatusUpdate,
-    BookingResponse, BookingListResponse, BookingResourceResponse
+    BookingCreate, BookingCreateCRM, BookingBulkCreate, BookingUpdate, BookingStatusUpdate,
+    BookingBulkStatusUpdate, BookingResponse, WaitlistEntryResponse, BookingListResponse, BookingResourceResponse
 )
 from app.services.booking_service import BookingService
+from app.services.booking_events import BookingEvents
+from app.services.pagination import fetch_page, count_total, total_pages
+from app.services.booking_search import BookingSearch
+from app.services import booking_export
+from app.services.metrics_rollup import MetricsRollup, STATUSES, REVENUE_STATUSES
+from app.services.live_feed import BookingFeed, fetch_backlog, format_sse
+from app.core.config import settings
 
 router = APIRouter(prefix="/business/bookings", tags=["CRM Bookings"])
 
@@ -38,74 +49,109 @@ def get_business_booking_query(db: Session, business_id: int):
 
 def booking_to_response(booking: Booking, db: Session) -> dict:
     """Преобразование модели в response с дополнительными данными"""
-    data = {
-        'id': booking.id,
-        'booking_code': booking.booking_code,
-        'booking_type': booking.booking_type,
-        'tour_schedule_id': booking.tour_schedule_id,
-        'activity_schedule_id': booking.activity_schedule_id,
-        'customer_id': booking.customer_id,
-        'customer_name': booking.customer_name,
-        'customer_phone': booking.customer_phone,
-        'customer_email': booking.customer_email,
-        'participants_count': booking.participants_count,
-        'total_price': booking.total_price,
-        'currency': booking.currency or 'RUB',
-        'status': booking.status,
-        'notes': booking.notes,
-        'created_at': booking.created_at,
-        'confirmed_at': booking.confirmed_at,
-        'paid_at': booking.paid_at,
-        'cancelled_at': booking.cancelled_at,
-        'booking_resources': []
-    }
-    
-    # Добавляем данные о туре и расписании
-    if booking.tour_schedule_id:
-        schedule = db.query(TourSchedule).filter(
-            TourSchedule.id == booking.tour_schedule_id
-        ).first()
+    return bookings_to_response([booking], db)[0]
+
+
+def bookings_to_response(bookings: List[Booking], db: Session) -> List[dict]:
+    """
+    Преобразование списка бронирований в response.
+    Слоты, туры и ресурсы загружаются для всей страницы сразу —
+    два запроса независимо от числа бронирований.
+    """
+    booking_ids = [b.id for b in bookings]
+    schedule_ids = {b.tour_schedule_id for b in bookings if b.tour_schedule_id}
+    
+    # Слоты и туры
+    schedules = {}
+    if schedule_ids:
+        rows = db.query(TourSchedule, Tour).outerjoin(
+            Tour, Tour.id == TourSchedule.tour_id
+        ).filter(TourSchedule.id.in_(schedule_ids)).all()
+        schedules = {schedule.id: (schedule, tour) for schedule, tour in rows}
+    
+    # Ресурсы бронирований с названиями
+    resources_by_booking = {booking_id: [] for booking_id in booking_ids}
+    if booking_ids:
+        rows = db.query(BookingResource, Resource.name).outerjoin(
+            Resource, Resource.id == BookingResource.resource_id
+        ).filter(
+            BookingResource.booking_id.in_(booking_ids)
+        ).order_by(BookingResource.id).all()
+        for br, resource_name in rows:
+            resources_by_booking[br.booking_id].append({
+                'id': br.id,
+                'resource_id': br.resource_id,
+                'resource_name': resource_name,
+                'quantity': br.quantity,
+                'price_per_unit': br.price_per_unit
+            })
+    
+    items = []
+    for booking in bookings:
+        data = {
+            'id': booking.id,
+            'booking_code': booking.booking_code,
+            'booking_type': booking.booking_type,
+            'tour_schedule_id': booking.tour_schedule_id,
+            'activity_schedule_id': booking.activity_schedule_id,
+            'customer_id': booking.customer_id,
+            'customer_name': booking.customer_name,
+            'customer_phone': booking.customer_phone,
+            'customer_email': booking.customer_email,
+            'participants_count': booking.participants_count,
+            'total_price': booking.total_price,
+            'currency': booking.currency or 'RUB',
+            'status': booking.status,
+            'notes': booking.notes,
+            'created_at': booking.created_at,
+            'confirmed_at': booking.confirmed_at,
+            'paid_at': booking.paid_at,
+            'cancelled_at': booking.cancelled_at,
+            'booking_resources': resources_by_booking.get(booking.id, [])
+        }
+        
+        # Добавляем данные о туре и расписании
+        schedule, tour = schedules.get(booking.tour_schedule_id, (None, None))
         if schedule:
             data['schedule_date'] = str(schedule.date)
             data['schedule_time'] = f"{schedule.start_time} - {schedule.end_time}"
-            
-            tour = db.query(Tour).filter(Tour.id == schedule.tour_id).first()
             if tour:
                 data['tour_name'] = tour.name
+        
+        items.append(data)
     
-    # Добавляем ресурсы
-    for br in booking.booking_resources:
-        resource = db.query(Resource).filter(Resource.id == br.resource_id).first()
-        data['booking_resources'].append({
-            'id': br.id,
-            'resource_id': br.resource_id,
-            'resource_name': resource.name if resource else None,
-            'quantity': br.quantity,
-            'price_per_unit': br.price_per_unit
-        })
-    
-    return data
+    return items
 
 
-@router.get("/", response_model=None)
-async def get_bookings(
-    status: Optional[str] = Query(None, description="Фильтр по статусу"),
-    tour_id: Optional[int] = Query(None, description="Фильтр по туру"),
-    date_from: Optional[date] = Query(None, description="Дата от"),
-    date_to: Optional[date] = Query(None, description="Дата до"),
-    search: Optional[str] = Query(None, description="Поиск по имени/телефону/коду"),
-    page: int = Query(1, ge=1),
-    per_page: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_business_user)
+SERIES_PERIODS = {'day': timedelta(days=1), 'week': timedelta(weeks=1), 'month': None}
+
+
+def _created_between(query, date_from: Optional[date], date_to: Optional[date]):
+    """Фильтр по дате создания (диапазоном по created_at — без func.date, индекс работает)"""
+    if date_from:
+        query = query.filter(Booking.created_at >= datetime.combine(date_from, time.min))
+    if date_to:
+        query = query.filter(Booking.created_at < datetime.combine(date_to + timedelta(days=1), time.min))
+    return query
+
+
+def filter_business_bookings(
+    db: Session,
+    business_id: int,
+    status: Optional[str] = None,
+    tour_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    search: Optional[str] = None
 ):
-    """Получение списка бронирований с фильтрами (только для своего бизнеса)"""
-    business_id = current_user.business_profile.id
+    """
+    Бронирования бизнеса с фильтрами списка (общие для списка и экспорта)
     
+    Returns:
+        (запрос, выражение ранга поиска или None)
+    """
     # Базовый запрос с фильтрацией по бизнесу
-    query = get_business_booking_query(db, business_id).options(
-        joinedload(Booking.booking_resources)
-    )
+    query = get_business_booking_query(db, business_id)
     
     # Фильтры
     if status:
@@ -125,98 +171,332 @@ async def get_bookings(
         ).subquery()
         query = query.filter(Booking.tour_schedule_id.in_(schedule_ids))
     
-    if date_from:
-        query = query.filter(func.date(Booking.created_at) >= date_from)
-    
-    if date_to:
-        query = query.filter(func.date(Booking.created_at) <= date_to)
+    query = _created_between(query, date_from, date_to)
     
+    rank = None
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(or_(
-            Booking.booking_code.ilike(search_term),
-            Booking.customer_name.ilike(search_term),
-            Booking.customer_phone.ilike(search_term),
-            Booking.customer_email.ilike(search_term)
-        ))
+        query, rank = BookingSearch.apply(query, search)
+    
+    return query, rank
+
+
+@router.get("/", response_model=None)
+async def get_bookings(
+    status: Optional[str] = Query(None, description="Фильтр по статусу"),
+    tour_id: Optional[int] = Query(None, description="Фильтр по туру"),
+    date_from: Optional[date] = Query(None, description="Дата от"),
+    date_to: Optional[date] = Query(None, description="Дата до"),
+    search: Optional[str] = Query(None, description="Поиск по имени/телефону/email/коду"),
+    page: int = Query(1, ge=1),
+    per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor), вместо page"),
+    count: str = Query('exact', pattern="^(exact|estimated|none)$", description="Подсчёт total: точный, оценка или без подсчёта"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """
+    Получение списка бронирований с фильтрами (только для своего бизнеса).
+    
+    Для глубоких страниц используйте cursor из next_cursor предыдущего ответа.
+    """
+    business_id = current_user.business_profile.id
+    
+    query, rank = filter_business_bookings(
+        db, business_id, status=status, tour_id=tour_id,
+        date_from=date_from, date_to=date_to, search=search
+    )
     
     # Подсчёт
-    total = query.count()
+    total = count_total(query, count)
+    
+    # Поиск без курсора — сначала самые точные совпадения
+    ranked = rank is not None and not cursor
+    if ranked:
+        query = query.order_by(rank)
     
     # Пагинация
-    bookings = query.order_by(desc(Booking.created_at)).offset(
-        (page - 1) * per_page
-    ).limit(per_page).all()
+    try:
+        bookings, next_cursor = fetch_page(
+            query, Booking.created_at, Booking.id, per_page, cursor=cursor, page=page
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if ranked:
+        # Порядок по рангу несовместим с курсором по (created_at, id)
+        next_cursor = None
     
     # Формируем ответ
-    items = [booking_to_response(b, db) for b in bookings]
+    items = bookings_to_response(bookings, db)
     
     return {
         'items': items,
         'total': total,
         'page': page,
         'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page
+        'pages': total_pages(total, per_page),
+        'next_cursor': next_cursor
     }
 
 
+@router.get("/export")
+async def export_bookings(
+    format: str = Query('csv', pattern="^(csv|xlsx)$", description="csv или xlsx"),
+    status: Optional[str] = Query(None, description="Фильтр по статусу"),
+    tour_id: Optional[int] = Query(None, description="Фильтр по туру"),
+    date_from: Optional[date] = Query(None, description="Дата от"),
+    date_to: Optional[date] = Query(None, description="Дата до"),
+    search: Optional[str] = Query(None, description="Поиск по имени/телефону/email/коду"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """Выгрузка всех бронирований по фильтрам списка (потоковая)"""
+    business_id = current_user.business_profile.id
+    
+    if format == 'xlsx' and not booking_export.xlsx_available():
+        raise HTTPException(status_code=501, detail="Выгрузка в XLSX недоступна: не установлен xlsxwriter")
+    
+    filters = dict(status=status, tour_id=tour_id, date_from=date_from, date_to=date_to, search=search)
+    # Проверка фильтров (тур бизнеса) — до начала ответа, пока можно вернуть 404
+    filter_business_bookings(db, business_id, **filters)
+    
+    def build_query(session: Session):
+        return filter_business_bookings(session, business_id, **filters)[0]
+    
+    filename = f"bookings_{date.today():%Y%m%d}.{format}"
+    if format == 'xlsx':
+        content = booking_export.stream_xlsx(build_query)
+        media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        content = booking_export.stream_csv(build_query)
+        media_type = 'text/csv; charset=utf-8'
+    
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
 @router.get("/stats")
 async def get_bookings_stats(
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
+    source: str = Query('live', pattern="^(live|rollup)$", description="live — по бронированиям, rollup — по дневным итогам"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_business_user)
 ):
-    """Статистика по бронированиям (только для своего бизнеса)"""
+    """
+    Статистика по бронированиям (только для своего бизнеса) — одним запросом.
+    source=rollup читает дневные итоги (быстро, отставание — до минуты).
+    """
     business_id = current_user.business_profile.id
     
-    # Базовый запрос с фильтрацией по бизнесу
-    query = get_business_booking_query(db, business_id)
+    if source == 'rollup':
+        return MetricsRollup.totals(db, business_id, date_from, date_to)
     
-    if date_from:
-        query = query.filter(func.date(Booking.created_at) >= date_from)
-    if date_to:
-        query = query.filter(func.date(Booking.created_at) <= date_to)
-    
-    total = query.count()
-    pending = query.filter(Booking.status == 'pending').count()
-    confirmed = query.filter(Booking.status == 'confirmed').count()
-    paid = query.filter(Booking.status == 'paid').count()
-    cancelled = query.filter(Booking.status == 'cancelled').count()
-    completed = query.filter(Booking.status == 'completed').count()
-    
-    # Выручка — только для своего бизнеса
-    revenue_query = get_business_booking_query(db, business_id).filter(
-        Booking.status.in_(['confirmed', 'paid', 'completed'])
-    )
-    if date_from:
-        revenue_query = revenue_query.filter(func.date(Booking.created_at) >= date_from)
-    if date_to:
-        revenue_query = revenue_query.filter(func.date(Booking.created_at) <= date_to)
+    is_revenue = Booking.status.in_(REVENUE_STATUSES)
     
-    # Получаем суммы
-    total_revenue = db.query(func.sum(Booking.total_price)).filter(
-        Booking.id.in_(revenue_query.with_entities(Booking.id))
-    ).scalar() or 0
+    query = get_business_booking_query(db, business_id).with_entities(
+        func.count(Booking.id),
+        *[func.count(Booking.id).filter(Booking.status == s) for s in STATUSES],
+        func.coalesce(func.sum(Booking.total_price).filter(is_revenue), 0),
+        func.coalesce(func.sum(Booking.participants_count).filter(is_revenue), 0)
+    )
+    row = _created_between(query, date_from, date_to).one()
     
-    total_participants = db.query(func.sum(Booking.participants_count)).filter(
-        Booking.id.in_(revenue_query.with_entities(Booking.id))
-    ).scalar() or 0
+    total, by_status, total_revenue, total_participants = row[0], row[1:6], row[6], row[7]
     
     return {
         'total': total,
-        'by_status': {
-            'pending': pending,
-            'confirmed': confirmed,
-            'paid': paid,
-            'cancelled': cancelled,
-            'completed': completed
-        },
+        'by_status': dict(zip(STATUSES, by_status)),
         'total_revenue': float(total_revenue),
         'total_participants': total_participants
     }
 
 
+def _series_buckets(period: str, date_from: date, date_to: date) -> List[date]:
+    """Начала всех интервалов в диапазоне (чтобы пустые дни/недели/месяцы были нулями)"""
+    if period == 'week':
+        current = date_from - timedelta(days=date_from.weekday())
+    elif period == 'month':
+        current = date_from.replace(day=1)
+    else:
+        current = date_from
+    
+    buckets = []
+    while current <= date_to:
+        buckets.append(current)
+        if period == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += SERIES_PERIODS[period]
+    return buckets
+
+
+@router.get("/stats/series")
+async def get_bookings_stats_series(
+    period: str = Query('day', pattern="^(day|week|month)$", description="Интервал: day, week, month"),
+    date_from: Optional[date] = Query(None, description="По умолчанию — 30 дней назад"),
+    date_to: Optional[date] = Query(None, description="По умолчанию — сегодня"),
+    source: str = Query('live', pattern="^(live|rollup)$", description="live — по бронированиям, rollup — по дневным итогам"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """
+    Динамика бронирований для графиков: количество, отмены, выручка
+    и участники по дням/неделям/месяцам (по дате создания бронирования)
+    """
+    business_id = current_user.business_profile.id
+    
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=30)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from позже date_to")
+    if (date_to - date_from).days > 366 * 3:
+        raise HTTPException(status_code=400, detail="Слишком большой период (максимум 3 года)")
+    
+    if source == 'rollup':
+        by_bucket = MetricsRollup.series(db, business_id, period, date_from, date_to)
+    else:
+        is_revenue = Booking.status.in_(REVENUE_STATUSES)
+        bucket = func.date_trunc(period, Booking.created_at).label('bucket')
+        
+        query = get_business_booking_query(db, business_id).with_entities(
+            bucket,
+            func.count(Booking.id),
+            func.count(Booking.id).filter(Booking.status == 'cancelled'),
+            func.coalesce(func.sum(Booking.total_price).filter(is_revenue), 0),
+            func.coalesce(func.sum(Booking.participants_count).filter(is_revenue), 0)
+        )
+        rows = _created_between(query, date_from, date_to).group_by(bucket).all()
+        by_bucket = {row[0].date(): row[1:] for row in rows}
+    
+    items = []
+    for start in _series_buckets(period, date_from, date_to):
+        bookings, cancelled, revenue, participants = by_bucket.get(start, (0, 0, 0, 0))
+        items.append({
+            'bucket': str(start),
+            'bookings': bookings,
+            'cancelled': cancelled,
+            'revenue': float(revenue),
+            'participants': participants
+        })
+    
+    return {
+        'period': period,
+        'date_from': str(date_from),
+        'date_to': str(date_to),
+        'items': items
+    }
+
+
+@router.get("/waitlist", response_model=List[WaitlistEntryResponse])
+async def get_waitlist(
+    tour_schedule_id: Optional[int] = None,
+    status: Optional[str] = Query('waiting', description="waiting, promoted, cancelled, expired"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """Лист ожидания по слотам бизнеса (в порядке очереди)"""
+    business_id = current_user.business_profile.id
+    
+    query = db.query(WaitlistEntry).join(
+        TourSchedule, TourSchedule.id == WaitlistEntry.tour_schedule_id
+    ).join(
+        Tour, Tour.id == TourSchedule.tour_id
+    ).filter(Tour.business_id == business_id)
+    
+    if tour_schedule_id:
+        query = query.filter(WaitlistEntry.tour_schedule_id == tour_schedule_id)
+    if status:
+        query = query.filter(WaitlistEntry.status == status)
+    
+    return query.order_by(WaitlistEntry.tour_schedule_id, WaitlistEntry.id).all()
+
+
+@router.post("/live/token")
+async def bookings_live_feed_token(
+    current_user: User = Depends(get_current_business_user)
+):
+    """
+    Короткоживущий токен живой ленты для EventSource:
+    new EventSource('/business/bookings/live?token=...').
+    Токен действует только для ленты; по истечении (ошибка 401 при
+    переподключении) клиент запрашивает новый и открывает ленту с last_event_id.
+    """
+    return {
+        'token': create_access_token(
+            data={'sub': str(current_user.id), 'scope': LIVE_FEED_SCOPE},
+            expires_delta=timedelta(seconds=settings.LIVE_FEED_TOKEN_SECONDS)
+        ),
+        'expires_in': settings.LIVE_FEED_TOKEN_SECONDS
+    }
+
+
+@router.get("/live")
+async def bookings_live_feed(
+    request: Request,
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+    since_id: Optional[int] = Query(None, alias="last_event_id", description="Последнее полученное событие (при открытии ленты заново)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_live_feed_business_user)
+):
+    """
+    Живая лента событий бронирований бизнеса (Server-Sent Events).
+    
+    Авторизация: заголовок Authorization или token из POST /live/token
+    (браузерный EventSource заголовков не передаёт).
+    
+    События: created, confirmed, paid, completed, cancelled, updated,
+    deleted, waitlist_promoted. При переподключении браузер передаёт
+    Last-Event-ID — пропущенные события дочитываются из БД. Если пропущено
+    слишком много, приходит событие resync: списки нужно перезагрузить.
+    """
+    business_id = current_user.business_profile.id
+    last_event_id = last_event_id or since_id
+    
+    # Подписка до дочитывания — ничего не теряется между ними
+    subscriber = BookingFeed.subscribe(business_id)
+    try:
+        backlog = fetch_backlog(db, last_event_id, business_id) if last_event_id else []
+    except Exception:
+        BookingFeed.unsubscribe(subscriber)
+        raise
+    # Соединение с БД на время потока не держим
+    db.close()
+    
+    async def stream():
+        try:
+            yield "retry: 5000\n\n"
+            for event in backlog:
+                yield format_sse(event)
+            sent = {event['id'] for event in backlog}
+            
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=settings.LIVE_FEED_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    # Клиент отстал — закрываем, переподключится с Last-Event-ID
+                    break
+                if event['id'] in sent:
+                    continue
+                yield format_sse(event)
+        finally:
+            BookingFeed.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        stream(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @router.get("/{booking_id}")
 async def get_booking(
     booking_id: int,
@@ -227,9 +507,9 @@ async def get_booking(
     business_id = current_user.business_profile.id
     
     # Проверяем что бронирование принадлежит этому бизнесу
-    booking = get_business_booking_query(db, business_id).options(
-        joinedload(Booking.booking_resources)
-    ).filter(Booking.id == booking_id).first()
+    booking = get_business_booking_query(db, business_id).filter(
+        Booking.id == booking_id
+    ).first()
     
     if not booking:
         raise HTTPException(status_code=404, detail="Бронирование не найдено")
@@ -276,6 +556,63 @@ async def create_booking(
     }
 
 
+@router.post("/bulk")
+async def create_bookings_bulk(
+    data: BookingBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """
+    Групповое бронирование (пакеты, несколько семей): все позиции
+    создаются в одной транзакции или не создаётся ни одна
+    """
+    business_id = current_user.business_profile.id
+    
+    bookings, errors = BookingService.create_bookings_bulk(
+        db=db,
+        business_id=business_id,
+        items=[item.model_dump() for item in data.items]
+    )
+    
+    if errors:
+        raise HTTPException(status_code=400, detail={
+            'message': 'Групповое бронирование не создано',
+            'errors': errors
+        })
+    
+    return {
+        'message': f'Создано бронирований: {len(bookings)}',
+        'bookings': bookings_to_response(bookings, db)
+    }
+
+
+@router.post("/bulk/status")
+async def bulk_update_booking_status(
+    data: BookingBulkStatusUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """
+    Изменение статуса нескольких бронирований (например, подтверждение
+    после обзвона). Чужие и несуществующие id возвращаются в not_found,
+    отменённые, которым при восстановлении не хватило мест, — в failed.
+    """
+    business_id = current_user.business_profile.id
+    
+    result = BookingService.bulk_update_status(
+        db=db,
+        business_id=business_id,
+        booking_ids=data.booking_ids,
+        new_status=data.status,
+        notes=data.notes
+    )
+    
+    return {
+        'message': f"Статус изменён у бронирований: {len(result['updated'])}",
+        **result
+    }
+
+
 @router.put("/{booking_id}")
 async def update_booking(
     booking_id: int,
@@ -294,12 +631,19 @@ async def update_booking(
     if not booking:
         raise HTTPException(status_code=404, detail="Бронирование не найдено")
     
+    old_status = booking.status
+    old_participants = booking.participants_count
+    
     # Обновляем поля
     update_data = data.dict(exclude_unset=True)
     for field, value in update_data.items():
         if hasattr(booking, field) and value is not None:
             setattr(booking, field, value)
     
+    # Занятость изменилась в обход счётчика — событие для сверки booked_slots
+    if booking.status != old_status or booking.participants_count != old_participants:
+        BookingEvents.record(db, booking, 'updated', old_status=old_status)
+    
     db.commit()
     db.refresh(booking)
     
@@ -495,6 +839,8 @@ async def delete_booking(
             detail="Можно удалить только отменённые или ожидающие бронирования"
         )
     
+    # Событие переживёт бронирование (booking_id обнулится) — слот будет пересчитан
+    BookingEvents.record(db, booking, 'deleted', old_status=booking.status)
     db.delete(booking)
     db.commit()
     
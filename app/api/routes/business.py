@@ -5,8 +5,8 @@ from app.core.database import get_db
 from app.api.deps import get_current_business_user
 from app.models.user import User, BusinessProfile
 from app.models.activity import Activity, Location, ActivityType
-from app.models.tour import Tour
 from app.schemas.user import BusinessProfileUpdate, BusinessProfileResponse
+from app.services.dashboard import DashboardService
 from app.schemas.activity import (
     ActivityCreate, ActivityUpdate, ActivityResponse,
     LocationCreate, LocationUpdate, LocationResponse,
@@ -22,30 +22,17 @@ async def get_dashboard(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_business_user)
 ):
-    """Данные для дашборда бизнеса"""
+    """
+    Данные для дашборда бизнеса: бронирования на сегодня и предстоящие,
+    загрузка на 7 дней, выручка с начала месяца, неподтверждённые
+    бронирования и отзывы без ответа (кеш на несколько секунд)
+    """
     profile = current_user.business_profile
     
-    activities_count = db.query(Activity).filter(
-        Activity.business_id == profile.id
-    ).count()
-    
-    tours_count = db.query(Tour).filter(
-        Tour.business_id == profile.id
-    ).count()
-    
-    locations_count = db.query(Location).filter(
-        Location.business_id == profile.id
-    ).count()
-    
     return {
         "business_name": profile.business_name,
         "is_verified": profile.is_verified,
-        "stats": {
-            "activities": activities_count,
-            "tours": tours_count,
-            "locations": locations_count,
-            "bookings": 0  # TODO: добавить подсчёт бронирований
-        }
+        **DashboardService.get(db, profile.id)
     }
 
 
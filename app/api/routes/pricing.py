@@ -0,0 +1,138 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.core.database import get_db
+from app.api.deps import get_current_business_user
+from app.models.user import User
+from app.models.tour import Tour
+from app.models.pricing import PricingRule
+from app.schemas.pricing import PricingRuleCreate, PricingRuleResponse, PricingRepriceRequest
+from app.services.pricing_engine import PricingEngine
+
+router = APIRouter(prefix="/business", tags=["Динамические цены"])
+
+
+def get_business_tour(db: Session, current_user: User, tour_id: int) -> Tour:
+    tour = db.query(Tour).filter(
+        Tour.id == tour_id,
+        Tour.business_id == current_user.business_profile.id
+    ).first()
+    if not tour:
+        raise HTTPException(status_code=404, detail="Тур не найден")
+    return tour
+
+
+def validate_rule(data: PricingRuleCreate) -> None:
+    if data.week_days and not set(data.week_days) <= set(range(1, 8)):
+        raise HTTPException(status_code=400, detail="Дни недели — числа от 1 до 7")
+    if data.date_from and data.date_to and data.date_to < data.date_from:
+        raise HTTPException(status_code=400, detail="date_to раньше date_from")
+    if data.lead_days_min is not None and data.lead_days_max is not None and data.lead_days_max < data.lead_days_min:
+        raise HTTPException(status_code=400, detail="lead_days_max меньше lead_days_min")
+
+
+@router.get("/tours/{tour_id}/pricing-rules", response_model=List[PricingRuleResponse])
+async def get_pricing_rules(
+    tour_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """Правила динамических цен тура"""
+    get_business_tour(db, current_user, tour_id)
+    return db.query(PricingRule).filter(PricingRule.tour_id == tour_id).order_by(
+        PricingRule.rule_type, PricingRule.priority.desc(), PricingRule.id
+    ).all()
+
+
+@router.post("/tours/{tour_id}/pricing-rules", response_model=PricingRuleResponse)
+async def create_pricing_rule(
+    tour_id: int,
+    data: PricingRuleCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """Добавить правило и пересчитать цены будущих слотов тура"""
+    get_business_tour(db, current_user, tour_id)
+    validate_rule(data)
+
+    rule = PricingRule(tour_id=tour_id, **data.model_dump())
+    db.add(rule)
+    db.flush()
+    PricingEngine.reprice(db, tour_id=tour_id)
+    db.commit()
+    db.refresh(rule)
+    return rule
+
+
+@router.put("/tours/{tour_id}/pricing-rules/{rule_id}", response_model=PricingRuleResponse)
+async def update_pricing_rule(
+    tour_id: int,
+    rule_id: int,
+    data: PricingRuleCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """Изменить правило и пересчитать цены будущих слотов тура"""
+    get_business_tour(db, current_user, tour_id)
+    validate_rule(data)
+
+    rule = db.query(PricingRule).filter(PricingRule.id == rule_id, PricingRule.tour_id == tour_id).first()
+    if not rule:
+        raise HTTPException(status_code=404, detail="Правило не найдено")
+    for field, value in data.model_dump().items():
+        setattr(rule, field, value)
+    db.flush()
+    PricingEngine.reprice(db, tour_id=tour_id)
+    db.commit()
+    db.refresh(rule)
+    return rule
+
+
+@router.delete("/tours/{tour_id}/pricing-rules/{rule_id}")
+async def delete_pricing_rule(
+    tour_id: int,
+    rule_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """Удалить правило и пересчитать цены будущих слотов тура"""
+    get_business_tour(db, current_user, tour_id)
+
+    rule = db.query(PricingRule).filter(PricingRule.id == rule_id, PricingRule.tour_id == tour_id).first()
+    if not rule:
+        raise HTTPException(status_code=404, detail="Правило не найдено")
+    db.delete(rule)
+    db.flush()
+    PricingEngine.reprice(db, tour_id=tour_id)
+    db.commit()
+    return {"message": "Правило удалено"}
+
+
+@router.post("/pricing/reprice")
+async def reprice_schedules(
+    data: PricingRepriceRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """
+    Пересчёт динамических цен будущих слотов бизнеса (тур, период).
+    dry_run (по умолчанию) — предпросмотр: какие цены изменятся, без записи.
+    Цены, выставленные вручную, не меняются.
+    """
+    if data.tour_id:
+        get_business_tour(db, current_user, data.tour_id)
+    if data.date_from and data.date_to and data.date_to < data.date_from:
+        raise HTTPException(status_code=400, detail="date_to раньше date_from")
+
+    result = PricingEngine.reprice(
+        db,
+        business_id=current_user.business_profile.id,
+        tour_id=data.tour_id,
+        date_from=data.date_from,
+        date_to=data.date_to,
+        dry_run=data.dry_run
+    )
+    if not data.dry_run:
+        db.commit()
+    return result
@@ -2,22 +2,26 @@
 """
 Публичный API для клиентов - бронирование туров без авторизации
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 from typing import Optional, List
 from datetime import date, datetime
 
 from app.core.database import get_db
-from app.models.tour import Tour, TourSchedule, TourResource, TourLocation, TourActivity
-from app.models.resource import Resource
+from app.models.tour import Tour, TourSchedule, TourLocation, TourActivity
 from app.models.activity import Location, Activity, ActivityType
-from app.models.booking import Booking
+from app.models.booking import ACTIVE_BOOKING_STATUSES, Booking, WaitlistEntry
 from app.schemas.booking_schemas import (
     BookingCreate, BookingConfirmation, PublicTourResponse, 
-    PublicScheduleResponse, BookingCalculation
+    PublicScheduleResponse, BookingCalculation, WaitlistCreate
 )
 from app.services.booking_service import BookingService
+from app.services.resource_requirements import ResourceRequirements
+from app.services.idempotency import IdempotencyService, REPLAY, MISMATCH, IN_PROGRESS
+from app.services.waitlist_service import WaitlistService
 
 router = APIRouter(prefix="/public", tags=["Public API"])
 
@@ -206,20 +210,12 @@ async def get_public_tour(
         raise HTTPException(status_code=404, detail="Тур не найден")
     
     # Ресурсы
-    tour_resources = db.query(TourResource).filter(
-        TourResource.tour_id == tour_id
-    ).all()
-    
-    resources = []
-    for tr in tour_resources:
-        resource = db.query(Resource).filter(Resource.id == tr.resource_id).first()
-        if resource:
-            resources.append({
-                'name': resource.name,
-                'type': resource.resource_type,
-                'quantity': tr.quantity_needed,
-                'seats_per_unit': resource.seats_per_unit or 1
-            })
+    resources = [{
+        'name': row.name,
+        'type': row.resource_type,
+        'quantity': row.quantity_needed,
+        'seats_per_unit': row.seats_per_unit or 1
+    } for row in ResourceRequirements.for_tour(db, tour_id)]
     
     # Локации
     locations = db.query(Location).join(TourLocation).filter(
@@ -307,7 +303,7 @@ async def get_tour_schedules(
     for schedule in schedules:
         booked = db.query(func.coalesce(func.sum(Booking.participants_count), 0)).filter(
             Booking.tour_schedule_id == schedule.id,
-            Booking.status.in_(['pending', 'confirmed', 'paid'])
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES)
         ).scalar() or 0
         
         available = schedule.available_slots
@@ -329,7 +325,7 @@ async def get_tour_schedules(
             'booked_slots': booked,
             'free_slots': max(0, free),
             'status': status,
-            'price_per_person': float(tour.base_price)
+            'price_per_person': BookingService.effective_price(schedule, tour)
         })
     
     return result
@@ -363,6 +359,7 @@ async def calculate_booking(
         'schedule_id': schedule_id,
         'participants_count': participants_count,
         'base_price': float(tour.base_price),
+        'price_per_person': total_price / participants_count,
         'total_price': total_price,
         'resources_needed': resources_needed,
         'available': available,
@@ -376,9 +373,44 @@ async def calculate_booking(
 @router.post("/bookings")
 async def create_public_booking(
     data: BookingCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255, description="Ключ идемпотентности для безопасных повторов"),
     db: Session = Depends(get_db)
 ):
-    """Создание бронирования (публичный API)"""
+    """
+    Создание бронирования (публичный API).
+    
+    С заголовком Idempotency-Key повтор запроса возвращает исходный ответ
+    и не создаёт дубликат бронирования.
+    """
+    if not idempotency_key:
+        return _create_public_booking(data, db)
+    
+    scope = 'public_booking'
+    request_hash = IdempotencyService.fingerprint(data.model_dump(mode='json'))
+    state, claimed = await IdempotencyService.acquire(scope, idempotency_key, request_hash)
+    
+    if state == REPLAY:
+        status_code, body = claimed
+        return JSONResponse(status_code=status_code, content=body, headers={'Idempotent-Replayed': 'true'})
+    if state == MISMATCH:
+        raise HTTPException(status_code=422, detail="Ключ идемпотентности уже использован с другими данными")
+    if state == IN_PROGRESS:
+        raise HTTPException(status_code=409, detail="Запрос с этим ключом ещё выполняется, повторите позже")
+    
+    token = claimed
+    try:
+        response = _create_public_booking(data, db)
+    except Exception:
+        # Ошибку не запоминаем — повтор выполнится заново
+        IdempotencyService.release(scope, idempotency_key, token)
+        raise
+    
+    IdempotencyService.complete(scope, idempotency_key, token, 200, jsonable_encoder(response))
+    return response
+
+
+def _create_public_booking(data: BookingCreate, db: Session) -> dict:
+    """Проверки и создание бронирования"""
     schedule = db.query(TourSchedule).filter(TourSchedule.id == data.tour_schedule_id).first()
     
     if not schedule:
@@ -505,3 +537,114 @@ async def cancel_public_booking(
         'booking_code': booking.booking_code,
         'status': booking.status
     }
+
+
+# ========== ЛИСТ ОЖИДАНИЯ ==========
+
+@router.post("/waitlist")
+async def join_waitlist(
+    data: WaitlistCreate,
+    db: Session = Depends(get_db)
+):
+    """
+    Постановка в лист ожидания на заполненный слот.
+    Когда места освободятся, бронирование будет создано автоматически.
+    """
+    schedule = db.query(TourSchedule).filter(TourSchedule.id == data.tour_schedule_id).first()
+    
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Слот не найден")
+    if schedule.date < date.today():
+        raise HTTPException(status_code=400, detail="Слот уже прошёл")
+    
+    tour = db.query(Tour).filter(Tour.id == schedule.tour_id, Tour.is_active == True).first()
+    
+    if not tour:
+        raise HTTPException(status_code=404, detail="Тур недоступен")
+    
+    if tour.min_participants and data.participants_count < tour.min_participants:
+        raise HTTPException(status_code=400, detail=f"Минимум участников: {tour.min_participants}")
+    if tour.max_participants and data.participants_count > tour.max_participants:
+        raise HTTPException(status_code=400, detail=f"Максимум участников: {tour.max_participants}")
+    
+    available, message, free_slots = BookingService.check_availability(
+        db, data.tour_schedule_id, data.participants_count
+    )
+    if available:
+        raise HTTPException(status_code=400, detail="Места есть — оформите бронирование")
+    
+    entry, position = WaitlistService.join(
+        db=db,
+        schedule=schedule,
+        participants_count=data.participants_count,
+        customer_name=data.customer_name,
+        customer_phone=data.customer_phone,
+        customer_email=data.customer_email,
+        notes=data.notes
+    )
+    
+    return {
+        'success': True,
+        'message': 'Вы в листе ожидания. Сообщим, когда места освободятся.',
+        'waitlist_id': entry.id,
+        'position': position,
+        'tour_name': tour.name,
+        'schedule_date': str(schedule.date),
+        'schedule_time': f"{schedule.start_time} - {schedule.end_time}"
+    }
+
+
+def _get_waitlist_entry(db: Session, entry_id: int, phone: str) -> WaitlistEntry:
+    """Заявка с проверкой телефона"""
+    entry = db.query(WaitlistEntry).filter(WaitlistEntry.id == entry_id).first()
+    
+    if not entry:
+        raise HTTPException(status_code=404, detail="Заявка не найдена")
+    
+    clean_phone = ''.join(filter(str.isdigit, phone))
+    entry_phone = ''.join(filter(str.isdigit, entry.customer_phone or ''))
+    
+    if clean_phone[-10:] != entry_phone[-10:]:
+        raise HTTPException(status_code=403, detail="Неверный телефон")
+    
+    return entry
+
+
+@router.get("/waitlist/{entry_id}")
+async def get_waitlist_entry(
+    entry_id: int,
+    phone: str = Query(..., description="Телефон для верификации"),
+    db: Session = Depends(get_db)
+):
+    """Статус заявки в листе ожидания"""
+    entry = _get_waitlist_entry(db, entry_id, phone)
+    
+    return {
+        'waitlist_id': entry.id,
+        'status': entry.status,
+        'position': WaitlistService.position(db, entry),
+        'participants_count': entry.participants_count,
+        'booking_code': entry.booking.booking_code if entry.booking else None
+    }
+
+
+@router.put("/waitlist/{entry_id}/cancel")
+async def cancel_waitlist_entry(
+    entry_id: int,
+    phone: str = Query(..., description="Телефон для верификации"),
+    db: Session = Depends(get_db)
+):
+    """Выход из листа ожидания"""
+    entry = _get_waitlist_entry(db, entry_id, phone)
+    
+    if entry.status != 'waiting':
+        raise HTTPException(status_code=400, detail="Заявка уже не в листе ожидания")
+    
+    entry = WaitlistService.cancel(db, entry)
+    
+    return {
+        'success': True,
+        'message': 'Заявка отменена',
+        'waitlist_id': entry.id,
+        'status': entry.status
+    }
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date, time, timedelta
 from app.core.database import get_db
 from app.api.deps import get_current_business_user
 from app.models.user import User
@@ -9,9 +10,12 @@ from app.schemas.resource import (
     ResourceCreate, ResourceUpdate, ResourceResponse, ResourceTypeResponse,
     InstructorCreate, InstructorUpdate, InstructorResponse
 )
+from app.services.resource_occupancy import ResourceOccupancy, format_minutes
 
 router = APIRouter(prefix="/business", tags=["Ресурсы"])
 
+TIMELINE_MAX_DAYS = 62
+
 
 # === RESOURCE TYPES (справочник) ===
 @router.get("/resource-types", response_model=List[ResourceTypeResponse])
@@ -66,6 +70,97 @@ async def create_resource(
     return response
 
 
+# === RESOURCE AVAILABILITY (до /resources/{resource_id}) ===
+
+@router.get("/resources/availability")
+async def check_resource_availability(
+    resource_id: int,
+    check_date: date,
+    start_time: time,
+    end_time: time = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """Проверить доступность ресурса на дату/время (пиковая занятость в интервале)"""
+    business_id = current_user.business_profile.id
+    
+    resource = db.query(Resource).filter(
+        Resource.id == resource_id,
+        Resource.business_id == business_id
+    ).first()
+    
+    if not resource:
+        raise HTTPException(status_code=404, detail="Ресурс не найден")
+    
+    occupancy = ResourceOccupancy.load(db, [resource.id], check_date, check_date)
+    used = occupancy.max_usage(resource.id, check_date, start_time, end_time)
+    
+    return {
+        "resource_id": resource.id,
+        "resource_name": resource.name,
+        "total_quantity": resource.quantity,
+        "used_quantity": used,
+        "available_quantity": resource.quantity - used,
+        "date": check_date.isoformat(),
+        "start_time": start_time.isoformat(),
+        "end_time": end_time.isoformat() if end_time else None
+    }
+
+
+@router.get("/resources/timeline")
+async def get_resources_timeline(
+    date_from: date,
+    date_to: Optional[date] = None,
+    resource_id: Optional[int] = Query(None, description="Один ресурс; без него — все ресурсы бизнеса"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """
+    Свободные единицы ресурсов по времени (для диаграммы Ганта).
+    
+    Для каждого ресурса и дня — ступени на весь день: [start, end) и
+    сколько единиц в этом интервале занято и свободно.
+    """
+    business_id = current_user.business_profile.id
+    date_to = date_to or date_from
+    
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to раньше date_from")
+    if (date_to - date_from).days >= TIMELINE_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Период не больше {TIMELINE_MAX_DAYS} дней")
+    
+    query = db.query(Resource).filter(Resource.business_id == business_id)
+    if resource_id:
+        query = query.filter(Resource.id == resource_id)
+    resources = query.order_by(Resource.resource_type, Resource.name).all()
+    
+    if resource_id and not resources:
+        raise HTTPException(status_code=404, detail="Ресурс не найден")
+    
+    occupancy = ResourceOccupancy.load(db, [r.id for r in resources], date_from, date_to)
+    days = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    
+    return {
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "resources": [{
+            "resource_id": r.id,
+            "resource_name": r.name,
+            "resource_type": r.resource_type,
+            "total_quantity": r.quantity,
+            "days": [{
+                "date": day.isoformat(),
+                "steps": [{
+                    "start": format_minutes(start),
+                    "end": format_minutes(end),
+                    "used": used,
+                    "free": r.quantity - used
+                } for start, end, used in occupancy.steps(r.id, day)]
+            } for day in days]
+        } for r in resources]
+    }
+
+
 @router.get("/resources/{resource_id}", response_model=ResourceResponse)
 async def get_resource(
     resource_id: int,
@@ -14,6 +14,7 @@ from app.models.user import User
 from app.models.tour import Tour
 from app.models.booking import Booking
 from app.models.review import Review, ReviewVote, TourRatingStats
+from app.services.pagination import fetch_page, count_total, total_pages
 from app.schemas.review import (
     ReviewCreate, ReviewUpdate, ReviewResponse, ReviewListResponse,
     BusinessReplyCreate, ReviewVoteCreate, TourRatingStatsResponse,
@@ -343,6 +344,8 @@ async def vote_review(
 async def get_business_reviews(
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor), вместо page"),
+    count: str = Query('exact', pattern="^(exact|estimated|none)$", description="Подсчёт total: точный, оценка или без подсчёта"),
     tour_id: Optional[int] = None,
     rating: Optional[int] = Query(None, ge=1, le=5),
     has_reply: Optional[bool] = None,
@@ -374,11 +377,13 @@ async def get_business_reviews(
         else:
             query = query.filter(Review.business_reply == None)
     
-    query = query.order_by(desc(Review.created_at))
-    
-    total = query.count()
-    offset = (page - 1) * per_page
-    reviews = query.offset(offset).limit(per_page).all()
+    total = count_total(query, count)
+    try:
+        reviews, next_cursor = fetch_page(
+            query, Review.created_at, Review.id, per_page, cursor=cursor, page=page
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Формируем ответ (аналогично публичному)
     items = []
@@ -423,7 +428,8 @@ async def get_business_reviews(
         total=total,
         page=page,
         per_page=per_page,
-        pages=(total + per_page - 1) // per_page
+        pages=total_pages(total, per_page),
+        next_cursor=next_cursor
     )
 
 
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
 from datetime import date, datetime, timedelta
 from typing import List
 
@@ -8,15 +9,15 @@ from app.core.database import get_db
 from app.api.deps import get_current_business_user
 from app.models.user import User
 from app.models.tour import Tour, TourSchedule
-from app.models.schedule import ScheduleTemplate  # Импортируем из schedule
+from app.models.schedule import ScheduleTemplate, ScheduleGenerationJob  # Импортируем из schedule
 from app.schemas.schedule import (
     ScheduleTemplateCreate, 
     ScheduleTemplateUpdate,
     ScheduleTemplateResponse,
     ScheduleGenerateRequest,
-    GeneratedScheduleInfo
+    ScheduleGenerationJobResponse
 )
-from app.services.schedule_generator import ScheduleGenerator
+from app.services.schedule_generation_jobs import ScheduleGenerationJobs
 
 router = APIRouter(prefix="/business/schedule-templates", tags=["Шаблоны расписаний"])
 
@@ -167,15 +168,17 @@ async def delete_schedule_template(
     return {"message": "Шаблон удален"}
 
 
-@router.post("/{template_id}/generate", response_model=GeneratedScheduleInfo)
+@router.post("/{template_id}/generate", response_model=ScheduleGenerationJobResponse, status_code=202)
 async def generate_schedules(
     template_id: int,
     data: ScheduleGenerateRequest,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_business_user)
 ):
-    """Сгенерировать расписания из шаблона"""
+    """
+    Поставить генерацию расписаний из шаблона в очередь.
+    Выполняет фоновый воркер кусками; прогресс — GET /jobs/{job_id}.
+    """
     business_id = current_user.business_profile.id
     
     template = db.query(ScheduleTemplate).join(Tour).filter(
@@ -186,30 +189,74 @@ async def generate_schedules(
     if not template:
         raise HTTPException(status_code=404, detail="Шаблон не найден")
     
-    # Генерируем расписания
-    try:
-        slots_created, slots_skipped, conflicts = ScheduleGenerator.generate_schedules_from_template(
-            db=db,
-            template=template,
-            start_date=data.start_date,
-            end_date=data.end_date,
-            overwrite_existing=data.overwrite_existing,
-            check_resource_conflicts=data.check_resource_conflicts
-        )
-        
-        return GeneratedScheduleInfo(
-            message=f"Создано {slots_created} слотов, пропущено {slots_skipped}",
-            slots_created=slots_created,
-            slots_skipped=slots_skipped,
-            conflicts=conflicts,
-            template_id=template_id,
-            tour_id=template.tour_id,
-            start_date=data.start_date,
-            end_date=data.end_date
+    active = ScheduleGenerationJobs.active_for_template(db, template_id)
+    if active:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Для шаблона уже выполняется генерация (задача {active.id})"
         )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ошибка генерации: {str(e)}")
+    
+    try:
+        job = ScheduleGenerationJobs.create(db, template, data)
+        db.commit()
+    except IntegrityError:
+        # Параллельный запрос поставил задачу между проверкой и вставкой
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Для шаблона уже выполняется генерация")
+    db.refresh(job)
+    return ScheduleGenerationJobs.progress(job)
+
+
+def get_business_job(db: Session, current_user: User, job_id: int) -> ScheduleGenerationJob:
+    job = db.query(ScheduleGenerationJob).join(
+        ScheduleTemplate, ScheduleTemplate.id == ScheduleGenerationJob.template_id
+    ).join(Tour).filter(
+        ScheduleGenerationJob.id == job_id,
+        Tour.business_id == current_user.business_profile.id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача генерации не найдена")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=ScheduleGenerationJobResponse)
+async def get_generation_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """Прогресс генерации: создано, пропущено, конфликты на текущий момент"""
+    return ScheduleGenerationJobs.progress(get_business_job(db, current_user, job_id))
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=ScheduleGenerationJobResponse)
+async def cancel_generation_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """Отменить генерацию (уже созданные слоты остаются)"""
+    job = get_business_job(db, current_user, job_id)
+    if not ScheduleGenerationJobs.cancel(db, job.id):
+        raise HTTPException(status_code=400, detail="Задача уже завершена")
+    db.refresh(job)
+    return ScheduleGenerationJobs.progress(job)
+
+
+@router.post("/jobs/{job_id}/resume", response_model=ScheduleGenerationJobResponse)
+async def resume_generation_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """Продолжить отменённую или упавшую генерацию с первого необработанного дня"""
+    job = get_business_job(db, current_user, job_id)
+    try:
+        ScheduleGenerationJobs.resume(db, job)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    db.refresh(job)
+    return ScheduleGenerationJobs.progress(job)
 
 
 @router.get("/{template_id}/preview")
@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, func
 from typing import List, Optional
-from datetime import date, time, timedelta, datetime
+from datetime import date, datetime, time, timedelta
 from app.core.database import get_db
 from app.api.deps import get_current_business_user
 from app.models.user import User
@@ -16,8 +16,15 @@ from app.schemas.tour import (
     TourInstructorCreate, TourInstructorResponse,
     TourLocationCreate, TourLocationResponse,
     TourScheduleCreate, TourScheduleUpdate, TourScheduleResponse,
-    ScheduleResourceCreate, ScheduleResourceResponse
+    ScheduleResourceCreate, ScheduleResourceResponse, ScheduleBulkOperation
 )
+from app.services.resource_requirements import ResourceRequirements
+from app.services.pricing_engine import PricingEngine
+from app.services.resource_occupancy import ResourceOccupancy
+from app.services import occupancy_heatmap
+from app.services.compact_calendar import stream_compact_calendar
+from app.services.tour_relations import TourRelations
+from app.services.schedule_bulk import ScheduleBulk
 
 router = APIRouter(prefix="/business", tags=["Туры"])
 
@@ -217,41 +224,24 @@ async def update_tour(
                     detail=f"Недостаточно ресурса '{resource.name}': запрошено {res_data.quantity_needed}, доступно {resource.quantity}"
                 )
     
-    # Обновляем простые поля тура
-    simple_fields = data.model_dump(exclude={'activities', 'resources', 'locations'}, exclude_unset=True)
-    for field, value in simple_fields.items():
-        if value is not None:
-            setattr(tour, field, value)
-    
-    # === ОБНОВЛЯЕМ АКТИВНОСТИ ===
-    if data.activities is not None:
-        # Удаляем старые
-        db.query(TourActivity).filter(TourActivity.tour_id == tour_id).delete()
-        # Добавляем новые
-        for act_data in data.activities:
-            db.add(TourActivity(tour_id=tour_id, **act_data.model_dump()))
+    # Поля и связи — только то, что действительно изменилось
+    base_price = tour.base_price
+    changes = TourRelations.update_tour(db, tour, data)
     
-    # === ОБНОВЛЯЕМ РЕСУРСЫ ===
-    if data.resources is not None:
-        # Удаляем старые
-        db.query(TourResource).filter(TourResource.tour_id == tour_id).delete()
-        # Добавляем новые
-        for res_data in data.resources:
-            db.add(TourResource(tour_id=tour_id, **res_data.model_dump()))
+    # Динамические цены считаются от базовой — пересчитываем слоты тура
+    if tour.base_price != base_price:
+        PricingEngine.reprice(db, tour_id=tour_id)
     
-    # === ОБНОВЛЯЕМ ЛОКАЦИИ ===
-    if data.locations is not None:
-        # Удаляем старые
-        db.query(TourLocation).filter(TourLocation.tour_id == tour_id).delete()
-        # Добавляем новые
-        for loc_data in data.locations:
-            db.add(TourLocation(tour_id=tour_id, **loc_data.model_dump()))
+    if any(changes.values()):
+        try:
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"Ошибка обновления тура: {str(e)}")
     
-    try:
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Ошибка обновления тура: {str(e)}")
+    # Массовые запросы не вызывают ORM-события — сбрасываем кеш ресурсов явно
+    if changes['resources']:
+        ResourceRequirements.invalidate(tour_id=tour_id)
     
     # Загружаем со связями
     tour = db.query(Tour).options(
@@ -569,47 +559,33 @@ async def create_tour_schedule(
     tour = db.query(Tour).filter(
         Tour.id == tour_id,
         Tour.business_id == business_id
-    ).options(
-        joinedload(Tour.tour_resources).joinedload(TourResource.resource)
     ).first()
     
     if not tour:
         raise HTTPException(status_code=404, detail="Тур не найден")
     
-    # Проверяем доступность ресурсов на это время
-    # Получаем все слоты на эту дату которые пересекаются по времени
-    conflicting_schedules = db.query(TourSchedule).join(Tour).filter(
-        Tour.business_id == business_id,
-        TourSchedule.date == data.date,
-        TourSchedule.status != 'cancelled'
-    ).all()
-    
-    # Считаем занятые ресурсы
-    for tr in tour.tour_resources:
-        resource = tr.resource
-        needed = tr.quantity_needed
-        
-        # Считаем сколько уже занято
-        used = 0
-        for sched in conflicting_schedules:
-            # Проверяем пересечение времени
-            if data.end_time:
-                # Есть время окончания — проверяем пересечение
-                sched_end = sched.end_time or (
-                    # Если нет end_time — считаем что слот 2 часа
-                    (datetime.combine(date.today(), sched.start_time) + timedelta(hours=2)).time()
-                )
-                if not (data.end_time <= sched.start_time or data.start_time >= sched_end):
-                    # Пересекаются — считаем занятые ресурсы
-                    for sr in sched.schedule_resources:
-                        if sr.resource_id == resource.id:
-                            used += sr.quantity_used
-        
-        available = resource.quantity - used
-        if needed > available:
+    # Проверяем доступность ресурсов на это время: пиковая занятость
+    # каждого ресурса в интервале слота (один запрос на все ресурсы).
+    # Без времени окончания слот длится duration_minutes тура; если не задана
+    # и она — проверку пропускаем, как и прежде
+    end_time = data.end_time
+    if end_time is None and tour.duration_minutes:
+        end = datetime.combine(data.date, data.start_time) + timedelta(minutes=tour.duration_minutes)
+        # После полуночи — до конца дня (конец не позже начала = конец дня)
+        end_time = end.time() if end.date() == data.date else time(0, 0)
+    
+    tour_resources = ResourceRequirements.for_tour(db, tour_id)
+    checked = tour_resources if end_time is not None else []
+    occupancy = ResourceOccupancy.load(
+        db, [tr.resource_id for tr in checked], data.date, data.date
+    )
+    for tr in checked:
+        used = occupancy.max_usage(tr.resource_id, data.date, data.start_time, end_time)
+        available = tr.quantity - used
+        if tr.quantity_needed > available:
             raise HTTPException(
                 status_code=400,
-                detail=f"Недостаточно ресурса '{resource.name}' на {data.date} {data.start_time}: нужно {needed}, доступно {available}"
+                detail=f"Недостаточно ресурса '{tr.name}' на {data.date} {data.start_time}: нужно {tr.quantity_needed}, доступно {available}"
             )
     
     # Создаём слот
@@ -627,13 +603,16 @@ async def create_tour_schedule(
     db.flush()
     
     # Добавляем занятость ресурсов
-    for tr in tour.tour_resources:
+    for tr in tour_resources:
         db.add(ScheduleResource(
             tour_schedule_id=schedule.id,
             resource_id=tr.resource_id,
             quantity_used=tr.quantity_needed
         ))
     
+    # Цена по правилам динамических цен (если не задана вручную)
+    PricingEngine.reprice(db, schedule_ids=[schedule.id])
+    
     db.commit()
     db.refresh(schedule)
     
@@ -667,21 +646,59 @@ async def delete_schedule(
     return {"message": "Слот удалён"}
 
 
+@router.post("/schedules/bulk")
+async def bulk_schedule_operation(
+    data: ScheduleBulkOperation,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_business_user)
+):
+    """
+    Массовая операция над слотами по фильтру (тур, период, дни недели, время):
+    shift, cancel, delete, set_price, set_capacity. Слоты с бронированиями
+    защищены; dry_run — только посчитать результат.
+    """
+    try:
+        return ScheduleBulk.apply(db, current_user.business_profile.id, data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # === CALENDAR ===
 
 @router.get("/calendar")
 async def get_calendar(
     from_date: date = None,
     to_date: date = None,
+    mode: str = Query('slots', pattern="^(slots|heatmap)$", description="slots — слоты, heatmap — загрузка ресурсов"),
+    bucket: str = Query('day', pattern="^(day|hour)$", description="Интервал тепловой карты"),
+    format: str = Query('full', pattern="^(full|compact)$", description="compact — справочники + массивы полей по дням"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_business_user)
 ):
-    """Получить календарь всех туров на период"""
+    """Получить календарь всех туров на период (или тепловую карту загрузки ресурсов)"""
     if not from_date:
         from_date = date.today()
     if not to_date:
         to_date = from_date + timedelta(days=30)
     
+    if mode == 'heatmap':
+        if to_date < from_date:
+            raise HTTPException(status_code=400, detail="to_date раньше from_date")
+        max_days = occupancy_heatmap.MAX_DAYS[bucket]
+        if (to_date - from_date).days >= max_days:
+            raise HTTPException(status_code=400, detail=f"Период тепловой карты не больше {max_days} дней")
+        
+        resources = db.query(Resource).filter(
+            Resource.business_id == current_user.business_profile.id
+        ).order_by(Resource.resource_type, Resource.name).all()
+        return occupancy_heatmap.build_heatmap(db, resources, from_date, to_date, bucket)
+    
+    if format == 'compact':
+        return StreamingResponse(
+            stream_compact_calendar(current_user.business_profile.id, from_date, to_date),
+            media_type='application/json'
+        )
+    
     schedules = db.query(TourSchedule).join(Tour).filter(
         Tour.business_id == current_user.business_profile.id,
         TourSchedule.date >= from_date,
@@ -722,46 +739,3 @@ async def get_calendar(
         "to_date": to_date.isoformat(),
         "calendar": calendar
     }
-
-
-# === RESOURCE AVAILABILITY ===
-
-@router.get("/resources/availability")
-async def check_resource_availability(
-    resource_id: int,
-    check_date: date,
-    start_time: time,
-    end_time: time = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_business_user)
-):
-    """Проверить доступность ресурса на дату/время"""
-    business_id = current_user.business_profile.id
-    
-    resource = db.query(Resource).filter(
-        Resource.id == resource_id,
-        Resource.business_id == business_id
-    ).first()
-    
-    if not resource:
-        raise HTTPException(status_code=404, detail="Ресурс не найден")
-    
-    # Считаем занятость на это время
-    used = db.query(
-        func.coalesce(func.sum(ScheduleResource.quantity_used), 0)
-    ).join(TourSchedule).join(Tour).filter(
-        Tour.business_id == business_id,
-        ScheduleResource.resource_id == resource_id,
-        TourSchedule.date == check_date,
-        TourSchedule.status != 'cancelled'
-    ).scalar()
-    
-    return {
-        "resource_id": resource.id,
-        "resource_name": resource.name,
-        "total_quantity": resource.quantity,
-        "used_quantity": int(used),
-        "available_quantity": resource.quantity - int(used),
-        "date": check_date.isoformat(),
-        "start_time": start_time.isoformat()
-    }
@@ -18,6 +18,55 @@ class Settings(BaseSettings):
     # Yandex Maps API
     YANDEX_MAPS_API_KEY: str = Field(default="", env="YANDEX_MAPS_API_KEY")
 
+    # Идемпотентность POST-запросов (заголовок Idempotency-Key)
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_PROCESSING_TIMEOUT_SECONDS: int = 120  # аренда захвата: дольше любого запроса
+
+    # Кеш ресурсов туров (страховка от изменений из других процессов)
+    RESOURCE_REQUIREMENTS_TTL_SECONDS: int = 300
+
+    # Фоновый воркер и уведомления по событиям бронирований
+    WORKER_POLL_SECONDS: float = 5.0
+    NOTIFICATION_SENDERS: str = "log"  # через запятую: log, stub
+    NOTIFICATION_BATCH_SIZE: int = 100
+    NOTIFICATION_MAX_ATTEMPTS: int = 8
+    NOTIFICATION_RETRY_BASE_SECONDS: int = 30
+    NOTIFICATION_RETRY_MAX_SECONDS: int = 3600
+    NOTIFICATION_CLAIM_TIMEOUT_SECONDS: int = 600  # захват упавшего воркера снова доступен
+
+    # Сверка booked_slots с бронированиями
+    RECONCILE_INTERVAL_SECONDS: float = 60.0
+    RECONCILE_BATCH_SIZE: int = 1000
+    RECONCILE_LAG_SECONDS: int = 30  # события моложе не берём: их транзакции могут быть ещё не видны
+
+    # Дневные итоги (business_daily_metrics)
+    METRICS_ROLLUP_INTERVAL_SECONDS: float = 60.0
+
+    # Кеш дашборда бизнеса
+    DASHBOARD_CACHE_SECONDS: int = 30
+
+    # Живая лента бронирований (SSE)
+    LIVE_FEED_POLL_SECONDS: float = 5.0  # перечитывать события и без NOTIFY
+    LIVE_FEED_KEEPALIVE_SECONDS: float = 15.0
+    LIVE_FEED_QUEUE_SIZE: int = 1000  # переполнение — клиент переподключается с Last-Event-ID
+    LIVE_FEED_TOKEN_SECONDS: int = 300  # токен в URL для EventSource (браузер не шлёт Authorization)
+
+    # Динамические цены слотов
+    PRICING_INTERVAL_SECONDS: float = 60.0  # пересчёт слотов из новых событий
+    PRICING_REFRESH_SECONDS: float = 3600.0  # полный пересчёт (сдвиг «дней до слота»)
+
+    # Фоновая генерация расписаний из шаблонов
+    SCHEDULE_JOB_CHUNK_DAYS: int = 14  # дней на один commit
+    SCHEDULE_JOB_MAX_CONFLICTS: int = 500  # сколько сообщений о конфликтах хранить в задаче
+    SCHEDULE_JOB_BUDGET_SECONDS: float = 30.0  # сколько воркер генерирует за один запуск задачи
+
+    # Скользящий горизонт: активные шаблоны догенерируются на N дней вперёд
+    SCHEDULE_HORIZON_DAYS: int = 60
+    SCHEDULE_HORIZON_INTERVAL_SECONDS: float = 3600.0
+    SCHEDULE_HORIZON_CONCURRENCY: int = 4  # шаблонов одновременно на процесс (не больше пула соединений)
+    SCHEDULE_HORIZON_BATCH_SIZE: int = 50
+
     class Config:
         env_file = ".env"
 
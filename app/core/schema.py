@@ -0,0 +1,133 @@
+# app/core/schema.py
+"""
+Обновление схемы существующей базы до моделей.
+
+Миграций в проекте нет: create_all создаёт таблицы только в пустой базе.
+Эта команда идемпотентно добавляет в уже развёрнутую базу новые таблицы,
+колонки (с заполнением существующих строк) и индексы. Запускать при
+каждом деплое до старта API и воркера:
+    python -m app.core.schema
+"""
+import logging
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Table, text
+from sqlalchemy.engine import Engine
+
+import app.models  # noqa: F401 — все таблицы в Base.metadata (внешние ключи)
+from app.models.booking import BookingEvent, WaitlistEntry
+from app.models.idempotency import IdempotencyKey
+from app.models.job_cursor import JobCursor
+from app.models.metrics import BusinessDailyMetric
+from app.models.pricing import PricingRule
+from app.models.schedule import ScheduleGenerationJob
+
+logger = logging.getLogger(__name__)
+
+# Таблицы, добавленные после первого развёртывания (создаются вместе с индексами)
+TABLES: List[Table] = [
+    BookingEvent.__table__,
+    IdempotencyKey.__table__,
+    WaitlistEntry.__table__,
+    JobCursor.__table__,
+    BusinessDailyMetric.__table__,
+    PricingRule.__table__,
+    ScheduleGenerationJob.__table__,
+]
+
+# Индексы существующих таблиц: (имя, определение после ON, нужное расширение).
+# Строятся CONCURRENTLY — без блокировки записи в рабочей базе. Если
+# расширение в PostgreSQL недоступно, индекс пропускается.
+INDEXES: List[Tuple[str, str, Optional[str]]] = [
+    ('ix_bookings_created_at_id', 'bookings (created_at, id)', None),
+    ('ix_reviews_tour_created_at_id', 'reviews (tour_id, created_at, id)', None),
+    # Поиск в CRM (см. BOOKING_SEARCH_INDEXES_DDL в app/models/booking.py)
+    ('ix_bookings_customer_name_trgm', 'bookings USING gin (customer_name gin_trgm_ops)', 'pg_trgm'),
+    ('ix_bookings_customer_email_trgm', 'bookings USING gin (customer_email gin_trgm_ops)', 'pg_trgm'),
+    ('ix_bookings_booking_code_trgm', 'bookings USING gin (booking_code gin_trgm_ops)', 'pg_trgm'),
+    ('ix_bookings_customer_phone_digits_trgm', 'bookings USING gin (customer_phone_digits gin_trgm_ops)', 'pg_trgm'),
+]
+
+# Новые колонки существующих таблиц: (таблица, колонка, тип)
+COLUMNS: List[Tuple[str, str, str]] = [
+    # Без колонки не работает ни одно чтение Booking — модель её выбирает
+    ('bookings', 'customer_phone_digits', 'VARCHAR(50)'),
+    ('tour_schedules', 'dynamic_price', 'BOOLEAN DEFAULT false'),
+    ('schedule_templates', 'generated_until', 'DATE'),
+    ('booking_events', 'claimed_at', 'TIMESTAMP'),
+    ('idempotency_keys', 'token', 'VARCHAR(32)'),
+]
+
+
+# Заполнение новых колонок у существующих строк: (описание, UPDATE с LIMIT :batch).
+# Идёт пачками, каждая в своей транзакции — без долгой блокировки таблицы.
+BACKFILLS: List[Tuple[str, str]] = [
+    ('bookings.customer_phone_digits',
+     "UPDATE bookings SET customer_phone_digits = regexp_replace(customer_phone, '[^0-9]', '', 'g') "
+     "WHERE id IN (SELECT id FROM bookings WHERE customer_phone IS NOT NULL "
+     "AND customer_phone_digits IS NULL LIMIT :batch)"),
+]
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def backfill(engine: Engine) -> None:
+    """Заполнение из BACKFILLS, пока находятся незаполненные строки"""
+    for description, statement in BACKFILLS:
+        total = 0
+        while True:
+            with engine.begin() as connection:
+                updated = connection.execute(text(statement), {'batch': BACKFILL_BATCH_SIZE}).rowcount
+            total += updated
+            if updated < BACKFILL_BATCH_SIZE:
+                break
+        logger.info("Заполнено %s: %s", description, total)
+
+
+def create_indexes(engine: Engine) -> None:
+    """
+    Индексы из INDEXES.
+
+    CONCURRENTLY не выполняется внутри транзакции — DDL идёт на отдельном
+    соединении в autocommit. Недостроенный индекс от прерванного прошлого
+    запуска (INVALID) удаляется и строится заново.
+    """
+    with engine.connect() as connection:
+        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+        for name, definition, extension in INDEXES:
+            if extension:
+                available = connection.execute(text(
+                    "SELECT 1 FROM pg_available_extensions WHERE name = :name"
+                ), {'name': extension}).scalar()
+                if not available:
+                    logger.warning("Индекс %s пропущен: расширение %s недоступно", name, extension)
+                    continue
+                connection.execute(text(f"CREATE EXTENSION IF NOT EXISTS {extension}"))
+            invalid = connection.execute(text(
+                "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ), {'name': name}).scalar()
+            if invalid:
+                connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            connection.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}"))
+            logger.info("Индекс %s готов", name)
+
+def upgrade(engine: Engine) -> None:
+    """Недостающие таблицы и колонки (одна транзакция), заполнение колонок, индексы"""
+    with engine.begin() as connection:
+        for table in TABLES:
+            table.create(connection, checkfirst=True)
+            # Индекс мог появиться в модели позже самой таблицы
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+        for table_name, column, column_type in COLUMNS:
+            connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {column} {column_type}"))
+    backfill(engine)
+    create_indexes(engine)
+    logger.info("Схема базы обновлена")
+
+if __name__ == "__main__":
+    from app.core.database import engine
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    upgrade(engine)
@@ -3,7 +3,22 @@ from app.models.activity import ActivityType, Location, Activity, LocationActivi
 from app.models.resource import ResourceType, Resource, Instructor, ScheduleResource, ActivityResourceType
 from app.models.tour import Tour, TourActivity, TourResource, TourInstructor, TourLocation, TourSchedule
 from app.models.schedule import ScheduleTemplate, ResourceAllocation
-from app.models.booking import Booking, BookingResource
+from app.models.booking import Booking, BookingResource, BookingEvent, WaitlistEntry
 
 # === НОВОЕ: Модели отзывов ===
 from app.models.review import Review, ReviewVote, TourRatingStats
+
+# === НОВОЕ: Идемпотентность запросов ===
+from app.models.idempotency import IdempotencyKey
+
+# === НОВОЕ: Курсоры фоновых задач ===
+from app.models.job_cursor import JobCursor
+
+# === НОВОЕ: Дневные итоги для дашбордов ===
+from app.models.metrics import BusinessDailyMetric
+
+# === НОВОЕ: Правила динамических цен ===
+from app.models.pricing import PricingRule
+
+# === НОВОЕ: Фоновая генерация расписаний ===
+from app.models.schedule import ScheduleGenerationJob
@@ -1,7 +1,8 @@
 # app/models/booking.py
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Text, Boolean, CheckConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Text, Boolean, CheckConstraint, JSON, Index, DDL, event
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
+from datetime import datetime
 from app.core.database import Base
 
 
@@ -27,6 +28,7 @@ class Booking(Base):
     # Контакты клиента (если без регистрации)
     customer_name = Column(String(255))
     customer_phone = Column(String(50))
+    customer_phone_digits = Column(String(50))  # только цифры телефона — для поиска
     customer_email = Column(String(255))
     notes = Column(Text)
     
@@ -53,7 +55,45 @@ class Booking(Base):
             "status IN ('pending', 'confirmed', 'paid', 'cancelled', 'completed')",
             name='bookings_status_check'
         ),
+        # Keyset-пагинация списков CRM
+        Index('ix_bookings_created_at_id', 'created_at', 'id'),
     )
+    
+    @validates('customer_phone')
+    def _sync_phone_digits(self, key, value):
+        self.customer_phone_digits = phone_digits(value)
+        return value
+
+
+# Статусы, в которых бронирование занимает места в слоте. Один набор для
+# проверки мест, счётчика booked_slots и его сверки.
+ACTIVE_BOOKING_STATUSES = ('pending', 'confirmed', 'paid')
+
+
+def phone_digits(phone):
+    """Телефон без форматирования: '+7 (900) 123-45-67' -> '79001234567'"""
+    if phone is None:
+        return None
+    return ''.join(ch for ch in phone if ch.isdigit())
+
+
+# Триграммные индексы для поиска в CRM (ILIKE '%...%').
+# Создаются, только если в PostgreSQL доступно расширение pg_trgm.
+BOOKING_SEARCH_INDEXES_DDL = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS ix_bookings_customer_name_trgm ON bookings USING gin (customer_name gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS ix_bookings_customer_email_trgm ON bookings USING gin (customer_email gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS ix_bookings_booking_code_trgm ON bookings USING gin (booking_code gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS ix_bookings_customer_phone_digits_trgm ON bookings USING gin (customer_phone_digits gin_trgm_ops);
+    END IF;
+END
+$$;
+"""
+
+event.listen(Booking.__table__, 'after_create', DDL(BOOKING_SEARCH_INDEXES_DDL).execute_if(dialect='postgresql'))
 
 
 class BookingResource(Base):
@@ -69,3 +109,73 @@ class BookingResource(Base):
     # Relationships
     booking = relationship("Booking", back_populates="booking_resources")
     resource = relationship("Resource")
+
+
+class BookingEvent(Base):
+    """
+    Outbox событий бронирований.
+    Пишется в той же транзакции, что и само изменение; уведомления
+    по событиям рассылает фоновый воркер (app/services/worker.py).
+    """
+    __tablename__ = "booking_events"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    booking_id = Column(Integer, ForeignKey("bookings.id", ondelete="SET NULL"), nullable=True, index=True)
+    tour_schedule_id = Column(Integer, nullable=True)  # без FK — событие переживает удаление слота
+    
+    event_type = Column(String(30), nullable=False)  # created, confirmed, paid, cancelled, completed, pending, updated, deleted, waitlist_promoted
+    payload = Column(JSON, nullable=False, default=dict)
+    
+    # Доставка: pending -> sending -> sent | failed (или обратно в pending для повтора)
+    status = Column(String(20), default='pending', nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    claimed_at = Column(DateTime, nullable=True)  # когда воркер забрал событие на отправку
+    last_error = Column(Text)
+    
+    created_at = Column(DateTime, server_default=func.now())
+    processed_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    booking = relationship("Booking")
+    
+    __table_args__ = (
+        Index('ix_booking_events_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+
+class WaitlistEntry(Base):
+    """
+    Лист ожидания на заполненный слот.
+    Освободившиеся места раздаются фоновым воркером строго по очереди (по id).
+    """
+    __tablename__ = "waitlist_entries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    tour_schedule_id = Column(Integer, ForeignKey("tour_schedules.id", ondelete="CASCADE"), nullable=False)
+    customer_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    
+    participants_count = Column(Integer, nullable=False)
+    customer_name = Column(String(255))
+    customer_phone = Column(String(50))
+    customer_email = Column(String(255))
+    notes = Column(Text)
+    
+    # waiting -> promoted | cancelled | expired
+    status = Column(String(20), default='waiting', nullable=False)
+    booking_id = Column(Integer, ForeignKey("bookings.id", ondelete="SET NULL"), nullable=True)
+    
+    created_at = Column(DateTime, server_default=func.now())
+    promoted_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    tour_schedule = relationship("TourSchedule")
+    booking = relationship("Booking")
+    
+    __table_args__ = (
+        Index('ix_waitlist_entries_schedule_status', 'tour_schedule_id', 'status', 'id'),
+        CheckConstraint(
+            "status IN ('waiting', 'promoted', 'cancelled', 'expired')",
+            name='waitlist_entries_status_check'
+        ),
+    )
@@ -0,0 +1,30 @@
+# app/models/idempotency.py
+from sqlalchemy import Column, Integer, String, DateTime, JSON, UniqueConstraint
+from datetime import datetime
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Ключи идемпотентности для повторяемых POST-запросов.
+    Хранят результат первого выполнения, чтобы повтор вернул тот же ответ.
+    """
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String(50), nullable=False)          # public_booking, ...
+    key = Column(String(255), nullable=False)           # значение заголовка Idempotency-Key
+    request_hash = Column(String(64), nullable=False)   # отпечаток тела запроса
+    token = Column(String(32), nullable=True)           # токен текущего захвата (владелец аренды)
+
+    # processing = выполняется, completed = ответ сохранён
+    status = Column(String(20), default='processing', nullable=False)
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint('scope', 'key', name='uq_idempotency_keys_scope_key'),
+    )
@@ -0,0 +1,16 @@
+# app/models/job_cursor.py
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from app.core.database import Base
+
+
+class JobCursor(Base):
+    """
+    Позиция фоновой задачи в потоке изменений (например, последний
+    обработанный id в booking_events). Следующий запуск продолжает с неё.
+    """
+    __tablename__ = "job_cursors"
+
+    name = Column(String(50), primary_key=True)         # booked_slots_reconcile, ...
+    position = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
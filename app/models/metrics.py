@@ -0,0 +1,31 @@
+# app/models/metrics.py
+from sqlalchemy import Column, Integer, ForeignKey, Date, DateTime, Numeric
+from datetime import datetime
+from app.core.database import Base
+
+
+class BusinessDailyMetric(Base):
+    """
+    Дневные итоги по бронированиям (по дате создания бронирования).
+    Пересчитывается фоновой задачей из booking_events, см.
+    app/services/metrics_rollup.py.
+    """
+    __tablename__ = "business_daily_metrics"
+
+    business_id = Column(Integer, ForeignKey("business_profiles.id", ondelete="CASCADE"), primary_key=True)
+    tour_id = Column(Integer, ForeignKey("tours.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+
+    # Количество бронирований по текущему статусу
+    bookings_count = Column(Integer, default=0, nullable=False)
+    pending_count = Column(Integer, default=0, nullable=False)
+    confirmed_count = Column(Integer, default=0, nullable=False)
+    paid_count = Column(Integer, default=0, nullable=False)
+    completed_count = Column(Integer, default=0, nullable=False)
+    cancelled_count = Column(Integer, default=0, nullable=False)
+
+    # Только confirmed / paid / completed
+    participants = Column(Integer, default=0, nullable=False)
+    revenue = Column(Numeric(12, 2), default=0, nullable=False)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
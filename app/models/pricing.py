@@ -0,0 +1,32 @@
+# app/models/pricing.py
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Numeric, ARRAY
+from datetime import datetime
+from app.core.database import Base
+
+
+class PricingRule(Base):
+    """
+    Правило динамической цены тура. Цена слота = base_price тура ×
+    (1 + adjust_percent / 100) по сработавшим правилам — не больше одного
+    на каждый rule_type. Пересчёт — app/services/pricing_engine.py.
+    """
+    __tablename__ = "pricing_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tour_id = Column(Integer, ForeignKey("tours.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String(255))
+
+    rule_type = Column(String(20), nullable=False)  # occupancy, lead_time, weekday, season
+
+    # Условия (заполняются по типу правила)
+    min_occupancy = Column(Numeric(4, 3))   # occupancy: доля занятых мест >= (0..1)
+    lead_days_min = Column(Integer)         # lead_time: дней до слота >=
+    lead_days_max = Column(Integer)         # lead_time: дней до слота <=
+    week_days = Column(ARRAY(Integer))      # weekday: 1=Понедельник ... 7=Воскресенье
+    date_from = Column(Date)                # season: период (включительно)
+    date_to = Column(Date)
+
+    adjust_percent = Column(Numeric(6, 2), nullable=False)  # +20 — дороже на 20%, -10 — дешевле
+    priority = Column(Integer, default=0, nullable=False)   # внутри типа побеждает больший
+    is_active = Column(Boolean, default=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
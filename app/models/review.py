@@ -2,7 +2,7 @@
 """
 Модели для системы отзывов и рейтингов
 """
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Date, Numeric, ARRAY
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Date, Numeric, ARRAY, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -66,6 +66,11 @@ class Review(Base):
     user = relationship("User", foreign_keys=[user_id], back_populates="reviews")
     replier = relationship("User", foreign_keys=[business_reply_by])
     votes = relationship("ReviewVote", back_populates="review", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Keyset-пагинация отзывов бизнеса
+        Index('ix_reviews_tour_created_at_id', 'tour_id', 'created_at', 'id'),
+    )
 
 
 class ReviewVote(Base):
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Time, Boolean, ARRAY, DateTime, String
+from sqlalchemy import Column, Integer, ForeignKey, Time, Boolean, ARRAY, DateTime, String, Date, Text, JSON, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -20,6 +20,7 @@ class ScheduleTemplate(Base):
     break_duration_minutes = Column(Integer, default=0)      # 0, 15, 30 минут
     
     is_active = Column(Boolean, default=True)
+    generated_until = Column(Date)  # до какой даты слоты уже сгенерированы (скользящий горизонт)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Связи
@@ -52,3 +53,48 @@ class ResourceAllocation(Base):
     booking = relationship("Booking", backref="resource_allocations")
     resource = relationship("Resource", backref="allocations")
     tour_schedule = relationship("TourSchedule", backref="resource_allocations")
+
+
+class ScheduleGenerationJob(Base):
+    """
+    Задача генерации расписания из шаблона. Выполняется фоновым воркером
+    кусками по несколько дней: слоты куска и прогресс фиксируются одним
+    commit, next_date — первый ещё не обработанный день. После падения
+    или отмены задача продолжается с next_date.
+    См. app/services/schedule_generation_jobs.py.
+    """
+    __tablename__ = "schedule_generation_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    template_id = Column(Integer, ForeignKey("schedule_templates.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    overwrite_existing = Column(Boolean, default=False, nullable=False)
+    check_resource_conflicts = Column(Boolean, default=True, nullable=False)
+
+    # pending -> running -> completed | failed | cancelled
+    status = Column(String(20), default='pending', nullable=False, index=True)
+    next_date = Column(Date, nullable=False)
+
+    # Итоги на текущий момент
+    slots_created = Column(Integer, default=0, nullable=False)
+    slots_skipped = Column(Integer, default=0, nullable=False)
+    conflicts_count = Column(Integer, default=0, nullable=False)
+    conflicts = Column(JSON, nullable=False, default=list)  # первые SCHEDULE_JOB_MAX_CONFLICTS сообщений
+    error = Column(Text)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    template = relationship("ScheduleTemplate")
+
+    __table_args__ = (
+        # Не больше одной активной задачи на шаблон — и при гонке двух запросов
+        Index(
+            'uq_schedule_generation_jobs_active_template', 'template_id',
+            unique=True, postgresql_where=text("status IN ('pending', 'running')")
+        ),
+    )
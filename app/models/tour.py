@@ -127,6 +127,7 @@ class TourSchedule(Base):
     available_slots = Column(Integer, nullable=False)  # сколько мест доступно
     booked_slots = Column(Integer, default=0)  # сколько забронировано
     price_override = Column(Numeric(10, 2))  # особая цена на этот слот
+    dynamic_price = Column(Boolean, default=False)  # price_override выставлен правилами цен, а не вручную
     
     status = Column(String(20), default="available")  # available, booked, cancelled
     is_available = Column(Boolean, default=True)
@@ -15,8 +15,7 @@ from .schedule import (
     ScheduleTemplateUpdate,
     ScheduleTemplateResponse,
     ScheduleGenerateRequest,
-    ScheduleResourceResponse,
-    GeneratedScheduleInfo
+    ScheduleResourceResponse
 )
 
 # User схемы импортируем осторожно
@@ -45,7 +44,6 @@ __all__ = [
     "ScheduleTemplateUpdate", 
     "ScheduleTemplateResponse",
     "ScheduleGenerateRequest",
-    "GeneratedScheduleInfo",
 ]
 
 if USER_SCHEMAS_AVAILABLE:
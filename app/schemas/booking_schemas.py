@@ -48,6 +48,17 @@ class BookingCreateCRM(BookingBase):
     total_price: Optional[Decimal] = None
 
 
+class BookingBulkItem(BookingBase):
+    """Позиция группового бронирования"""
+    customer_id: Optional[int] = None
+    status: Optional[str] = Field('pending', pattern="^(pending|confirmed|paid)$")
+
+
+class BookingBulkCreate(BaseModel):
+    """Групповое бронирование из CRM (всё или ничего)"""
+    items: List[BookingBulkItem] = Field(..., min_length=1, max_length=200)
+
+
 class BookingUpdate(BaseModel):
     """Обновление бронирования"""
     participants_count: Optional[int] = Field(None, ge=1, le=100)
@@ -64,6 +75,13 @@ class BookingStatusUpdate(BaseModel):
     notes: Optional[str] = None
 
 
+class BookingBulkStatusUpdate(BaseModel):
+    """Изменение статуса списка бронирований"""
+    booking_ids: List[int] = Field(..., min_length=1, max_length=500)
+    status: str = Field(..., pattern="^(pending|confirmed|paid|cancelled|completed)$")
+    notes: Optional[str] = None
+
+
 class BookingResponse(BaseModel):
     """Ответ с данными бронирования"""
     id: int
@@ -172,3 +190,28 @@ class BookingConfirmation(BaseModel):
     total_price: Decimal
     customer_name: str
     customer_phone: str
+
+
+# ========== ЛИСТ ОЖИДАНИЯ ==========
+
+class WaitlistCreate(BookingBase):
+    """Постановка в лист ожидания (публичный API)"""
+    pass
+
+
+class WaitlistEntryResponse(BaseModel):
+    """Заявка в листе ожидания"""
+    id: int
+    tour_schedule_id: int
+    participants_count: int
+    customer_name: Optional[str] = None
+    customer_phone: Optional[str] = None
+    customer_email: Optional[str] = None
+    notes: Optional[str] = None
+    status: str
+    booking_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    promoted_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
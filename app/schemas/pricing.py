@@ -0,0 +1,41 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from decimal import Decimal
+from datetime import date, datetime
+
+
+# === PRICING RULE ===
+class PricingRuleCreate(BaseModel):
+    """
+    Правило динамической цены. Условия, которые не заданы, не проверяются:
+    occupancy — min_occupancy, lead_time — lead_days_min/lead_days_max,
+    weekday — week_days, season — date_from/date_to.
+    """
+    name: Optional[str] = None
+    rule_type: str = Field(..., pattern="^(occupancy|lead_time|weekday|season)$")
+    min_occupancy: Optional[Decimal] = Field(None, ge=0, le=1)
+    lead_days_min: Optional[int] = Field(None, ge=0)
+    lead_days_max: Optional[int] = Field(None, ge=0)
+    week_days: Optional[List[int]] = None  # 1=Понедельник ... 7=Воскресенье
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    adjust_percent: Decimal = Field(..., gt=-100)
+    priority: int = 0
+    is_active: bool = True
+
+
+class PricingRuleResponse(PricingRuleCreate):
+    id: int
+    tour_id: int
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class PricingRepriceRequest(BaseModel):
+    """Пересчёт динамических цен будущих слотов; dry_run — только предпросмотр"""
+    tour_id: Optional[int] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    dry_run: bool = True
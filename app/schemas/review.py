@@ -130,10 +130,11 @@ class ReviewResponse(BaseModel):
 class ReviewListResponse(BaseModel):
     """Список отзывов с пагинацией"""
     items: List[ReviewResponse]
-    total: int
+    total: Optional[int] = None  # None при count=none
     page: int
     per_page: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 # === СТАТИСТИКА РЕЙТИНГА ===
@@ -60,6 +60,7 @@ class ScheduleTemplateResponse(BaseModel):
     slot_duration_minutes: int
     break_duration_minutes: int
     is_active: bool
+    generated_until: Optional[date] = None
     created_at: datetime
     
     # Дополнительные поля
@@ -95,12 +96,22 @@ class ScheduleResourceResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
-class GeneratedScheduleInfo(BaseModel):
-    message: str
-    slots_created: int
-    slots_skipped: int
-    conflicts: List[str] = []
+class ScheduleGenerationJobResponse(BaseModel):
+    """Задача фоновой генерации и её прогресс"""
+    job_id: int
     template_id: int
-    tour_id: int
+    status: str  # pending, running, completed, failed, cancelled
     start_date: date
     end_date: date
+    next_date: Optional[date] = None  # первый ещё не обработанный день
+    days_total: int
+    days_done: int
+    progress: float  # 0..1
+    slots_created: int
+    slots_skipped: int
+    conflicts_count: int
+    conflicts: List[str] = []
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
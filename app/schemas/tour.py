@@ -197,6 +197,30 @@ class TourScheduleUpdate(BaseModel):
     notes: Optional[str] = None
 
 
+class ScheduleBulkFilter(BaseModel):
+    """Какие слоты затрагивает массовая операция"""
+    date_from: date
+    date_to: date
+    tour_id: Optional[int] = None
+    week_days: Optional[List[int]] = None  # 1=Понедельник ... 7=Воскресенье
+    time_from: Optional[time] = None  # начало слота >= time_from
+    time_to: Optional[time] = None    # начало слота < time_to
+
+
+class ScheduleBulkOperation(BaseModel):
+    """
+    Массовая операция над слотами:
+    shift (сдвиг на shift_minutes), cancel, delete,
+    set_price (price_override, null — сбросить), set_capacity (available_slots)
+    """
+    filter: ScheduleBulkFilter
+    operation: str
+    shift_minutes: Optional[int] = None
+    price_override: Optional[Decimal] = None
+    available_slots: Optional[int] = None
+    dry_run: bool = False
+
+
 class TourScheduleResponse(BaseModel):
     id: int
     tour_id: int
@@ -207,6 +231,7 @@ class TourScheduleResponse(BaseModel):
     available_slots: int
     booked_slots: int = 0
     price_override: Optional[Decimal] = None
+    dynamic_price: Optional[bool] = False  # цена выставлена правилами динамических цен
     status: str = "available"
     notes: Optional[str] = None
 
@@ -0,0 +1,227 @@
+# app/services/booking_events.py
+"""
+События бронирований (transactional outbox).
+
+record() добавляет событие в текущую сессию — оно фиксируется тем же
+коммитом, что и изменение бронирования. dispatch_pending() вызывается
+фоновым воркером: захватывает пачку событий короткой транзакцией
+(FOR UPDATE SKIP LOCKED, чтобы несколько воркеров не делили одно событие),
+рассылает их отправителям вне транзакции и записывает результаты —
+с повторами и экспоненциальной задержкой.
+
+Запись события сопровождается NOTIFY booking_events — он доставляется
+слушателям только при коммите транзакции (живая лента CRM, live_feed.py).
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, bindparam, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.booking import Booking, BookingEvent
+from app.models.job_cursor import JobCursor
+from app.services.notifications import NotificationSender
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'booking_events'
+
+
+class BookingEvents:
+    """Запись и рассылка событий бронирований"""
+
+    @staticmethod
+    def _payload(booking: Booking, old_status: Optional[str] = None) -> dict:
+        return {
+            'booking_id': booking.id,
+            'booking_code': booking.booking_code,
+            'status': booking.status,
+            'old_status': old_status,
+            'tour_schedule_id': booking.tour_schedule_id,
+            'participants_count': booking.participants_count,
+            'total_price': float(booking.total_price or 0),
+            'customer_name': booking.customer_name,
+            'customer_phone': booking.customer_phone,
+            'customer_email': booking.customer_email,
+            'created_at': booking.created_at.isoformat() if booking.created_at else None,
+        }
+
+    @staticmethod
+    def notify(db: Session) -> None:
+        """
+        Сигнал слушателям о новых событиях. Полезной нагрузки нет — слушатель
+        сам читает booking_events; одинаковые NOTIFY в транзакции PostgreSQL
+        схлопывает в один.
+        """
+        db.execute(select(func.pg_notify(NOTIFY_CHANNEL, '')))
+
+    @staticmethod
+    def record(
+        db: Session,
+        booking: Booking,
+        event_type: str,
+        old_status: Optional[str] = None
+    ) -> None:
+        """Событие по одному бронированию (booking должен иметь id — после flush)"""
+        db.add(BookingEvent(
+            booking_id=booking.id,
+            tour_schedule_id=booking.tour_schedule_id,
+            event_type=event_type,
+            payload=BookingEvents._payload(booking, old_status)
+        ))
+        BookingEvents.notify(db)
+
+    @staticmethod
+    def record_many(
+        db: Session,
+        bookings: Iterable[Booking],
+        event_type: str,
+        old_statuses: Optional[dict] = None
+    ) -> None:
+        """События по пачке бронирований одним INSERT"""
+        old_statuses = old_statuses or {}
+        now = datetime.utcnow()
+        rows = [{
+            'booking_id': booking.id,
+            'tour_schedule_id': booking.tour_schedule_id,
+            'event_type': event_type,
+            'payload': BookingEvents._payload(booking, old_statuses.get(booking.id)),
+            'status': 'pending',
+            'attempts': 0,
+            'next_attempt_at': now,
+        } for booking in bookings]
+        if rows:
+            db.execute(insert(BookingEvent), rows)
+            BookingEvents.notify(db)
+
+    @staticmethod
+    def lock_cursor(db: Session, name: str) -> JobCursor:
+        """Курсор задачи по booking_events с блокировкой — параллельный запуск подождёт"""
+        cursor = db.query(JobCursor).filter(JobCursor.name == name).with_for_update().first()
+        if not cursor:
+            cursor = JobCursor(name=name, position=0)
+            db.add(cursor)
+            db.flush()
+        return cursor
+
+    @staticmethod
+    def since(
+        db: Session,
+        position: int,
+        limit: int,
+        lag_seconds: Optional[int] = None
+    ) -> List[BookingEvent]:
+        """
+        События после позиции курсора, по порядку id.
+
+        События моложе lag_seconds не берём: транзакция с меньшим id
+        могла ещё не зафиксироваться, и курсор перескочил бы через неё.
+        """
+        lag = settings.RECONCILE_LAG_SECONDS if lag_seconds is None else lag_seconds
+        return db.query(BookingEvent).filter(
+            BookingEvent.id > position,
+            BookingEvent.created_at <= func.now() - timedelta(seconds=lag)
+        ).order_by(BookingEvent.id).limit(limit).all()
+
+    @staticmethod
+    def retry_delay(attempts: int) -> timedelta:
+        """Экспоненциальная задержка перед повтором: base, 2*base, 4*base... (с потолком)"""
+        seconds = settings.NOTIFICATION_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1))
+        return timedelta(seconds=min(seconds, settings.NOTIFICATION_RETRY_MAX_SECONDS))
+
+    @staticmethod
+    def claim(db: Session, batch_size: Optional[int] = None) -> List[BookingEvent]:
+        """
+        Захват пачки событий на отправку отдельной короткой транзакцией.
+
+        FOR UPDATE SKIP LOCKED держится только до коммита захвата — на время
+        рассылки блокировок нет, другие воркеры видят status='sending'.
+        Захват, не завершённый за NOTIFICATION_CLAIM_TIMEOUT_SECONDS
+        (воркер упал посреди рассылки), снова доступен.
+
+        Возвращает отсоединённые от сессии события: коммит их не сбрасывает,
+        и рассылка не обращается к базе.
+        """
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=settings.NOTIFICATION_CLAIM_TIMEOUT_SECONDS)
+        events: List[BookingEvent] = db.query(BookingEvent).filter(or_(
+            and_(BookingEvent.status == 'pending', BookingEvent.next_attempt_at <= now),
+            and_(BookingEvent.status == 'sending', BookingEvent.claimed_at < stale)
+        )).order_by(BookingEvent.id).limit(
+            batch_size or settings.NOTIFICATION_BATCH_SIZE
+        ).with_for_update(skip_locked=True).all()
+
+        for event in events:
+            event.status = 'sending'
+            event.claimed_at = now
+        db.flush()
+        for event in events:
+            db.expunge(event)
+        db.commit()
+        return events
+
+    @staticmethod
+    def dispatch_pending(
+        db: Session,
+        senders: Sequence[NotificationSender],
+        batch_size: Optional[int] = None
+    ) -> Tuple[int, int]:
+        """
+        Рассылка пачки ожидающих событий: захват (claim) -> отправка вне
+        транзакции -> запись результатов второй короткой транзакцией.
+
+        Доставка «как минимум один раз»: при сбое одного из отправителей
+        событие повторяется целиком. Результат пишется, только если захват
+        всё ещё наш (claimed_at не сменился) — иначе событие уже перехватил
+        другой воркер по таймауту.
+
+        Returns:
+            (отправлено, ошибок)
+        """
+        events = BookingEvents.claim(db, batch_size)
+
+        sent = failed = 0
+        results = []
+        for event in events:
+            now = datetime.utcnow()
+            result = {
+                'b_id': event.id,
+                'b_claimed_at': event.claimed_at,
+                'status': 'sent',
+                'attempts': event.attempts or 0,
+                'next_attempt_at': event.next_attempt_at,
+                'last_error': event.last_error,
+                'processed_at': now,
+            }
+            try:
+                for sender in senders:
+                    sender.send(event)
+            except Exception as e:
+                failed += 1
+                result['attempts'] += 1
+                result['last_error'] = f"{type(e).__name__}: {e}"[:1000]
+                if result['attempts'] >= settings.NOTIFICATION_MAX_ATTEMPTS:
+                    result['status'] = 'failed'
+                    logger.error("Событие %s не доставлено после %s попыток: %s", event.id, result['attempts'], e)
+                else:
+                    result['status'] = 'pending'
+                    result['next_attempt_at'] = now + BookingEvents.retry_delay(result['attempts'])
+                    result['processed_at'] = None
+            else:
+                sent += 1
+            results.append(result)
+
+        if results:
+            table = BookingEvent.__table__
+            db.execute(
+                update(table).where(
+                    table.c.id == bindparam('b_id'),
+                    table.c.status == 'sending',
+                    table.c.claimed_at == bindparam('b_claimed_at')
+                ),
+                results
+            )
+            db.commit()
+        return sent, failed
@@ -0,0 +1,193 @@
+# app/services/booking_export.py
+"""
+Потоковая выгрузка бронирований (CSV / XLSX).
+
+Строки читаются серверным курсором (yield_per) одним запросом с JOIN
+слота и тура; ресурсы собираются подзапросом string_agg. Память не растёт
+с размером выгрузки: CSV отдаётся кусками по мере чтения, XLSX пишется
+построчно (xlsxwriter, constant_memory) во временный файл и отдаётся из него.
+
+Текст клиентов (имя, email, примечания и т.п.) не должен исполняться как
+формула: в CSV свободный текст, начинающийся с =, +, -, @, табуляции или CR,
+экранируется апострофом, в XLSX текст пишется только как строка
+(write_string). Телефон вида '+7 (900) ...' выгружается как есть —
+экранируется, только если похож не на номер, а на произвольный текст.
+
+Генераторы открывают свою сессию БД — сессия запроса закрывается раньше,
+чем StreamingResponse дочитает данные.
+"""
+import csv
+import io
+import os
+import re
+import tempfile
+from typing import Callable, Iterator
+
+from sqlalchemy import String, cast, func
+from sqlalchemy.orm import Query, Session
+
+from app.core.database import SessionLocal
+from app.models.booking import Booking, BookingResource
+from app.models.resource import Resource
+from app.models.tour import Tour, TourSchedule
+
+try:
+    import xlsxwriter
+except ImportError:  # необязательная зависимость — только для XLSX
+    xlsxwriter = None
+
+BATCH_SIZE = 1000
+CHUNK_BYTES = 64 * 1024
+
+# Первые символы, с которых табличные редакторы начинают формулу
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# Свободный текст, который экранируется в CSV
+TEXT_COLUMNS = {'tour_name', 'customer_name', 'customer_email', 'resources', 'notes'}
+
+# Телефон из цифр и знаков форматирования ('+7 (900) 123-45-67') — не текст
+PHONE_VALUE = re.compile(r'^\+?[\d ()\-]+$')
+
+COLUMNS = [
+    ('booking_code', 'Код'),
+    ('created_at', 'Создано'),
+    ('status', 'Статус'),
+    ('tour_name', 'Тур'),
+    ('schedule_date', 'Дата'),
+    ('start_time', 'Начало'),
+    ('end_time', 'Окончание'),
+    ('participants_count', 'Участников'),
+    ('total_price', 'Сумма'),
+    ('currency', 'Валюта'),
+    ('customer_name', 'Клиент'),
+    ('customer_phone', 'Телефон'),
+    ('customer_email', 'Email'),
+    ('resources', 'Ресурсы'),
+    ('notes', 'Примечания'),
+    ('confirmed_at', 'Подтверждено'),
+    ('paid_at', 'Оплачено'),
+    ('cancelled_at', 'Отменено'),
+]
+
+
+def xlsx_available() -> bool:
+    return xlsxwriter is not None
+
+
+def export_rows(query: Query) -> Query:
+    """Колонки выгрузки поверх отфильтрованного запроса бронирований"""
+    resources = query.session.query(
+        func.string_agg(Resource.name + ' × ' + cast(BookingResource.quantity, String), ', ')
+    ).select_from(BookingResource).join(
+        Resource, Resource.id == BookingResource.resource_id
+    ).filter(
+        BookingResource.booking_id == Booking.id
+    ).correlate(Booking).scalar_subquery()
+
+    return query.outerjoin(
+        TourSchedule, TourSchedule.id == Booking.tour_schedule_id
+    ).outerjoin(
+        Tour, Tour.id == TourSchedule.tour_id
+    ).with_entities(
+        Booking.booking_code,
+        Booking.created_at,
+        Booking.status,
+        Tour.name.label('tour_name'),
+        TourSchedule.date.label('schedule_date'),
+        TourSchedule.start_time,
+        TourSchedule.end_time,
+        Booking.participants_count,
+        Booking.total_price,
+        Booking.currency,
+        Booking.customer_name,
+        Booking.customer_phone,
+        Booking.customer_email,
+        resources.label('resources'),
+        Booking.notes,
+        Booking.confirmed_at,
+        Booking.paid_at,
+        Booking.cancelled_at,
+    ).order_by(Booking.created_at, Booking.id).yield_per(BATCH_SIZE)
+
+
+def _escape_formula(value):
+    """Текст, похожий на формулу, — с апострофом впереди (CSV injection)"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_value(key: str, value):
+    if value is None:
+        return ''
+    if key in TEXT_COLUMNS:
+        return _escape_formula(value)
+    if key == 'customer_phone' and not PHONE_VALUE.match(value):
+        return _escape_formula(value)
+    return value
+
+
+def _values(row) -> list:
+    return [_csv_value(key, row[i]) for i, (key, _) in enumerate(COLUMNS)]
+
+
+def stream_csv(build_query: Callable[[Session], Query]) -> Iterator[bytes]:
+    """CSV (UTF-8 с BOM и ';' — открывается в Excel без мастера импорта)"""
+    db = SessionLocal()
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=';')
+        buffer.write('\ufeff')
+        writer.writerow([title for _, title in COLUMNS])
+
+        for row in export_rows(build_query(db)):
+            writer.writerow(_values(row))
+            if buffer.tell() >= CHUNK_BYTES:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue().encode('utf-8')
+    finally:
+        db.close()
+
+
+def stream_xlsx(build_query: Callable[[Session], Query]) -> Iterator[bytes]:
+    """XLSX: построчная запись во временный файл, затем отдача кусками"""
+    db = SessionLocal()
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'default_date_format': 'dd.mm.yyyy'})
+        sheet = workbook.add_worksheet('Бронирования')
+        datetime_format = workbook.add_format({'num_format': 'dd.mm.yyyy hh:mm'})
+
+        sheet.write_row(0, 0, [title for _, title in COLUMNS])
+        for row_number, row in enumerate(export_rows(build_query(db)), start=1):
+            for col, (key, _) in enumerate(COLUMNS):
+                value = row[col]
+                if value is None:
+                    continue
+                if key in ('created_at', 'confirmed_at', 'paid_at', 'cancelled_at'):
+                    sheet.write_datetime(row_number, col, value, datetime_format)
+                elif key == 'schedule_date':
+                    sheet.write_datetime(row_number, col, value)
+                elif key == 'total_price':
+                    sheet.write_number(row_number, col, float(value))
+                elif key == 'participants_count':
+                    sheet.write_number(row_number, col, value)
+                else:
+                    # write() превратил бы '=...' в формулу, а 'http...' — в ссылку
+                    sheet.write_string(row_number, col, str(value))
+        workbook.close()
+        db.close()
+
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        db.close()
+        os.remove(path)
@@ -0,0 +1,78 @@
+# app/services/booking_search.py
+"""
+Поиск бронирований в CRM по имени, телефону, email и коду.
+
+Подстрочный поиск (ILIKE '%...%') обслуживают триграммные GIN-индексы
+(pg_trgm, см. app/models/booking.py). Телефон ищется по
+customer_phone_digits — формат ввода ('+7 900', '8(900)...') не важен.
+
+Результаты ранжируются: точное совпадение кода/телефона, затем совпадение
+с начала строки, затем вхождение в середину.
+
+Колонку, её заполнение и индексы в существующую базу добавляет
+python -m app.core.schema.
+"""
+import re
+from typing import Optional, Tuple
+
+from sqlalchemy import case, or_
+from sqlalchemy.orm import Query
+
+from app.models.booking import Booking, phone_digits
+
+# Строка похожа на телефон: цифры и символы форматирования
+PHONE_PATTERN = re.compile(r'^[\d\s()+\-]+$')
+MIN_PHONE_DIGITS = 3
+
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class BookingSearch:
+    """Фильтр и ранжирование поиска бронирований"""
+
+    @staticmethod
+    def apply(query: Query, term: str) -> Tuple[Query, Optional[object]]:
+        """
+        Фильтр поиска.
+
+        Returns:
+            (запрос с фильтром, выражение ранга для ORDER BY — меньше = выше)
+        """
+        term = term.strip()
+        if not term:
+            return query, None
+
+        escaped = _escape_like(term)
+        contains = f"%{escaped}%"
+        prefix = f"{escaped}%"
+
+        conditions = [
+            Booking.booking_code.ilike(contains, escape='\\'),
+            Booking.customer_name.ilike(contains, escape='\\'),
+            Booking.customer_email.ilike(contains, escape='\\'),
+        ]
+        exact = [Booking.booking_code == term.upper()]
+        starts = [
+            Booking.booking_code.ilike(prefix, escape='\\'),
+            Booking.customer_name.ilike(prefix, escape='\\'),
+            Booking.customer_email.ilike(prefix, escape='\\'),
+        ]
+
+        digits = phone_digits(term)
+        if PHONE_PATTERN.match(term) and len(digits) >= MIN_PHONE_DIGITS:
+            if len(digits) >= 10:
+                # Номер целиком — сравниваем последние 10 цифр (+7 / 8 не важны)
+                conditions.append(Booking.customer_phone_digits.like(f"%{digits[-10:]}"))
+                exact.append(Booking.customer_phone_digits.like(f"%{digits[-10:]}"))
+            else:
+                conditions.append(Booking.customer_phone_digits.like(f"%{digits}%"))
+                starts.append(Booking.customer_phone_digits.like(f"{digits}%"))
+
+        rank = case(
+            (or_(*exact), 0),
+            (or_(*starts), 1),
+            else_=2
+        )
+        return query.filter(or_(*conditions)), rank
@@ -3,19 +3,21 @@
 Сервис бронирований.
 
 Логика ценообразования:
-- Цена тура = tour.base_price × кол-во участников
+- Цена = цена слота × кол-во участников; цена слота — price_override
+  (вручную или по правилам динамических цен), иначе tour.base_price
 - Ресурсы учитываются только для занятости/вместимости (без влияния на цену)
 """
 import uuid
-import math
 from datetime import datetime
 from typing import Optional, List, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import func, insert, update, bindparam, case
 
-from app.models.booking import Booking, BookingResource
-from app.models.tour import Tour, TourSchedule, TourResource
-from app.models.resource import Resource
+from app.models.booking import ACTIVE_BOOKING_STATUSES, Booking, BookingResource
+from app.models.tour import Tour, TourSchedule
+from app.services.booking_events import BookingEvents
+from app.services.resource_requirements import ResourceRequirements
 
 
 class BookingService:
@@ -38,42 +40,7 @@ class BookingService:
         Returns:
             (список ресурсов, общая вместимость)
         """
-        # Получаем ресурсы тура
-        tour_resources = db.query(TourResource).filter(
-            TourResource.tour_id == tour_id
-        ).all()
-        
-        resources_needed = []
-        total_capacity = 0
-        
-        for tr in tour_resources:
-            resource = db.query(Resource).filter(Resource.id == tr.resource_id).first()
-            if not resource:
-                continue
-            
-            seats_per_unit = resource.seats_per_unit or 1
-            
-            # Сколько единиц ресурса нужно для этого количества участников
-            units_needed = math.ceil(participants_count / seats_per_unit)
-            
-            # Ограничиваем количеством указанным в туре
-            units_needed = min(units_needed, tr.quantity_needed)
-            
-            capacity = units_needed * seats_per_unit
-            total_capacity += capacity
-            
-            # Ресурсы — справочно, без цен
-            resources_needed.append({
-                'resource_id': resource.id,
-                'resource_name': resource.name,
-                'resource_type': resource.resource_type,
-                'quantity_needed': units_needed,
-                'quantity_available': resource.quantity,
-                'seats_per_unit': seats_per_unit,
-                'capacity': capacity
-            })
-        
-        return resources_needed, total_capacity
+        return ResourceRequirements.calculate(db, tour_id, [participants_count])[participants_count]
     
     @staticmethod
     def check_availability(
@@ -97,7 +64,7 @@ class BookingService:
         # Считаем занятые места
         booked = db.query(func.coalesce(func.sum(Booking.participants_count), 0)).filter(
             Booking.tour_schedule_id == tour_schedule_id,
-            Booking.status.in_(['pending', 'confirmed', 'paid'])
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES)
         ).scalar() or 0
         
         available = schedule.available_slots - booked
@@ -107,6 +74,13 @@ class BookingService:
         
         return True, "Доступно", available
     
+    @staticmethod
+    def effective_price(schedule: Optional[TourSchedule], tour: Tour) -> float:
+        """Цена за участника: price_override слота, иначе базовая цена тура"""
+        if schedule is not None and schedule.price_override is not None:
+            return float(schedule.price_override)
+        return float(tour.base_price or 0)
+    
     @staticmethod
     def calculate_price(
         db: Session,
@@ -117,19 +91,21 @@ class BookingService:
         """
         Расчёт стоимости бронирования.
         
-        Логика: цена тура × кол-во участников.
+        Логика: цена слота × кол-во участников.
         Ресурсы возвращаются справочно.
         
+        Слот и тур берутся из identity map сессии (check_availability,
+        add_booking их уже загрузили) — лишних запросов нет.
+        
         Returns:
             (общая стоимость, список ресурсов)
         """
-        tour = db.query(Tour).filter(Tour.id == tour_id).first()
+        tour = db.get(Tour, tour_id)
         if not tour:
             return 0, []
         
-        # Цена из тура × кол-во участников
-        base_price = float(tour.base_price or 0)
-        total_price = base_price * participants_count
+        schedule = db.get(TourSchedule, schedule_id) if schedule_id else None
+        total_price = BookingService.effective_price(schedule, tour) * participants_count
         
         # Ресурсы — справочно
         resources_needed, _ = BookingService.calculate_resources_needed(
@@ -172,16 +148,49 @@ class BookingService:
         if not available:
             return None, message
         
-        # Расчёт стоимости (из тура)
+        booking = BookingService.add_booking(
+            db, schedule, participants_count,
+            customer_name=customer_name,
+            customer_phone=customer_phone,
+            customer_email=customer_email,
+            customer_id=customer_id,
+            notes=notes,
+            status=status
+        )
+        
+        db.commit()
+        db.refresh(booking)
+        
+        return booking, "Бронирование успешно создано"
+    
+    @staticmethod
+    def add_booking(
+        db: Session,
+        schedule: TourSchedule,
+        participants_count: int,
+        customer_name: str,
+        customer_phone: str,
+        customer_email: Optional[str] = None,
+        customer_id: Optional[int] = None,
+        notes: Optional[str] = None,
+        status: str = 'pending',
+        event_type: str = 'created'
+    ) -> Booking:
+        """
+        Добавление бронирования в текущую транзакцию без проверки мест
+        и без commit: ресурсы, booked_slots и событие outbox.
+        Доступность проверяет вызывающий код.
+        """
+        # Расчёт стоимости (цена слота)
         total_price, resources_needed = BookingService.calculate_price(
-            db, schedule.tour_id, tour_schedule_id, participants_count
+            db, schedule.tour_id, schedule.id, participants_count
         )
         
         # Создаём бронирование
         booking = Booking(
             booking_code=BookingService.generate_booking_code(),
             booking_type='tour',
-            tour_schedule_id=tour_schedule_id,
+            tour_schedule_id=schedule.id,
             customer_id=customer_id,
             participants_count=participants_count,
             total_price=total_price,
@@ -208,10 +217,133 @@ class BookingService:
         # Обновляем booked_slots в расписании
         schedule.booked_slots = (schedule.booked_slots or 0) + participants_count
         
+        # Событие для уведомлений — в той же транзакции
+        BookingEvents.record(db, booking, event_type)
+        
+        return booking
+    
+    @staticmethod
+    def create_bookings_bulk(
+        db: Session,
+        business_id: int,
+        items: List[dict]
+    ) -> Tuple[List[Booking], List[dict]]:
+        """
+        Групповое бронирование в одной транзакции (всё или ничего).
+        
+        Все позиции проверяются вместе: слоты блокируются и загружаются одним
+        запросом, занятость считается одним агрегатом. Если хотя бы одна позиция
+        не проходит проверку — ничего не создаётся.
+        
+        Returns:
+            (созданные бронирования, ошибки по позициям)
+        """
+        schedule_ids = sorted({item['tour_schedule_id'] for item in items})
+        
+        # Блокируем слоты (в порядке id, чтобы не ловить дедлоки)
+        rows = db.query(TourSchedule, Tour).join(
+            Tour, Tour.id == TourSchedule.tour_id
+        ).filter(
+            TourSchedule.id.in_(schedule_ids),
+            Tour.business_id == business_id
+        ).order_by(TourSchedule.id).with_for_update(of=TourSchedule).all()
+        schedules = {schedule.id: (schedule, tour) for schedule, tour in rows}
+        
+        # Занятость всех слотов одним запросом
+        booked_rows = db.query(
+            Booking.tour_schedule_id, func.sum(Booking.participants_count)
+        ).filter(
+            Booking.tour_schedule_id.in_(schedule_ids),
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+        ).group_by(Booking.tour_schedule_id).all()
+        free = {
+            schedule_id: schedule.available_slots
+            for schedule_id, (schedule, _) in schedules.items()
+        }
+        for schedule_id, booked in booked_rows:
+            free[schedule_id] -= booked or 0
+        
+        errors = []
+        for index, item in enumerate(items):
+            schedule_id = item['tour_schedule_id']
+            participants_count = item['participants_count']
+            
+            if schedule_id not in schedules:
+                errors.append({'index': index, 'tour_schedule_id': schedule_id, 'error': "Слот расписания не найден"})
+                continue
+            
+            _, tour = schedules[schedule_id]
+            if tour.min_participants and participants_count < tour.min_participants:
+                errors.append({'index': index, 'tour_schedule_id': schedule_id, 'error': f"Минимум участников: {tour.min_participants}"})
+                continue
+            if tour.max_participants and participants_count > tour.max_participants:
+                errors.append({'index': index, 'tour_schedule_id': schedule_id, 'error': f"Максимум участников: {tour.max_participants}"})
+                continue
+            
+            # Места расходуются позициями по порядку
+            if free[schedule_id] < participants_count:
+                errors.append({'index': index, 'tour_schedule_id': schedule_id, 'error': f"Недостаточно мест. Свободно: {max(0, free[schedule_id])}"})
+                continue
+            free[schedule_id] -= participants_count
+        
+        if errors:
+            db.rollback()  # снимаем блокировки
+            return [], errors
+        
+        # Ресурсы всех туров (один запрос на туры, которых нет в кеше)
+        tour_resources = ResourceRequirements.for_tours(
+            db, {tour.id for _, tour in schedules.values()}
+        )
+        
+        # Вставляем бронирования пачкой
+        bookings = []
+        for item in items:
+            schedule, tour = schedules[item['tour_schedule_id']]
+            bookings.append(Booking(
+                booking_code=BookingService.generate_booking_code(),
+                booking_type='tour',
+                tour_schedule_id=schedule.id,
+                customer_id=item.get('customer_id'),
+                participants_count=item['participants_count'],
+                total_price=BookingService.effective_price(schedule, tour) * item['participants_count'],
+                customer_name=item['customer_name'],
+                customer_phone=item['customer_phone'],
+                customer_email=item.get('customer_email'),
+                notes=item.get('notes'),
+                status=item.get('status') or 'pending'
+            ))
+        db.add_all(bookings)
+        db.flush()  # один INSERT ... RETURNING на всю пачку
+        
+        booking_resource_rows = []
+        seats_by_schedule = {}
+        for booking, item in zip(bookings, items):
+            schedule, tour = schedules[item['tour_schedule_id']]
+            for row in tour_resources[tour.id]:
+                requirement = ResourceRequirements.requirement(row, booking.participants_count)
+                booking_resource_rows.append({
+                    'booking_id': booking.id,
+                    'resource_id': row.resource_id,
+                    'quantity': requirement['quantity_needed'],
+                    'price_per_unit': None
+                })
+            seats_by_schedule[schedule.id] = seats_by_schedule.get(schedule.id, 0) + booking.participants_count
+        
+        if booking_resource_rows:
+            db.execute(insert(BookingResource), booking_resource_rows)
+        
+        BookingEvents.record_many(db, bookings, 'created')
+        
+        # Резервируем места одним UPDATE на все слоты
+        BookingService._adjust_booked_slots(db, seats_by_schedule)
+        
+        booking_ids = [booking.id for booking in bookings]
         db.commit()
-        db.refresh(booking)
         
-        return booking, "Бронирование успешно создано"
+        # Перечитываем созданные бронирования одним запросом вместо refresh по одному
+        db.query(Booking).filter(Booking.id.in_(booking_ids)).all()
+        
+        return bookings, []
     
     @staticmethod
     def update_status(
@@ -239,22 +371,193 @@ class BookingService:
                 booking.confirmed_at = now
         elif new_status == 'cancelled' and not booking.cancelled_at:
             booking.cancelled_at = now
-            # Освобождаем места
-            if booking.tour_schedule_id:
-                schedule = db.query(TourSchedule).filter(
-                    TourSchedule.id == booking.tour_schedule_id
-                ).first()
-                if schedule:
-                    schedule.booked_slots = max(0, (schedule.booked_slots or 0) - booking.participants_count)
+        if new_status != 'cancelled':
+            booking.cancelled_at = None
+        
+        # Места заняты, пока статус в ACTIVE_BOOKING_STATUSES: отмена и завершение
+        # освобождают их, восстановление занимает снова
+        delta = BookingService._seats_delta(old_status, new_status, booking.participants_count)
+        if delta and booking.tour_schedule_id:
+            schedule = db.query(TourSchedule).filter(
+                TourSchedule.id == booking.tour_schedule_id
+            ).first()
+            if schedule:
+                schedule.booked_slots = max(0, (schedule.booked_slots or 0) + delta)
         
         if notes:
             booking.notes = f"{booking.notes or ''}\n[{now}] {notes}".strip()
         
+        if new_status != old_status:
+            BookingEvents.record(db, booking, new_status, old_status=old_status)
+        
         db.commit()
         db.refresh(booking)
         
         return booking, f"Статус изменён с {old_status} на {new_status}"
     
+    @staticmethod
+    def bulk_update_status(
+        db: Session,
+        business_id: int,
+        booking_ids: List[int],
+        new_status: str,
+        notes: Optional[str] = None
+    ) -> dict:
+        """
+        Изменение статуса списка бронирований набором SQL-операторов
+        в одной транзакции (проверка принадлежности, даты, освобождение мест).
+        
+        Бронирования, которым при возврате в активный статус не хватило
+        мест, не меняются и возвращаются в failed.
+        
+        Returns:
+            {'updated': [...], 'unchanged': [...], 'not_found': [...], 'failed': [...]}
+        """
+        requested = list(dict.fromkeys(booking_ids))
+        
+        # Принадлежность бизнесу и текущее состояние — одним запросом с блокировкой
+        bookings = db.query(Booking).join(
+            TourSchedule, TourSchedule.id == Booking.tour_schedule_id
+        ).join(
+            Tour, Tour.id == TourSchedule.tour_id
+        ).filter(
+            Booking.id.in_(requested),
+            Tour.business_id == business_id
+        ).order_by(Booking.id).with_for_update(of=Booking).all()
+        
+        found = {b.id for b in bookings}
+        changed = [b for b in bookings if b.status != new_status]
+        
+        # Возврат в активный статус снова занимает места — только если они есть
+        failed = BookingService._check_reactivation_seats(db, changed, new_status)
+        failed_ids = {item['booking_id'] for item in failed}
+        changed = [b for b in changed if b.id not in failed_ids]
+        
+        result = {
+            'updated': [b.id for b in changed],
+            'unchanged': [b.id for b in bookings if b.status == new_status],
+            'not_found': [booking_id for booking_id in requested if booking_id not in found],
+            'failed': failed
+        }
+        
+        if not changed:
+            db.rollback()
+            return result
+        
+        now = datetime.utcnow()
+        old_statuses = {b.id: b.status for b in changed}
+        
+        # Места освобождаются при выходе из ACTIVE_BOOKING_STATUSES
+        # и занимаются снова при возврате (как в update_status)
+        deltas = {}
+        for b in changed:
+            delta = BookingService._seats_delta(b.status, new_status, b.participants_count)
+            if delta and b.tour_schedule_id:
+                deltas[b.tour_schedule_id] = deltas.get(b.tour_schedule_id, 0) + delta
+        
+        values = {'status': new_status}
+        if new_status == 'confirmed':
+            values['confirmed_at'] = func.coalesce(Booking.confirmed_at, now)
+        elif new_status == 'paid':
+            values['paid_at'] = func.coalesce(Booking.paid_at, now)
+            values['confirmed_at'] = func.coalesce(Booking.confirmed_at, now)
+        if new_status == 'cancelled':
+            values['cancelled_at'] = func.coalesce(Booking.cancelled_at, now)
+        else:
+            values['cancelled_at'] = None
+        if notes:
+            line = f"[{now}] {notes}"
+            values['notes'] = case(
+                (func.coalesce(Booking.notes, '') == '', line),
+                else_=Booking.notes + '\n' + line
+            )
+        
+        db.execute(
+            update(Booking).where(
+                Booking.id.in_(result['updated'])
+            ).values(**values).execution_options(synchronize_session=False)
+        )
+        
+        BookingService._adjust_booked_slots(db, deltas)
+        
+        # Объекты в сессии обновляем без повторного UPDATE — нужны для событий
+        for b in changed:
+            set_committed_value(b, 'status', new_status)
+        BookingEvents.record_many(db, changed, new_status, old_statuses=old_statuses)
+        
+        db.commit()
+        return result
+    
+    @staticmethod
+    def _check_reactivation_seats(db: Session, changed: List[Booking], new_status: str) -> List[dict]:
+        """
+        Бронирования, которым не хватает мест при возврате в активный статус.
+        
+        Слоты блокируются (в порядке id), свободные места — available_slots -
+        booked_slots; бронирования занимают их по порядку id.
+        
+        Returns:
+            [{'booking_id', 'tour_schedule_id', 'error'}]
+        """
+        reactivated = [
+            b for b in changed
+            if b.tour_schedule_id and BookingService._seats_delta(b.status, new_status, b.participants_count) > 0
+        ]
+        if not reactivated:
+            return []
+        
+        rows = db.query(
+            TourSchedule.id, TourSchedule.available_slots, TourSchedule.booked_slots
+        ).filter(
+            TourSchedule.id.in_({b.tour_schedule_id for b in reactivated})
+        ).order_by(TourSchedule.id).with_for_update().all()
+        free = {schedule_id: (available or 0) - (booked or 0) for schedule_id, available, booked in rows}
+        
+        failed = []
+        for b in reactivated:
+            if b.participants_count > free.get(b.tour_schedule_id, 0):
+                failed.append({
+                    'booking_id': b.id,
+                    'tour_schedule_id': b.tour_schedule_id,
+                    'error': f"Недостаточно мест. Свободно: {max(0, free.get(b.tour_schedule_id, 0))}"
+                })
+            else:
+                free[b.tour_schedule_id] -= b.participants_count
+        return failed
+    
+    @staticmethod
+    def _seats_delta(old_status: str, new_status: str, participants_count: int) -> int:
+        """Изменение занятых мест при смене статуса: +участники, -участники или 0"""
+        was_active = old_status in ACTIVE_BOOKING_STATUSES
+        is_active = new_status in ACTIVE_BOOKING_STATUSES
+        if was_active == is_active:
+            return 0
+        return participants_count if is_active else -participants_count
+    
+    @staticmethod
+    def _adjust_booked_slots(db: Session, deltas: dict) -> None:
+        """
+        Изменение booked_slots нескольких слотов одним executemany UPDATE
+        
+        deltas: {tour_schedule_id: +занято / -освобождено}
+        """
+        if not deltas:
+            return
+        schedules_table = TourSchedule.__table__
+        db.execute(
+            update(schedules_table).where(
+                schedules_table.c.id == bindparam('schedule_id')
+            ).values(
+                booked_slots=func.greatest(
+                    func.coalesce(schedules_table.c.booked_slots, 0) + bindparam('delta'), 0
+                )
+            ),
+            [
+                {'schedule_id': schedule_id, 'delta': delta}
+                for schedule_id, delta in deltas.items()
+            ]
+        )
+    
     @staticmethod
     def cancel_booking(
         db: Session,
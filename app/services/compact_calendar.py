@@ -0,0 +1,120 @@
+# app/services/compact_calendar.py
+"""
+Компактный формат календаря бизнеса (/business/calendar?format=compact).
+
+Названия туров, инструкторов и ресурсов передаются один раз справочниками,
+слоты — параллельными массивами полей по дням. Слоты читаются одним
+запросом серверным курсором (ресурсы слота — array_agg в том же запросе),
+JSON пишется по мере чтения: каждый день уходит клиенту, как только собран.
+
+Генератор открывает свою сессию БД — сессия запроса закрывается раньше,
+чем StreamingResponse дочитает данные.
+"""
+import json
+from datetime import date
+from typing import Iterator
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import array
+
+from app.core.database import SessionLocal
+from app.models.resource import Instructor, Resource, ScheduleResource
+from app.models.tour import Tour, TourSchedule
+
+BATCH_SIZE = 1000
+
+# Поля слота — по массиву на каждое в каждом дне
+COLUMNS = [
+    'id', 'tour_id', 'start_time', 'end_time', 'available_slots',
+    'booked_slots', 'status', 'instructor_id', 'price_override', 'resources'
+]
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _hhmm(value) -> str:
+    return value.strftime('%H:%M') if value else None
+
+
+def stream_compact_calendar(business_id: int, from_date: date, to_date: date) -> Iterator[str]:
+    """
+    JSON вида:
+        {"tours": {id: {"name", "base_price"}}, "instructors": {id: имя},
+         "resources": {id: имя}, "columns": [...],
+         "days": [{"date": ..., "id": [...], "tour_id": [...], ...}]}
+
+    Цена слота — price_override (null — базовая цена тура из справочника),
+    ресурсы слота — пары [resource_id, quantity_used].
+    """
+    db = SessionLocal()
+    try:
+        tours = {
+            tour_id: {'name': name, 'base_price': float(base_price) if base_price is not None else None}
+            for tour_id, name, base_price in db.query(Tour.id, Tour.name, Tour.base_price).filter(
+                Tour.business_id == business_id
+            )
+        }
+        instructors = dict(db.query(Instructor.id, Instructor.full_name).filter(
+            Instructor.business_id == business_id
+        ).all())
+        resources = dict(db.query(Resource.id, Resource.name).filter(
+            Resource.business_id == business_id
+        ).all())
+
+        yield (
+            f'{{"from_date":"{from_date}","to_date":"{to_date}","format":"compact",'
+            f'"tours":{_dumps(tours)},"instructors":{_dumps(instructors)},'
+            f'"resources":{_dumps(resources)},"columns":{_dumps(COLUMNS)},"days":['
+        )
+
+        slot_resources = db.query(
+            func.array_agg(array([ScheduleResource.resource_id, ScheduleResource.quantity_used]))
+        ).filter(
+            ScheduleResource.tour_schedule_id == TourSchedule.id
+        ).correlate(TourSchedule).scalar_subquery()
+
+        rows = db.query(
+            TourSchedule.date,
+            TourSchedule.id,
+            TourSchedule.tour_id,
+            TourSchedule.start_time,
+            TourSchedule.end_time,
+            TourSchedule.available_slots,
+            TourSchedule.booked_slots,
+            TourSchedule.status,
+            TourSchedule.instructor_id,
+            TourSchedule.price_override,
+            slot_resources
+        ).filter(
+            TourSchedule.tour_id.in_(list(tours) or [0]),
+            TourSchedule.date >= from_date,
+            TourSchedule.date <= to_date
+        ).order_by(TourSchedule.date, TourSchedule.start_time, TourSchedule.id).yield_per(BATCH_SIZE)
+
+        current_date, day, first = None, None, True
+        for row in rows:
+            if row[0] != current_date:
+                if day is not None:
+                    yield ('' if first else ',') + _dumps(day)
+                    first = False
+                current_date = row[0]
+                day = {'date': current_date.isoformat(), **{c: [] for c in COLUMNS}}
+
+            day['id'].append(row[1])
+            day['tour_id'].append(row[2])
+            day['start_time'].append(_hhmm(row[3]))
+            day['end_time'].append(_hhmm(row[4]))
+            day['available_slots'].append(row[5])
+            day['booked_slots'].append(row[6] or 0)
+            day['status'].append(row[7])
+            day['instructor_id'].append(row[8])
+            day['price_override'].append(float(row[9]) if row[9] is not None else None)
+            day['resources'].append(row[10] or [])
+
+        if day is not None:
+            yield ('' if first else ',') + _dumps(day)
+        yield ']}'
+    finally:
+        db.close()
@@ -0,0 +1,149 @@
+# app/services/dashboard.py
+"""
+Дашборд бизнеса — первый экран оператора.
+
+Все показатели считаются одним запросом (скалярные подзапросы и агрегаты
+с FILTER), загрузка на 7 дней собирается json_agg в том же запросе.
+Результат кешируется в памяти процесса на DASHBOARD_CACHE_SECONDS
+отдельно для каждого бизнеса.
+"""
+import copy
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.activity import Activity, Location
+from app.models.booking import ACTIVE_BOOKING_STATUSES, Booking
+from app.models.review import Review
+from app.models.tour import Tour, TourSchedule
+from app.services.metrics_rollup import REVENUE_STATUSES
+
+OCCUPANCY_DAYS = 7
+
+
+class DashboardService:
+    """Сводка для дашборда с кешем по бизнесу"""
+
+    _cache: Dict[int, Tuple[float, dict]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, db: Session, business_id: int) -> dict:
+        now = time.monotonic()
+        with cls._lock:
+            cached = cls._cache.get(business_id)
+            if cached and cached[0] > now:
+                return copy.deepcopy(cached[1])
+
+        data = DashboardService.build(db, business_id)
+
+        with cls._lock:
+            cls._cache[business_id] = (now + settings.DASHBOARD_CACHE_SECONDS, data)
+        return copy.deepcopy(data)
+
+    @classmethod
+    def invalidate(cls, business_id: Optional[int] = None) -> None:
+        with cls._lock:
+            if business_id is None:
+                cls._cache.clear()
+            else:
+                cls._cache.pop(business_id, None)
+
+    @staticmethod
+    def build(db: Session, business_id: int, today: Optional[date] = None) -> dict:
+        """Сводка одним запросом к БД"""
+        today = today or date.today()
+        week_end = today + timedelta(days=OCCUPANCY_DAYS - 1)
+        month_start = datetime.combine(today.replace(day=1), datetime.min.time())
+
+        def count_of(model, *filters):
+            return select(func.count()).select_from(model).where(*filters).scalar_subquery()
+
+        business_tours = select(Tour.id).where(Tour.business_id == business_id)
+
+        # Бронирования бизнеса — одним проходом
+        is_active = Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+        is_today = TourSchedule.date == today
+        is_upcoming = TourSchedule.date >= today
+        bookings = select(
+            func.count(Booking.id).label('total'),
+            func.count(Booking.id).filter(is_today, is_active).label('today'),
+            func.coalesce(func.sum(Booking.participants_count).filter(is_today, is_active), 0).label('today_participants'),
+            func.count(Booking.id).filter(is_upcoming, is_active).label('upcoming'),
+            func.count(Booking.id).filter(is_upcoming, Booking.status == 'pending').label('pending'),
+            func.coalesce(func.sum(Booking.total_price).filter(
+                Booking.created_at >= month_start, Booking.status.in_(REVENUE_STATUSES)
+            ), 0).label('revenue_mtd'),
+        ).select_from(Booking).join(
+            TourSchedule, TourSchedule.id == Booking.tour_schedule_id
+        ).where(TourSchedule.tour_id.in_(business_tours)).subquery()
+
+        # Загрузка по дням: места и занятые (счётчик booked_slots)
+        days = select(
+            TourSchedule.date.label('day'),
+            func.sum(TourSchedule.available_slots).label('capacity'),
+            func.sum(func.coalesce(TourSchedule.booked_slots, 0)).label('booked'),
+        ).where(
+            TourSchedule.tour_id.in_(business_tours),
+            TourSchedule.date.between(today, week_end)
+        ).group_by(TourSchedule.date).subquery()
+        occupancy = select(func.json_agg(aggregate_order_by(
+            func.json_build_object('date', days.c.day, 'capacity', days.c.capacity, 'booked', days.c.booked),
+            days.c.day
+        ))).scalar_subquery()
+
+        row = db.execute(select(
+            count_of(Activity, Activity.business_id == business_id).label('activities'),
+            count_of(Tour, Tour.business_id == business_id).label('tours'),
+            count_of(Location, Location.business_id == business_id).label('locations'),
+            count_of(
+                Review, Review.tour_id.in_(business_tours),
+                Review.business_reply.is_(None), Review.is_published.is_(True)
+            ).label('unanswered_reviews'),
+            bookings.c.total, bookings.c.today, bookings.c.today_participants,
+            bookings.c.upcoming, bookings.c.pending, bookings.c.revenue_mtd,
+            occupancy.label('occupancy'),
+        ).select_from(bookings)).one()
+
+        by_day = {item['date']: item for item in (row.occupancy or [])}
+        occupancy_days = []
+        for i in range(OCCUPANCY_DAYS):
+            day = str(today + timedelta(days=i))
+            item = by_day.get(day, {'capacity': 0, 'booked': 0})
+            capacity, booked = int(item['capacity'] or 0), int(item['booked'] or 0)
+            occupancy_days.append({
+                'date': day,
+                'capacity': capacity,
+                'booked': booked,
+                'occupancy': round(booked / capacity, 3) if capacity else 0
+            })
+        week_capacity = sum(d['capacity'] for d in occupancy_days)
+        week_booked = sum(d['booked'] for d in occupancy_days)
+
+        return {
+            'stats': {
+                'activities': row.activities,
+                'tours': row.tours,
+                'locations': row.locations,
+                'bookings': row.total,
+            },
+            'bookings_today': row.today,
+            'participants_today': int(row.today_participants),
+            'upcoming_bookings': row.upcoming,
+            'pending_confirmations': row.pending,
+            'unanswered_reviews': row.unanswered_reviews,
+            'revenue_month_to_date': float(row.revenue_mtd),
+            'occupancy_next_7_days': {
+                'capacity': week_capacity,
+                'booked': week_booked,
+                'occupancy': round(week_booked / week_capacity, 3) if week_capacity else 0,
+                'days': occupancy_days
+            },
+            'generated_at': datetime.utcnow().isoformat()
+        }
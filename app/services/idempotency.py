@@ -0,0 +1,181 @@
+# app/services/idempotency.py
+"""
+Сервис идемпотентности POST-запросов.
+
+Клиент передаёт заголовок Idempotency-Key. Первый запрос с ключом
+«захватывает» его и выполняется, ответ сохраняется в idempotency_keys.
+Повтор с тем же ключом получает сохранённый ответ без повторного выполнения,
+а параллельный дубликат ждёт, пока первый запрос завершится.
+
+Ключи живут IDEMPOTENCY_KEY_TTL_HOURS, после чего могут быть использованы заново.
+Захват в статусе processing — аренда на IDEMPOTENCY_PROCESSING_TIMEOUT_SECONDS
+от created_at: если процесс умер между захватом и сохранением ответа,
+повтор по истечении аренды захватывает ключ заново. Каждый захват получает
+свой токен; complete() и release() меняют ключ только по токену, поэтому
+запрос, у которого аренду перехватили, не затрёт ответ нового владельца.
+"""
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.idempotency import IdempotencyKey
+
+# Результаты захвата ключа
+EXECUTE = 'execute'          # ключ захвачен — выполняем запрос
+REPLAY = 'replay'            # есть сохранённый ответ — возвращаем его
+IN_PROGRESS = 'in_progress'  # первый запрос ещё выполняется
+MISMATCH = 'mismatch'        # ключ уже использован с другим телом запроса
+
+
+class IdempotencyService:
+    """Хранилище ключей идемпотентности с TTL"""
+
+    POLL_INTERVAL = 0.2  # секунд между проверками при ожидании
+
+    @staticmethod
+    def fingerprint(payload: dict) -> str:
+        """Отпечаток тела запроса (sha256 от канонического JSON)"""
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def claim(
+        scope: str,
+        key: str,
+        request_hash: str
+    ) -> Tuple[str, Any]:
+        """
+        Попытка захватить ключ.
+
+        Работает в отдельной сессии и коммитит сразу, чтобы захват был виден
+        параллельным запросам до завершения основной транзакции.
+
+        Returns:
+            (результат, токен захвата для EXECUTE |
+             (http-статус, тело ответа) для REPLAY | None)
+        """
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        db = SessionLocal()
+        try:
+            # Просроченный ключ и брошенный захват (аренда истекла) можно использовать заново
+            stale_before = now - timedelta(seconds=settings.IDEMPOTENCY_PROCESSING_TIMEOUT_SECONDS)
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                or_(
+                    IdempotencyKey.expires_at < now,
+                    and_(IdempotencyKey.status == 'processing', IdempotencyKey.created_at < stale_before)
+                )
+            ).delete(synchronize_session=False)
+
+            inserted_id = db.execute(
+                insert(IdempotencyKey).values(
+                    scope=scope,
+                    key=key,
+                    request_hash=request_hash,
+                    token=token,
+                    status='processing',
+                    created_at=now,
+                    expires_at=now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+                ).on_conflict_do_nothing(
+                    constraint='uq_idempotency_keys_scope_key'
+                ).returning(IdempotencyKey.id)
+            ).scalar()
+            db.commit()
+
+            if inserted_id is not None:
+                return EXECUTE, token
+
+            record = db.query(IdempotencyKey).filter(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key
+            ).first()
+
+            if record is None:
+                # Ключ освободили между INSERT и SELECT — пробуем ещё раз
+                return IN_PROGRESS, None
+            if record.request_hash != request_hash:
+                return MISMATCH, None
+            if record.status == 'completed':
+                return REPLAY, (record.response_status, record.response_body)
+            return IN_PROGRESS, None
+        finally:
+            db.close()
+
+    @staticmethod
+    async def acquire(
+        scope: str,
+        key: str,
+        request_hash: str
+    ) -> Tuple[str, Any]:
+        """
+        Захват ключа с ожиданием: если первый запрос ещё выполняется,
+        ждём его ответа не дольше IDEMPOTENCY_WAIT_SECONDS.
+        """
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+
+        while True:
+            state, stored = IdempotencyService.claim(scope, key, request_hash)
+            if state != IN_PROGRESS or time.monotonic() >= deadline:
+                return state, stored
+            await asyncio.sleep(IdempotencyService.POLL_INTERVAL)
+
+    @staticmethod
+    def complete(scope: str, key: str, token: str, status_code: int, body: dict) -> bool:
+        """
+        Сохранение ответа для последующих повторов.
+
+        Returns:
+            False, если захват уже не наш (аренда истекла и ключ перехвачен)
+        """
+        db = SessionLocal()
+        try:
+            updated = db.query(IdempotencyKey).filter(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.token == token,
+                IdempotencyKey.status == 'processing'
+            ).update({
+                'status': 'completed',
+                'response_status': status_code,
+                'response_body': body
+            }, synchronize_session=False)
+            db.commit()
+            return updated > 0
+        finally:
+            db.close()
+
+    @staticmethod
+    def release(scope: str, key: str, token: str) -> None:
+        """Освобождение ключа, если запрос завершился ошибкой — повтор выполнится заново"""
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.token == token,
+                IdempotencyKey.status == 'processing'
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def purge_expired(db: Session) -> int:
+        """Удаление просроченных ключей"""
+        deleted = db.query(IdempotencyKey).filter(
+            IdempotencyKey.expires_at < datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
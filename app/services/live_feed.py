@@ -0,0 +1,229 @@
+# app/services/live_feed.py
+"""
+Живая лента бронирований для CRM (Server-Sent Events).
+
+Один слушатель на процесс: отдельный поток держит своё соединение с
+LISTEN booking_events, по сигналу (или раз в LIVE_FEED_POLL_SECONDS)
+одним запросом читает новые события из booking_events и раскладывает их
+по очередям подключённых клиентов своего бизнеса. Число клиентов не
+влияет на нагрузку на БД.
+
+Поток запускается с первым подписчиком и останавливается, когда
+подписчиков не осталось.
+
+При переподключении пропущенное дочитывается из БД, но не больше
+FETCH_LIMIT событий: если клиент отстал сильнее, он получает одно
+событие resync (перезагрузить списки) и продолжает с текущего события.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.models.booking import BookingEvent
+from app.models.tour import Tour, TourSchedule
+from app.services.booking_events import NOTIFY_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+FETCH_LIMIT = 500
+# Событие с меньшим id может зафиксироваться позже большего — последние
+# секунды перечитываем, уже отправленные id отсеиваем
+RESCAN_SECONDS = 10
+RECONNECT_SECONDS = 5
+
+
+def fetch_events(
+    db: Session,
+    after_id: int,
+    business_id: Optional[int] = None,
+    rescan_seconds: int = 0,
+    limit: int = FETCH_LIMIT
+) -> List[dict]:
+    """События после after_id (и за последние rescan_seconds) с бизнесом слота"""
+    new = BookingEvent.id > after_id
+    if rescan_seconds:
+        new = or_(new, BookingEvent.created_at >= func.now() - timedelta(seconds=rescan_seconds))
+
+    query = db.query(
+        BookingEvent.id,
+        BookingEvent.event_type,
+        BookingEvent.booking_id,
+        BookingEvent.tour_schedule_id,
+        BookingEvent.payload,
+        BookingEvent.created_at,
+        Tour.business_id
+    ).join(
+        TourSchedule, TourSchedule.id == BookingEvent.tour_schedule_id
+    ).join(
+        Tour, Tour.id == TourSchedule.tour_id
+    ).filter(new)
+    if business_id is not None:
+        query = query.filter(Tour.business_id == business_id)
+
+    return [{
+        'id': row.id,
+        'event_type': row.event_type,
+        'booking_id': row.booking_id,
+        'tour_schedule_id': row.tour_schedule_id,
+        'business_id': row.business_id,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'booking': row.payload,
+    } for row in query.order_by(BookingEvent.id).limit(limit).all()]
+
+
+def fetch_backlog(db: Session, after_id: int, business_id: int) -> List[dict]:
+    """
+    Пропущенные клиентом события бизнеса. Больше FETCH_LIMIT — вместо них
+    одно событие resync с id последнего события.
+    """
+    events = fetch_events(db, after_id, business_id, limit=FETCH_LIMIT + 1)
+    if len(events) <= FETCH_LIMIT:
+        return events
+    last_id = db.query(func.max(BookingEvent.id)).scalar()
+    return [{'id': last_id, 'event_type': 'resync', 'business_id': business_id}]
+
+
+def format_sse(event: dict) -> str:
+    """Событие в формате text/event-stream"""
+    data = {k: v for k, v in event.items() if k != 'business_id'}
+    return f"id: {event['id']}\nevent: {event['event_type']}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class Subscriber:
+    """Очередь одного подключённого клиента (живёт в event loop запроса)"""
+
+    def __init__(self, business_id: int, loop: asyncio.AbstractEventLoop):
+        self.business_id = business_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.LIVE_FEED_QUEUE_SIZE)
+        self.overflowed = False
+
+    def push(self, event: dict) -> None:
+        """Из потока слушателя — передаём в event loop клиента"""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: dict) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Клиент не успевает читать — закрываем поток, он переподключится
+            # с Last-Event-ID и дочитает пропущенное из БД
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class BookingFeed:
+    """Один слушатель NOTIFY на процесс и раздача событий подписчикам"""
+
+    _subscribers: Dict[int, Set[Subscriber]] = {}
+    _lock = threading.Lock()
+    _thread: Optional[threading.Thread] = None
+    _last_id = 0
+    _sent: Dict[int, float] = {}
+
+    @classmethod
+    def subscribe(cls, business_id: int) -> Subscriber:
+        subscriber = Subscriber(business_id, asyncio.get_running_loop())
+        with cls._lock:
+            cls._subscribers.setdefault(business_id, set()).add(subscriber)
+            if cls._thread is None or not cls._thread.is_alive():
+                cls._thread = threading.Thread(target=cls._run, name="booking-feed", daemon=True)
+                cls._thread.start()
+        return subscriber
+
+    @classmethod
+    def unsubscribe(cls, subscriber: Subscriber) -> None:
+        with cls._lock:
+            subscribers = cls._subscribers.get(subscriber.business_id)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del cls._subscribers[subscriber.business_id]
+
+    @classmethod
+    def _active(cls) -> bool:
+        """
+        Продолжать ли слушателю работу. Проверка и сброс _thread — под тем же
+        замком, что и запуск в subscribe(): остановившийся слушатель не
+        возобновится рядом с уже запущенным новым.
+        """
+        with cls._lock:
+            if cls._thread is not threading.current_thread():
+                return False
+            if not cls._subscribers:
+                cls._thread = None
+                return False
+            return True
+
+    @classmethod
+    def dispatch(cls, events: List[dict]) -> int:
+        """Раздача событий подписчикам их бизнеса (повторно не отправляем)"""
+        delivered = 0
+        now = time.monotonic()
+        with cls._lock:
+            for event in events:
+                if event['id'] in cls._sent:
+                    continue
+                cls._sent[event['id']] = now
+                cls._last_id = max(cls._last_id, event['id'])
+                for subscriber in cls._subscribers.get(event['business_id'], ()):
+                    subscriber.push(event)
+                    delivered += 1
+            # Отправленные id нужны только на окно перечитывания
+            expired = now - RESCAN_SECONDS * 2
+            for event_id in [i for i, t in cls._sent.items() if t < expired]:
+                del cls._sent[event_id]
+        return delivered
+
+    @classmethod
+    def poll(cls) -> int:
+        """Прочитать новые события и раздать (один запрос на процесс)"""
+        db = SessionLocal()
+        try:
+            events = fetch_events(db, cls._last_id, rescan_seconds=RESCAN_SECONDS)
+        finally:
+            db.close()
+        return cls.dispatch(events)
+
+    @classmethod
+    def _run(cls) -> None:
+        while cls._active():
+            connection = None
+            try:
+                # Отдельное соединение вне пула: LISTEN не должен попасть к другим запросам
+                connection = engine.raw_connection()
+                raw = connection.driver_connection
+                connection.detach()
+                raw.autocommit = True
+                with raw.cursor() as cursor:
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    cursor.execute("SELECT coalesce(max(id), 0) FROM booking_events")
+                    with cls._lock:
+                        if not cls._last_id:
+                            cls._last_id = cursor.fetchone()[0]
+
+                while cls._active():
+                    ready, _, _ = select.select([raw], [], [], settings.LIVE_FEED_POLL_SECONDS)
+                    if ready:
+                        raw.poll()
+                        raw.notifies.clear()
+                    cls.poll()
+            except Exception:
+                logger.exception("Слушатель ленты бронирований упал, переподключение")
+                time.sleep(RECONNECT_SECONDS)
+            finally:
+                if connection is not None:
+                    connection.close()
@@ -0,0 +1,240 @@
+# app/services/metrics_rollup.py
+"""
+Дневные итоги бронирований (business_daily_metrics).
+
+Строка — тур × день создания бронирований: количество по статусам,
+участники и выручка (confirmed / paid / completed). Инкрементально
+пересчитываются только дни, затронутые новыми событиями booking_events
+(курсор в job_cursors); пересчёт дня идёт целиком из bookings, поэтому
+повторная обработка события безопасна.
+
+Первичное заполнение / пересчёт периода:
+    python -m app.services.metrics_rollup [--from 2026-01-01] [--to 2026-12-31]
+"""
+import argparse
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, insert, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.booking import Booking, BookingEvent
+from app.models.metrics import BusinessDailyMetric
+from app.models.tour import Tour, TourSchedule
+from app.services.booking_events import BookingEvents
+
+logger = logging.getLogger(__name__)
+
+CURSOR_NAME = 'business_daily_metrics'
+STATUSES = ['pending', 'confirmed', 'paid', 'cancelled', 'completed']
+REVENUE_STATUSES = ['confirmed', 'paid', 'completed']
+
+
+class MetricsRollup:
+    """Пересчёт и чтение дневных итогов"""
+
+    @staticmethod
+    def _aggregate(db: Session, *filters) -> List[dict]:
+        """Итоги из bookings по тур × день для отфильтрованных бронирований"""
+        day = func.date(Booking.created_at)
+        is_revenue = Booking.status.in_(REVENUE_STATUSES)
+
+        rows = db.query(
+            Tour.business_id,
+            TourSchedule.tour_id,
+            day,
+            func.count(Booking.id),
+            *[func.count(Booking.id).filter(Booking.status == s) for s in STATUSES],
+            func.coalesce(func.sum(Booking.participants_count).filter(is_revenue), 0),
+            func.coalesce(func.sum(Booking.total_price).filter(is_revenue), 0)
+        ).join(
+            TourSchedule, TourSchedule.id == Booking.tour_schedule_id
+        ).join(
+            Tour, Tour.id == TourSchedule.tour_id
+        ).filter(*filters).group_by(Tour.business_id, TourSchedule.tour_id, day).all()
+
+        now = datetime.utcnow()
+        return [{
+            'business_id': row[0],
+            'tour_id': row[1],
+            'date': row[2],
+            'bookings_count': row[3],
+            **{f'{s}_count': row[4 + i] for i, s in enumerate(STATUSES)},
+            'participants': row[9],
+            'revenue': row[10],
+            'updated_at': now,
+        } for row in rows]
+
+    @staticmethod
+    def refresh_days(db: Session, keys: Iterable[Tuple[int, date]]) -> None:
+        """Пересчёт дней (tour_id, date) целиком (без commit)"""
+        keys = list(set(keys))
+        if not keys:
+            return
+
+        rows = MetricsRollup._aggregate(
+            db, tuple_(TourSchedule.tour_id, func.date(Booking.created_at)).in_(keys)
+        )
+        db.query(BusinessDailyMetric).filter(
+            tuple_(BusinessDailyMetric.tour_id, BusinessDailyMetric.date).in_(keys)
+        ).delete(synchronize_session=False)
+        if rows:
+            db.execute(insert(BusinessDailyMetric), rows)
+
+    @staticmethod
+    def _event_day(event: BookingEvent) -> date:
+        """День создания бронирования из события (для старых событий — день события)"""
+        created_at = (event.payload or {}).get('created_at')
+        if created_at:
+            return datetime.fromisoformat(created_at).date()
+        return event.created_at.date()
+
+    @staticmethod
+    def run_incremental(
+        db: Session,
+        batch_size: Optional[int] = None,
+        lag_seconds: Optional[int] = None
+    ) -> int:
+        """
+        Пересчёт дней, затронутых событиями после курсора (одна пачка).
+
+        Returns:
+            обработано событий
+        """
+        cursor = BookingEvents.lock_cursor(db, CURSOR_NAME)
+        events = BookingEvents.since(
+            db, cursor.position, batch_size or settings.RECONCILE_BATCH_SIZE, lag_seconds
+        )
+        if not events:
+            db.rollback()
+            return 0
+
+        schedule_ids = {e.tour_schedule_id for e in events if e.tour_schedule_id}
+        tour_of = dict(db.query(TourSchedule.id, TourSchedule.tour_id).filter(
+            TourSchedule.id.in_(schedule_ids)
+        ).all()) if schedule_ids else {}
+
+        # Слот удалён — вместе с ним ушли и бронирования, пересчитывать нечего
+        MetricsRollup.refresh_days(db, [
+            (tour_of[e.tour_schedule_id], MetricsRollup._event_day(e))
+            for e in events if e.tour_schedule_id in tour_of
+        ])
+
+        cursor.position = events[-1].id
+        db.commit()
+        return len(events)
+
+    @staticmethod
+    def backfill(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None) -> int:
+        """
+        Полный пересчёт периода помесячно (commit на месяц).
+        Курсор переносится на последнее событие на момент старта.
+
+        Returns:
+            записано строк итогов
+        """
+        start_position = db.query(func.coalesce(func.max(BookingEvent.id), 0)).scalar()
+
+        if date_from is None or date_to is None:
+            first, last = db.query(
+                func.min(func.date(Booking.created_at)), func.max(func.date(Booking.created_at))
+            ).one()
+            date_from = date_from or first
+            date_to = date_to or last
+        if not date_from or not date_to:
+            return 0
+
+        written = 0
+        month = date_from.replace(day=1)
+        while month <= date_to:
+            next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+            start = max(month, date_from)
+            end = min(next_month, date_to + timedelta(days=1))
+
+            rows = MetricsRollup._aggregate(
+                db,
+                Booking.created_at >= datetime.combine(start, time.min),
+                Booking.created_at < datetime.combine(end, time.min)
+            )
+            db.query(BusinessDailyMetric).filter(
+                BusinessDailyMetric.date >= start,
+                BusinessDailyMetric.date < end
+            ).delete(synchronize_session=False)
+            if rows:
+                db.execute(insert(BusinessDailyMetric), rows)
+            db.commit()
+
+            written += len(rows)
+            month = next_month
+
+        cursor = BookingEvents.lock_cursor(db, CURSOR_NAME)
+        cursor.position = max(cursor.position, start_position)
+        db.commit()
+        return written
+
+    @staticmethod
+    def _query(db: Session, business_id: int, date_from: Optional[date], date_to: Optional[date], *columns):
+        query = db.query(*columns).filter(BusinessDailyMetric.business_id == business_id)
+        if date_from:
+            query = query.filter(BusinessDailyMetric.date >= date_from)
+        if date_to:
+            query = query.filter(BusinessDailyMetric.date <= date_to)
+        return query
+
+    @staticmethod
+    def totals(db: Session, business_id: int, date_from: Optional[date], date_to: Optional[date]) -> dict:
+        """Итоги за период в формате /business/bookings/stats"""
+        m = BusinessDailyMetric
+        row = MetricsRollup._query(
+            db, business_id, date_from, date_to,
+            func.coalesce(func.sum(m.bookings_count), 0),
+            *[func.coalesce(func.sum(getattr(m, f'{s}_count')), 0) for s in STATUSES],
+            func.coalesce(func.sum(m.revenue), 0),
+            func.coalesce(func.sum(m.participants), 0)
+        ).one()
+
+        return {
+            'total': int(row[0]),
+            'by_status': {s: int(row[1 + i]) for i, s in enumerate(STATUSES)},
+            'total_revenue': float(row[6]),
+            'total_participants': int(row[7])
+        }
+
+    @staticmethod
+    def series(
+        db: Session,
+        business_id: int,
+        period: str,
+        date_from: date,
+        date_to: date
+    ) -> Dict[date, tuple]:
+        """Итоги по интервалам: {начало интервала: (бронирований, отмен, выручка, участники)}"""
+        m = BusinessDailyMetric
+        bucket = func.date_trunc(period, m.date).label('bucket')
+        rows = MetricsRollup._query(
+            db, business_id, date_from, date_to,
+            bucket,
+            func.sum(m.bookings_count),
+            func.sum(m.cancelled_count),
+            func.sum(m.revenue),
+            func.sum(m.participants)
+        ).group_by(bucket).all()
+        return {row[0].date(): tuple(row[1:]) for row in rows}
+
+
+if __name__ == "__main__":
+    from app.core.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Пересчёт business_daily_metrics")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="начало периода (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="конец периода (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    db = SessionLocal()
+    try:
+        logger.info("Записано строк итогов: %s", MetricsRollup.backfill(db, args.date_from, args.date_to))
+    finally:
+        db.close()
@@ -0,0 +1,63 @@
+# app/services/notifications.py
+"""
+Отправители уведомлений по событиям бронирований.
+
+Конкретные провайдеры (SMS, email) подключаются как наследники
+NotificationSender и регистрируются в SENDERS. Список активных
+отправителей задаётся настройкой NOTIFICATION_SENDERS.
+"""
+import logging
+from typing import Dict, List, Type
+
+from app.core.config import settings
+from app.models.booking import BookingEvent
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationSender:
+    """Базовый отправитель. send() бросает исключение, если доставка не удалась"""
+    name = 'base'
+
+    def send(self, event: BookingEvent) -> None:
+        raise NotImplementedError
+
+
+class LogSender(NotificationSender):
+    """Пишет событие в лог (по умолчанию, пока нет реальных провайдеров)"""
+    name = 'log'
+
+    def send(self, event: BookingEvent) -> None:
+        logger.info(
+            "Уведомление: бронирование %s — %s",
+            (event.payload or {}).get('booking_code'), event.event_type
+        )
+
+
+class StubSender(NotificationSender):
+    """Локальная заглушка для тестов: запоминает события, может имитировать сбой"""
+    name = 'stub'
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.sent: List[BookingEvent] = []
+
+    def send(self, event: BookingEvent) -> None:
+        if self.fail:
+            raise RuntimeError("Провайдер недоступен")
+        self.sent.append(event)
+
+
+SENDERS: Dict[str, Type[NotificationSender]] = {
+    LogSender.name: LogSender,
+    StubSender.name: StubSender,
+}
+
+
+def get_senders() -> List[NotificationSender]:
+    """Отправители из настройки NOTIFICATION_SENDERS"""
+    names = [name.strip() for name in settings.NOTIFICATION_SENDERS.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SENDERS]
+    if unknown:
+        raise ValueError(f"Неизвестные отправители уведомлений: {', '.join(unknown)}")
+    return [SENDERS[name]() for name in names]
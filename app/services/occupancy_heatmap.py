@@ -0,0 +1,100 @@
+# app/services/occupancy_heatmap.py
+"""
+Тепловая карта загрузки ресурсов для календаря бизнеса.
+
+Для каждого ресурса и интервала (день или час) — пиковая доля занятых
+единиц от Resource.quantity. Интервалы занятости берутся одним запросом
+(ResourceOccupancy.intervals); с NumPy загрузка считается векторно:
+дельты начала/конца раскладываются на поминутную шкалу периода,
+cumsum даёт занятость в каждую минуту, max по интервалу — пик.
+Без NumPy тот же результат собирается из ступеней ResourceOccupancy.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import List, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.models.resource import Resource
+from app.services.resource_occupancy import DAY_MINUTES, ResourceOccupancy
+
+try:
+    import numpy as np
+except ImportError:  # необязательная зависимость — есть медленный путь
+    np = None
+
+BUCKET_MINUTES = {'day': DAY_MINUTES, 'hour': 60}
+MAX_DAYS = {'day': 366, 'hour': 31}
+
+
+def bucket_labels(date_from: date, days: int, bucket: str) -> List[str]:
+    if bucket == 'day':
+        return [(date_from + timedelta(days=i)).isoformat() for i in range(days)]
+    start = datetime.combine(date_from, time.min)
+    return [(start + timedelta(hours=i)).strftime('%Y-%m-%dT%H:%M') for i in range(days * 24)]
+
+
+def _peaks_numpy(intervals, index_of: dict, date_from: date, days: int, bucket_minutes: int):
+    """Пиковая занятость [ресурс × интервал] векторной развёрткой по минутам"""
+    total_minutes = days * DAY_MINUTES
+    usage = np.zeros((len(index_of), total_minutes + 1), dtype=np.int32)
+    if intervals:
+        rows = np.array([index_of[i[0]] for i in intervals])
+        offsets = np.array([(i[1] - date_from).days * DAY_MINUTES for i in intervals])
+        starts = offsets + np.array([i[2] for i in intervals])
+        ends = offsets + np.array([i[3] for i in intervals])
+        quantities = np.array([i[4] for i in intervals], dtype=np.int32)
+        np.add.at(usage, (rows, starts), quantities)
+        np.add.at(usage, (rows, ends), -quantities)
+        np.cumsum(usage, axis=1, out=usage)
+    return usage[:, :total_minutes].reshape(len(index_of), -1, bucket_minutes).max(axis=2).tolist()
+
+
+def _peaks_python(intervals, index_of: dict, date_from: date, days: int, bucket_minutes: int):
+    """То же через ступени ResourceOccupancy (без NumPy)"""
+    occupancy = ResourceOccupancy.from_intervals(intervals)
+
+    per_day = DAY_MINUTES // bucket_minutes
+    peaks = [[0] * (days * per_day) for _ in index_of]
+    for resource_id, row in index_of.items():
+        for day_number in range(days):
+            day = date_from + timedelta(days=day_number)
+            for start, end, used in occupancy.steps(resource_id, day):
+                if not used:
+                    continue
+                first = day_number * per_day + start // bucket_minutes
+                last = day_number * per_day + (end - 1) // bucket_minutes
+                for b in range(first, last + 1):
+                    peaks[row][b] = max(peaks[row][b], used)
+    return peaks
+
+
+def build_heatmap(
+    db: Session,
+    resources: Sequence[Resource],
+    date_from: date,
+    date_to: date,
+    bucket: str = 'day'
+) -> dict:
+    """Пиковая загрузка ресурсов по интервалам (колонками: метки + ряды долей)"""
+    days = (date_to - date_from).days + 1
+    bucket_minutes = BUCKET_MINUTES[bucket]
+    index_of = {r.id: row for row, r in enumerate(resources)}
+
+    intervals = ResourceOccupancy.intervals(db, index_of, date_from, date_to)
+    peaks_of = _peaks_numpy if np is not None else _peaks_python
+    peaks = peaks_of(intervals, index_of, date_from, days, bucket_minutes) if index_of else []
+
+    return {
+        'bucket': bucket,
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'buckets': bucket_labels(date_from, days, bucket),
+        'resources': [{
+            'resource_id': r.id,
+            'resource_name': r.name,
+            'resource_type': r.resource_type,
+            'total_quantity': r.quantity,
+            'peak_used': peaks[row],
+            'utilisation': [round(p / r.quantity, 3) if r.quantity else 0 for p in peaks[row]]
+        } for row, r in enumerate(resources)]
+    }
@@ -0,0 +1,104 @@
+# app/services/pagination.py
+"""
+Пагинация длинных списков CRM.
+
+Keyset (курсор): страница продолжается с последней строки предыдущей по
+(created_at, id) — без OFFSET, глубина страницы на скорость не влияет.
+Старый режим page/per_page сохранён; порядок у обоих одинаковый, поэтому
+next_cursor из ответа в режиме page тоже валиден.
+
+Общее количество: exact — COUNT(*), estimated — оценка планировщика
+(EXPLAIN, без выполнения запроса), none — не считать.
+
+Индексы курсора (ix_bookings_created_at_id, ix_reviews_tour_created_at_id)
+в существующую базу добавляет python -m app.core.schema.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import desc, tuple_
+from sqlalchemy.orm import Query, Session
+
+COUNT_MODES = ('exact', 'estimated', 'none')
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat() if created_at else None, row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Разбор курсора; ValueError при неверном формате"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Неверный курсор")
+
+
+def fetch_page(
+    query: Query,
+    created_col,
+    id_col,
+    per_page: int,
+    cursor: Optional[str] = None,
+    page: int = 1
+) -> Tuple[List, Optional[str]]:
+    """
+    Страница по убыванию (created_at, id): по курсору или по номеру страницы.
+
+    Returns:
+        (строки, курсор следующей страницы или None)
+    """
+    query = query.order_by(desc(created_col), desc(id_col))
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(created_col, id_col) < tuple_(created_at, row_id))
+    elif page > 1:
+        query = query.offset((page - 1) * per_page)
+
+    # +1 строка — чтобы узнать, есть ли следующая страница
+    rows = query.limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, None
+
+    rows = rows[:per_page]
+    last = rows[-1]
+    return rows, encode_cursor(
+        getattr(last, created_col.key), getattr(last, id_col.key)
+    )
+
+
+def count_total(query: Query, mode: str = 'exact') -> Optional[int]:
+    """Общее количество строк запроса в выбранном режиме"""
+    if mode == 'none':
+        return None
+    if mode == 'estimated':
+        return estimate_count(query)
+    return query.order_by(None).count()
+
+
+def estimate_count(query: Query) -> int:
+    """Оценка числа строк по статистике планировщика (EXPLAIN без ANALYZE)"""
+    session = query.session
+    compiled = query.order_by(None).statement.compile(
+        dialect=session.get_bind().dialect,
+        compile_kwargs={"render_postcompile": True}
+    )
+    plan = session.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def total_pages(total: Optional[int], per_page: int) -> Optional[int]:
+    if total is None:
+        return None
+    return (total + per_page - 1) // per_page
+
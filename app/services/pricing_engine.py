@@ -0,0 +1,258 @@
+# app/services/pricing_engine.py
+"""
+Динамические цены слотов по правилам туров (pricing_rules).
+
+Правило задаёт тип (occupancy, lead_time, weekday, season), условия
+(доля занятых мест, дней до слота, дни недели, период) и надбавку
+в процентах. Из правил одного типа срабатывает одно — с большим
+priority, при равенстве — с более строгим порогом; надбавки разных
+типов перемножаются: base_price × Π(1 + adjust_percent / 100).
+
+Слоты периода читаются одним запросом, условия правил считаются
+масками сразу по всем слотам (с NumPy — векторно, без него — те же
+выражения по слоту), изменившиеся цены пишутся одним пакетным UPDATE.
+Результат пишется в price_override с флагом dynamic_price; цены,
+выставленные вручную (dynamic_price = false), правила не трогают.
+
+Занятость меняется с бронированиями — фоновая задача пересчитывает
+только слоты из новых событий booking_events (курсор в job_cursors);
+сдвиг «дней до слота» подхватывает периодический полный пересчёт.
+Новые слоты (вручную, из шаблонов, фоновыми задачами), новая
+вместимость и новая базовая цена тура пересчитываются сразу в той же
+транзакции, что и запись.
+
+Колонку dynamic_price и таблицу pricing_rules в существующую базу
+добавляет python -m app.core.schema. Полный пересчёт будущих слотов:
+    python -m app.services.pricing_engine
+"""
+import logging
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, or_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.booking import BookingEvent
+from app.models.pricing import PricingRule
+from app.models.tour import Tour, TourSchedule
+from app.services.booking_events import BookingEvents
+
+try:
+    import numpy as np
+except ImportError:  # необязательная зависимость — есть медленный путь
+    np = None
+
+logger = logging.getLogger(__name__)
+
+CURSOR_NAME = 'dynamic_pricing'
+RULE_TYPES = ('occupancy', 'lead_time', 'weekday', 'season')
+
+
+def _rank(rule: PricingRule) -> tuple:
+    """Порядок правил внутри типа: последнее сработавшее побеждает"""
+    return (
+        rule.priority or 0,
+        float(rule.min_occupancy or 0),
+        rule.lead_days_min or 0,
+        -(rule.lead_days_max if rule.lead_days_max is not None else 10 ** 6),
+        rule.id or 0
+    )
+
+
+def _condition(rule: PricingRule, tour_id, occupancy, lead_days, week_day, day, isin):
+    """
+    Условия правила. Аргументы — столбцы (массивы NumPy) или значения
+    одного слота: выражения одинаково работают в обоих случаях.
+    """
+    mask = tour_id == rule.tour_id
+    if rule.min_occupancy is not None:
+        mask = mask & (occupancy >= float(rule.min_occupancy))
+    if rule.lead_days_min is not None:
+        mask = mask & (lead_days >= rule.lead_days_min)
+    if rule.lead_days_max is not None:
+        mask = mask & (lead_days <= rule.lead_days_max)
+    if rule.week_days:
+        mask = mask & isin(week_day, rule.week_days)
+    if rule.date_from is not None:
+        mask = mask & (day >= rule.date_from.toordinal())
+    if rule.date_to is not None:
+        mask = mask & (day <= rule.date_to.toordinal())
+    return mask
+
+
+def _factors_numpy(columns: dict, rules_by_type: Dict[str, List[PricingRule]]) -> List[float]:
+    """Множитель цены для всех слотов: маски правил по столбцам"""
+    columns = {name: np.asarray(values) for name, values in columns.items()}
+    factors = np.ones(len(columns['tour_id']))
+    for rules in rules_by_type.values():
+        percent = np.zeros(len(factors))
+        for rule in rules:
+            percent[_condition(rule, isin=np.isin, **columns)] = float(rule.adjust_percent)
+        factors *= 1 + percent / 100
+    return factors.tolist()
+
+
+def _factors_python(columns: dict, rules_by_type: Dict[str, List[PricingRule]]) -> List[float]:
+    """То же по слоту (без NumPy)"""
+    factors = []
+    for values in zip(*columns.values()):
+        slot = dict(zip(columns, values))
+        factor = 1.0
+        for rules in rules_by_type.values():
+            percent = 0.0
+            for rule in rules:
+                if _condition(rule, isin=lambda value, options: value in options, **slot):
+                    percent = float(rule.adjust_percent)
+            factor *= 1 + percent / 100
+        factors.append(factor)
+    return factors
+
+
+class PricingEngine:
+    """Расчёт и запись динамических цен слотов"""
+
+    @staticmethod
+    def reprice(
+        db: Session,
+        business_id: Optional[int] = None,
+        tour_id: Optional[int] = None,
+        schedule_ids: Optional[Iterable[int]] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        dry_run: bool = False
+    ) -> dict:
+        """
+        Пересчитать цены будущих слотов по фильтру (без commit).
+        dry_run — только вернуть изменения.
+
+        Returns:
+            {'dry_run', 'matched', 'changed', 'items': [изменившиеся слоты]}
+        """
+        today = date.today()
+        rules_query = db.query(PricingRule).join(Tour, Tour.id == PricingRule.tour_id).filter(
+            PricingRule.is_active == True
+        )
+        slots_query = db.query(
+            TourSchedule.id,
+            TourSchedule.tour_id,
+            TourSchedule.date,
+            TourSchedule.start_time,
+            TourSchedule.available_slots,
+            TourSchedule.booked_slots,
+            TourSchedule.price_override,
+            TourSchedule.dynamic_price,
+            Tour.base_price
+        ).join(
+            Tour, Tour.id == TourSchedule.tour_id
+        ).filter(
+            TourSchedule.date >= max(date_from or today, today),
+            TourSchedule.status != 'cancelled',
+            # Ручные цены не трогаем
+            or_(TourSchedule.price_override.is_(None), TourSchedule.dynamic_price == True)
+        )
+        if business_id is not None:
+            rules_query = rules_query.filter(Tour.business_id == business_id)
+            slots_query = slots_query.filter(Tour.business_id == business_id)
+        if tour_id is not None:
+            rules_query = rules_query.filter(PricingRule.tour_id == tour_id)
+            slots_query = slots_query.filter(TourSchedule.tour_id == tour_id)
+        if schedule_ids is not None:
+            schedule_ids = list(schedule_ids)
+            rules_query = rules_query.filter(PricingRule.tour_id.in_(
+                db.query(TourSchedule.tour_id).filter(TourSchedule.id.in_(schedule_ids))
+            ))
+            slots_query = slots_query.filter(TourSchedule.id.in_(schedule_ids))
+        if date_to is not None:
+            slots_query = slots_query.filter(TourSchedule.date <= date_to)
+
+        rules = rules_query.all()
+        rules_by_type: Dict[str, List[PricingRule]] = defaultdict(list)
+        for rule in sorted(rules, key=_rank):
+            rules_by_type[rule.rule_type].append(rule)
+
+        # Слоты туров с правилами и ранее оценённые (правила могли удалить)
+        tour_ids = {rule.tour_id for rule in rules}
+        slots = slots_query.filter(or_(
+            TourSchedule.tour_id.in_(list(tour_ids)), TourSchedule.dynamic_price == True
+        )).order_by(TourSchedule.date, TourSchedule.start_time, TourSchedule.id).all()
+
+        columns = {
+            'tour_id': [s.tour_id for s in slots],
+            'occupancy': [(s.booked_slots or 0) / s.available_slots if s.available_slots else 1.0 for s in slots],
+            'lead_days': [(s.date - today).days for s in slots],
+            'week_day': [s.date.isoweekday() for s in slots],
+            'day': [s.date.toordinal() for s in slots],
+        }
+        evaluate = _factors_numpy if np is not None else _factors_python
+        factors = evaluate(columns, rules_by_type) if slots else []
+
+        changes, items = [], []
+        for slot, factor, occupancy in zip(slots, factors, columns['occupancy']):
+            base_price = float(slot.base_price or 0)
+            dynamic = abs(factor - 1) > 1e-9
+            new_price = round(base_price * factor, 2) if dynamic else None
+            current = float(slot.price_override) if slot.price_override is not None else None
+            if new_price == current and dynamic == bool(slot.dynamic_price):
+                continue
+            changes.append({'id': slot.id, 'price_override': new_price, 'dynamic_price': dynamic})
+            items.append({
+                'schedule_id': slot.id,
+                'tour_id': slot.tour_id,
+                'date': slot.date.isoformat(),
+                'start_time': slot.start_time.isoformat(),
+                'occupancy': round(occupancy, 3),
+                'current_price': current if current is not None else base_price,
+                'new_price': new_price if dynamic else base_price
+            })
+
+        if changes and not dry_run:
+            db.execute(update(TourSchedule), changes)
+
+        return {'dry_run': dry_run, 'matched': len(slots), 'changed': len(changes), 'items': items}
+
+    @staticmethod
+    def run_incremental(
+        db: Session,
+        batch_size: Optional[int] = None,
+        lag_seconds: Optional[int] = None
+    ) -> int:
+        """
+        Пересчёт цен слотов, затронутых событиями после курсора (одна пачка).
+
+        Returns:
+            обработано событий
+        """
+        cursor = BookingEvents.lock_cursor(db, CURSOR_NAME)
+        events = BookingEvents.since(
+            db, cursor.position, batch_size or settings.RECONCILE_BATCH_SIZE, lag_seconds
+        )
+        if not events:
+            db.rollback()
+            return 0
+
+        schedule_ids = {e.tour_schedule_id for e in events if e.tour_schedule_id}
+        if schedule_ids:
+            result = PricingEngine.reprice(db, schedule_ids=schedule_ids)
+            if result['changed']:
+                logger.info("Динамические цены: обновлено слотов %s", result['changed'])
+
+        cursor.position = events[-1].id
+        db.commit()
+        return len(events)
+
+
+if __name__ == "__main__":
+    from app.core.database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    db = SessionLocal()
+    try:
+        start_position = db.query(func.coalesce(func.max(BookingEvent.id), 0)).scalar()
+        logger.info("Обновлено цен: %s", PricingEngine.reprice(db)['changed'])
+        cursor = BookingEvents.lock_cursor(db, CURSOR_NAME)
+        cursor.position = max(cursor.position, start_position)
+        db.commit()
+    finally:
+        db.close()
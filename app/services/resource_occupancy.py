@@ -0,0 +1,249 @@
+# app/services/resource_occupancy.py
+"""
+Занятость ресурсов по времени (проверка конфликтов расписания).
+
+Интервалы занятости (schedule_resources × tour_schedules) загружаются
+одним запросом на весь период. Для каждой пары ресурс × день строится
+индекс: отсортированные точки смены занятости, уровень занятости на
+каждом отрезке между ними и разреженная таблица максимумов. Вопрос
+«сколько единиц занято одновременно в [start, end)» — два бинарных
+поиска и O(1) на максимум.
+
+Один экземпляр живёт весь прогон генерации: новые слоты добавляются
+через add(), индекс дня перестраивается лениво при следующем запросе.
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.resource import ScheduleResource
+from app.models.tour import TourSchedule
+from app.services.resource_requirements import TourResourceRow
+
+DAY_MINUTES = 24 * 60
+DEFAULT_DURATION_MINUTES = 120  # слот без времени окончания считаем двухчасовым
+
+# (начало, конец в минутах от полуночи, количество, id слота)
+Interval = Tuple[int, int, int, Optional[int]]
+
+
+def to_minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def format_minutes(minutes: int) -> str:
+    """Минуты от полуночи в 'HH:MM' (конец дня — '24:00')"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def slot_minutes(start_time: time, end_time: Optional[time]) -> Tuple[int, int]:
+    """Интервал слота в минутах; без окончания — DEFAULT_DURATION_MINUTES, не дальше конца дня"""
+    start = to_minutes(start_time)
+    if end_time is None:
+        return start, min(start + DEFAULT_DURATION_MINUTES, DAY_MINUTES)
+    end = to_minutes(end_time)
+    return start, end if end > start else DAY_MINUTES
+
+
+class _DayIndex:
+    """Ступенчатая функция занятости одного ресурса за день + sparse table максимумов"""
+
+    def __init__(self, intervals: Iterable[Interval]):
+        deltas: Dict[int, int] = defaultdict(int)
+        for start, end, quantity, _ in intervals:
+            if end > start:
+                deltas[start] += quantity
+                deltas[end] -= quantity
+
+        self.points = sorted(deltas)
+        # levels[i] — занятость на [points[i], points[i + 1])
+        levels, level = [], 0
+        for point in self.points[:-1]:
+            level += deltas[point]
+            levels.append(level)
+
+        self.table = [levels]
+        width = 1
+        while width * 2 <= len(levels):
+            prev = self.table[-1]
+            self.table.append([max(prev[i], prev[i + width]) for i in range(len(levels) - width * 2 + 1)])
+            width *= 2
+
+    def steps(self) -> List[Tuple[int, int, int]]:
+        """Ступени за весь день [0, DAY_MINUTES): (начало, конец, занято), соседние равные слиты"""
+        bounds = [0] + [p for p in self.points if 0 < p < DAY_MINUTES] + [DAY_MINUTES]
+        result = []
+        for start, end in zip(bounds, bounds[1:]):
+            used = self.max_usage(start, end)
+            if result and result[-1][2] == used:
+                result[-1] = (result[-1][0], end, used)
+            else:
+                result.append((start, end, used))
+        return result
+
+    def max_usage(self, start: int, end: int) -> int:
+        levels = self.table[0]
+        if not levels or end <= start:
+            return 0
+        first = max(bisect_right(self.points, start) - 1, 0)
+        last = min(bisect_left(self.points, end) - 1, len(levels) - 1)
+        if last < first:
+            return 0
+        k = (last - first + 1).bit_length() - 1
+        return max(self.table[k][first], self.table[k][last - (1 << k) + 1])
+
+
+class ResourceOccupancy:
+    """Занятость набора ресурсов за период"""
+
+    def __init__(self):
+        self._intervals: Dict[Tuple[int, date], List[Interval]] = defaultdict(list)
+        self._index: Dict[Tuple[int, date], _DayIndex] = {}
+        self._keys_of: Dict[int, set] = defaultdict(set)  # id слота -> ключи (ресурс, день)
+
+    @staticmethod
+    def intervals(
+        db: Session,
+        resource_ids: Iterable[int],
+        date_from: date,
+        date_to: date
+    ) -> List[Tuple[int, date, int, int, int, int]]:
+        """
+        Интервалы занятости ресурсов за период одним запросом (отменённые слоты не занимают)
+
+        Возвращает: [(resource_id, день, начало, конец в минутах, количество, id слота)]
+        """
+        resource_ids = set(resource_ids)
+        if not resource_ids:
+            return []
+
+        rows = db.query(
+            ScheduleResource.resource_id,
+            TourSchedule.date,
+            TourSchedule.start_time,
+            TourSchedule.end_time,
+            ScheduleResource.quantity_used,
+            TourSchedule.id
+        ).join(
+            TourSchedule, TourSchedule.id == ScheduleResource.tour_schedule_id
+        ).filter(
+            ScheduleResource.resource_id.in_(resource_ids),
+            TourSchedule.date.between(date_from, date_to),
+            TourSchedule.status != 'cancelled'
+        ).all()
+
+        return [
+            (resource_id, day, *slot_minutes(start_time, end_time), quantity or 0, schedule_id)
+            for resource_id, day, start_time, end_time, quantity, schedule_id in rows
+        ]
+
+    @classmethod
+    def load(
+        cls,
+        db: Session,
+        resource_ids: Iterable[int],
+        date_from: date,
+        date_to: date
+    ) -> 'ResourceOccupancy':
+        """Занятость ресурсов за период (один запрос)"""
+        return cls.from_intervals(cls.intervals(db, resource_ids, date_from, date_to))
+
+    @classmethod
+    def from_intervals(cls, intervals: Iterable[Tuple[int, date, int, int, int, int]]) -> 'ResourceOccupancy':
+        occupancy = cls()
+        for resource_id, day, start, end, quantity, schedule_id in intervals:
+            occupancy._append((resource_id, day), (start, end, quantity, schedule_id))
+        return occupancy
+
+    def _append(self, key: Tuple[int, date], interval: Interval) -> None:
+        self._intervals[key].append(interval)
+        self._index.pop(key, None)
+        if interval[3] is not None:
+            self._keys_of[interval[3]].add(key)
+
+    def add(
+        self,
+        resource_id: int,
+        day: date,
+        start_time: time,
+        end_time: Optional[time],
+        quantity: int,
+        schedule_id: Optional[int] = None
+    ) -> None:
+        """Учесть новую занятость (например, только что созданный слот)"""
+        start, end = slot_minutes(start_time, end_time)
+        self._append((resource_id, day), (start, end, quantity, schedule_id))
+
+    def remove_schedule(self, schedule_id: int) -> List[Tuple[Tuple[int, date], Interval]]:
+        """
+        Убрать занятость слота (слот удаляется или перезаписывается)
+
+        Возвращает: убранные интервалы — для restore(), если слот всё же остаётся
+        """
+        removed = []
+        for key in self._keys_of.pop(schedule_id, ()):
+            intervals = self._intervals[key]
+            removed.extend((key, i) for i in intervals if i[3] == schedule_id)
+            self._intervals[key] = [i for i in intervals if i[3] != schedule_id]
+            self._index.pop(key, None)
+        return removed
+
+    def restore(self, removed: Iterable[Tuple[Tuple[int, date], Interval]]) -> None:
+        for key, interval in removed:
+            self._append(key, interval)
+
+    def _day_index(self, resource_id: int, day: date) -> Optional[_DayIndex]:
+        key = (resource_id, day)
+        if key not in self._intervals:
+            return None
+        index = self._index.get(key)
+        if index is None:
+            index = self._index[key] = _DayIndex(self._intervals[key])
+        return index
+
+    def max_usage(self, resource_id: int, day: date, start_time: time, end_time: Optional[time]) -> int:
+        """Максимум одновременно занятых единиц ресурса в [start, end)"""
+        index = self._day_index(resource_id, day)
+        if index is None:
+            return 0
+        return index.max_usage(*slot_minutes(start_time, end_time))
+
+    def steps(self, resource_id: int, day: date) -> List[Tuple[int, int, int]]:
+        """Занятость ресурса за день ступенями: [(начало, конец в минутах, занято)]"""
+        index = self._day_index(resource_id, day)
+        if index is None:
+            return [(0, DAY_MINUTES, 0)]
+        return index.steps()
+
+    def check(
+        self,
+        tour_resources: Sequence[TourResourceRow],
+        day: date,
+        start_time: time,
+        end_time: Optional[time]
+    ) -> Tuple[bool, str]:
+        """
+        Хватает ли ресурсов тура на интервал
+
+        Возвращает: (доступно, сообщение_об_ошибке)
+        """
+        for tr in tour_resources:
+            available = tr.quantity - self.max_usage(tr.resource_id, day, start_time, end_time)
+            if tr.quantity_needed > available:
+                return False, f"Недостаточно '{tr.name}': нужно {tr.quantity_needed}, доступно {available}"
+        return True, ""
+
+    def reserve(
+        self,
+        tour_resources: Sequence[TourResourceRow],
+        day: date,
+        start_time: time,
+        end_time: Optional[time],
+        schedule_id: Optional[int] = None
+    ) -> None:
+        """Учесть ресурсы тура на новом слоте"""
+        for tr in tour_resources:
+            self.add(tr.resource_id, day, start_time, end_time, tr.quantity_needed, schedule_id)
@@ -0,0 +1,211 @@
+# app/services/resource_requirements.py
+"""
+Требования тура к ресурсам.
+
+Ресурсы тура (TourResource + Resource) загружаются одним JOIN и кешируются
+в памяти процесса по tour_id. Кеш сбрасывается при изменении ресурсов тура
+или самих ресурсов (события SQLAlchemy + явный invalidate для массовых
+DELETE), а TTL страхует от изменений, сделанных другими процессами.
+
+Сессия с незафиксированными изменениями ресурсов читает мимо кеша и не
+заполняет его; при commit и при rollback такой сессии затронутые туры
+сбрасываются ещё раз.
+"""
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.tour import TourResource
+from app.models.resource import Resource
+
+# Ключ session.info: изменённые в транзакции ресурсы {(tour_id, resource_id)}
+DIRTY_KEY = 'resource_requirements_dirty'
+
+
+class TourResourceRow(NamedTuple):
+    """Ресурс тура (снимок без привязки к сессии)"""
+    resource_id: int
+    name: str
+    resource_type: str
+    quantity: int           # сколько единиц есть у бизнеса
+    seats_per_unit: int
+    quantity_needed: int    # сколько единиц нужно туру
+
+
+class ResourceRequirements:
+    """Загрузка и расчёт ресурсов тура с мемоизацией по туру"""
+
+    _cache: Dict[int, Tuple[float, Tuple[TourResourceRow, ...]]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def for_tours(cls, db: Session, tour_ids: Iterable[int]) -> Dict[int, Tuple[TourResourceRow, ...]]:
+        """Ресурсы нескольких туров: недостающие в кеше загружаются одним запросом"""
+        now = time.monotonic()
+        result = {}
+        missing = set()
+        # Сессия с незафиксированными изменениями ресурсов читает их из базы
+        # мимо кеша и кеш не заполняет: другие сессии их не видят,
+        # а rollback их отменит
+        cacheable = not _has_pending_changes(db)
+
+        with cls._lock:
+            for tour_id in set(tour_ids):
+                cached = cls._cache.get(tour_id) if cacheable else None
+                if cached and cached[0] > now:
+                    result[tour_id] = cached[1]
+                else:
+                    missing.add(tour_id)
+
+        if missing:
+            loaded = {tour_id: [] for tour_id in missing}
+            rows = db.query(
+                TourResource.tour_id,
+                Resource.id,
+                Resource.name,
+                Resource.resource_type,
+                Resource.quantity,
+                Resource.seats_per_unit,
+                TourResource.quantity_needed
+            ).join(
+                Resource, Resource.id == TourResource.resource_id
+            ).filter(
+                TourResource.tour_id.in_(missing)
+            ).order_by(TourResource.tour_id, TourResource.id).all()
+
+            for tour_id, *fields in rows:
+                loaded[tour_id].append(TourResourceRow(*fields))
+
+            expires_at = now + settings.RESOURCE_REQUIREMENTS_TTL_SECONDS
+            with cls._lock:
+                for tour_id, tour_rows in loaded.items():
+                    if cacheable:
+                        cls._cache[tour_id] = (expires_at, tuple(tour_rows))
+                    result[tour_id] = tuple(tour_rows)
+
+        return result
+
+    @classmethod
+    def for_tour(cls, db: Session, tour_id: int) -> Tuple[TourResourceRow, ...]:
+        """Ресурсы одного тура"""
+        return cls.for_tours(db, [tour_id])[tour_id]
+
+    @staticmethod
+    def requirement(row: TourResourceRow, participants_count: int) -> dict:
+        """Сколько единиц ресурса нужно на указанное количество участников"""
+        seats_per_unit = row.seats_per_unit or 1
+
+        # Сколько единиц ресурса нужно для этого количества участников,
+        # но не больше указанного в туре
+        units_needed = min(math.ceil(participants_count / seats_per_unit), row.quantity_needed)
+
+        # Ресурсы — справочно, без цен
+        return {
+            'resource_id': row.resource_id,
+            'resource_name': row.name,
+            'resource_type': row.resource_type,
+            'quantity_needed': units_needed,
+            'quantity_available': row.quantity,
+            'seats_per_unit': seats_per_unit,
+            'capacity': units_needed * seats_per_unit
+        }
+
+    @classmethod
+    def calculate(
+        cls,
+        db: Session,
+        tour_id: int,
+        participants_counts: Iterable[int]
+    ) -> Dict[int, Tuple[List[dict], int]]:
+        """
+        Расчёт ресурсов сразу для нескольких вариантов количества участников
+
+        Returns:
+            {кол-во участников: (список ресурсов, общая вместимость)}
+        """
+        rows = cls.for_tour(db, tour_id)
+        result = {}
+        for participants_count in set(participants_counts):
+            resources_needed = [cls.requirement(row, participants_count) for row in rows]
+            result[participants_count] = (
+                resources_needed,
+                sum(r['capacity'] for r in resources_needed)
+            )
+        return result
+
+    @classmethod
+    def invalidate(cls, tour_id: Optional[int] = None, resource_id: Optional[int] = None) -> None:
+        """Сброс кеша по туру, по ресурсу (во всех турах, где он используется) или целиком"""
+        with cls._lock:
+            if tour_id is None and resource_id is None:
+                cls._cache.clear()
+                return
+            if tour_id is not None:
+                cls._cache.pop(tour_id, None)
+            if resource_id is not None:
+                for cached_tour_id, (_, rows) in list(cls._cache.items()):
+                    if any(row.resource_id == resource_id for row in rows):
+                        del cls._cache[cached_tour_id]
+
+
+# === Сброс кеша при изменениях через ORM ===
+
+def _has_pending_changes(session: Session) -> bool:
+    """Есть ли в транзакции сессии изменения ресурсов (сброшенные flush или ещё нет)"""
+    if session.info.get(DIRTY_KEY):
+        return True
+    return any(
+        isinstance(obj, (TourResource, Resource))
+        for objects in (session.new, session.dirty, session.deleted)
+        for obj in objects
+    )
+
+
+def _mark_dirty(target, tour_id: Optional[int] = None, resource_id: Optional[int] = None) -> None:
+    ResourceRequirements.invalidate(tour_id=tour_id, resource_id=resource_id)
+    # Повторный сброс после commit/rollback: между flush и концом транзакции
+    # кеш мог заполниться старыми данными из параллельного запроса
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(DIRTY_KEY, set()).add((tour_id, resource_id))
+
+
+def _invalidate_dirty(session, keep: bool = False) -> None:
+    dirty = session.info.get(DIRTY_KEY, ()) if keep else session.info.pop(DIRTY_KEY, ())
+    for tour_id, resource_id in dirty:
+        ResourceRequirements.invalidate(tour_id=tour_id, resource_id=resource_id)
+
+
+@event.listens_for(TourResource, 'after_insert')
+@event.listens_for(TourResource, 'after_update')
+@event.listens_for(TourResource, 'after_delete')
+def _tour_resource_changed(mapper, connection, target):
+    _mark_dirty(target, tour_id=target.tour_id)
+
+
+@event.listens_for(Resource, 'after_update')
+@event.listens_for(Resource, 'after_delete')
+def _resource_changed(mapper, connection, target):
+    _mark_dirty(target, resource_id=target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    _invalidate_dirty(session)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _invalidate_after_rollback(session):
+    _invalidate_dirty(session)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _invalidate_after_soft_rollback(session, previous_transaction):
+    # Откат savepoint (begin_nested) не отменяет изменений внешней
+    # транзакции — их отметки нужны до её commit/rollback
+    _invalidate_dirty(session, keep=previous_transaction.nested)
@@ -0,0 +1,219 @@
+# app/services/schedule_bulk.py
+"""
+Массовые операции над слотами расписания (сдвиг, отмена, удаление,
+цена, вместимость) по фильтру: тур, период, дни недели, окно времени.
+
+Слоты по фильтру читаются одним запросом (с блокировкой), изменение —
+один UPDATE/DELETE по списку id. Слоты с бронированиями защищены:
+их не сдвигают, не отменяют и не удаляют, а вместимость не опускают
+ниже числа забронированных мест. При сдвиге занятость ресурсов
+перепроверяется (ResourceOccupancy); dry_run считает то же без записи.
+Новая вместимость и сброс ручной цены сразу пересчитывают динамические
+цены затронутых слотов.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Set
+
+from sqlalchemy import delete, exists, func, update
+from sqlalchemy.orm import Session
+
+from app.models.booking import ACTIVE_BOOKING_STATUSES, Booking
+from app.models.resource import Resource, ScheduleResource
+from app.models.tour import Tour, TourSchedule
+from app.services.pricing_engine import PricingEngine
+from app.services.resource_occupancy import DAY_MINUTES, ResourceOccupancy, slot_minutes
+
+OPERATIONS = ('shift', 'cancel', 'delete', 'set_price', 'set_capacity')
+
+
+class ScheduleBulk:
+    """Массовые операции над слотами бизнеса"""
+
+    @staticmethod
+    def _validate(op) -> None:
+        if op.operation not in OPERATIONS:
+            raise ValueError(f"Неизвестная операция: {op.operation}")
+        if op.filter.date_to < op.filter.date_from:
+            raise ValueError("date_to раньше date_from")
+        if op.filter.week_days and not set(op.filter.week_days) <= set(range(1, 8)):
+            raise ValueError("Дни недели — числа от 1 до 7")
+        if op.operation == 'shift' and not op.shift_minutes:
+            raise ValueError("Для сдвига нужен shift_minutes")
+        if op.operation == 'set_capacity' and (op.available_slots is None or op.available_slots < 0):
+            raise ValueError("Для изменения вместимости нужен available_slots >= 0")
+
+    @staticmethod
+    def _select(db: Session, business_id: int, f, lock: bool):
+        active_participants = db.query(
+            func.coalesce(func.sum(Booking.participants_count), 0)
+        ).filter(
+            Booking.tour_schedule_id == TourSchedule.id,
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+        ).correlate(TourSchedule).scalar_subquery()
+        has_bookings = exists().where(Booking.tour_schedule_id == TourSchedule.id)
+
+        query = db.query(
+            TourSchedule.id,
+            TourSchedule.date,
+            TourSchedule.start_time,
+            TourSchedule.end_time,
+            TourSchedule.available_slots,
+            active_participants.label('active_participants'),
+            has_bookings.label('has_bookings')
+        ).join(
+            Tour, Tour.id == TourSchedule.tour_id
+        ).filter(
+            Tour.business_id == business_id,
+            TourSchedule.date.between(f.date_from, f.date_to)
+        )
+        if f.tour_id:
+            query = query.filter(TourSchedule.tour_id == f.tour_id)
+        if f.week_days:
+            query = query.filter(func.extract('isodow', TourSchedule.date).in_(f.week_days))
+        if f.time_from:
+            query = query.filter(TourSchedule.start_time >= f.time_from)
+        if f.time_to:
+            query = query.filter(TourSchedule.start_time < f.time_to)
+
+        query = query.order_by(TourSchedule.date, TourSchedule.start_time, TourSchedule.id)
+        if lock:
+            query = query.with_for_update(of=TourSchedule)
+        return query.all()
+
+    @staticmethod
+    def _shift_conflicts(db: Session, slots, minutes: int, date_from, date_to) -> Dict[int, str]:
+        """
+        Слоты, которые нельзя сдвинуть: выходят за пределы дня или
+        не хватает ресурсов в новом времени. Оставшиеся на месте слоты
+        снова занимают ресурсы, поэтому проверка повторяется до устойчивого набора.
+        """
+        conflicts: Dict[int, str] = {}
+        delta = timedelta(minutes=minutes)
+        shifted = {}
+        for s in slots:
+            start, end = slot_minutes(s.start_time, s.end_time)
+            if start + minutes < 0 or end + minutes > DAY_MINUTES:
+                conflicts[s.id] = "Слот выходит за пределы дня"
+                continue
+            shifted[s.id] = (
+                (datetime.combine(s.date, s.start_time) + delta).time(),
+                (datetime.combine(s.date, s.end_time) + delta).time() if s.end_time else None
+            )
+
+        moving = [s for s in slots if s.id in shifted]
+        if not moving:
+            return conflicts
+
+        slot_ids = {s.id for s in moving}
+        used_by_slot: Dict[int, List] = {}
+        resource_ids: Set[int] = set()
+        # Ресурсы сдвигаемых слотов и вся занятость этих ресурсов за период
+        for schedule_id, resource_id, quantity in db.query(
+            ScheduleResource.tour_schedule_id, ScheduleResource.resource_id, ScheduleResource.quantity_used
+        ).filter(ScheduleResource.tour_schedule_id.in_(slot_ids)):
+            used_by_slot.setdefault(schedule_id, []).append((resource_id, quantity or 0))
+            resource_ids.add(resource_id)
+        if not resource_ids:
+            return conflicts
+
+        resources = {r.id: r for r in db.query(Resource.id, Resource.name, Resource.quantity).filter(
+            Resource.id.in_(resource_ids)
+        )}
+        intervals = ResourceOccupancy.intervals(db, resource_ids, date_from, date_to)
+
+        stuck: Set[int] = set()
+        while True:
+            occupancy = ResourceOccupancy.from_intervals(
+                i for i in intervals if i[5] not in slot_ids or i[5] in stuck
+            )
+            failed = {}
+            for s in moving:
+                if s.id in stuck:
+                    continue
+                start_time, end_time = shifted[s.id]
+                for resource_id, quantity in used_by_slot.get(s.id, ()):
+                    available = resources[resource_id].quantity - occupancy.max_usage(resource_id, s.date, start_time, end_time)
+                    if quantity > available:
+                        failed[s.id] = f"Недостаточно '{resources[resource_id].name}': нужно {quantity}, доступно {available}"
+                        break
+                else:
+                    for resource_id, quantity in used_by_slot.get(s.id, ()):
+                        occupancy.add(resource_id, s.date, start_time, end_time, quantity, s.id)
+            if not failed:
+                break
+            stuck.update(failed)
+            conflicts.update(failed)
+
+        return conflicts
+
+    @staticmethod
+    def apply(db: Session, business_id: int, op) -> dict:
+        """
+        Выполнить операцию (commit) или посчитать её результат (dry_run).
+        ValueError — неверные параметры операции.
+        """
+        ScheduleBulk._validate(op)
+        f = op.filter
+        slots = ScheduleBulk._select(db, business_id, f, lock=not op.dry_run)
+
+        # Защита слотов с бронированиями
+        if op.operation == 'delete':
+            protected = [s.id for s in slots if s.has_bookings]
+        elif op.operation in ('shift', 'cancel'):
+            protected = [s.id for s in slots if s.active_participants]
+        elif op.operation == 'set_capacity':
+            protected = [s.id for s in slots if s.active_participants > op.available_slots]
+        else:
+            protected = []
+        protected_ids = set(protected)
+        candidates = [s for s in slots if s.id not in protected_ids]
+
+        conflicts: Dict[int, str] = {}
+        if op.operation == 'shift':
+            conflicts = ScheduleBulk._shift_conflicts(db, candidates, op.shift_minutes, f.date_from, f.date_to)
+        ids = [s.id for s in candidates if s.id not in conflicts]
+
+        if ids and not op.dry_run:
+            target = TourSchedule.id.in_(ids)
+            if op.operation == 'shift':
+                delta = timedelta(minutes=op.shift_minutes)
+                db.execute(update(TourSchedule).where(target).values(
+                    start_time=TourSchedule.start_time + delta,
+                    end_time=TourSchedule.end_time + delta
+                ).execution_options(synchronize_session=False))
+            elif op.operation == 'cancel':
+                db.execute(update(TourSchedule).where(target).values(
+                    status='cancelled', is_available=False
+                ).execution_options(synchronize_session=False))
+            elif op.operation == 'delete':
+                db.execute(delete(TourSchedule).where(target).execution_options(synchronize_session=False))
+            elif op.operation == 'set_price':
+                db.execute(update(TourSchedule).where(target).values(
+                    price_override=op.price_override,
+                    dynamic_price=False  # ручная цена — правила её не трогают
+                ).execution_options(synchronize_session=False))
+            elif op.operation == 'set_capacity':
+                db.execute(update(TourSchedule).where(target).values(
+                    available_slots=op.available_slots
+                ).execution_options(synchronize_session=False))
+            # Занятость изменилась или ручная цена сброшена — цена по правилам
+            if op.operation == 'set_capacity' or (op.operation == 'set_price' and op.price_override is None):
+                PricingEngine.reprice(db, schedule_ids=ids)
+        if not op.dry_run:
+            db.commit()
+
+        by_id = {s.id: s for s in slots}
+        return {
+            'operation': op.operation,
+            'dry_run': op.dry_run,
+            'matched': len(slots),
+            'affected': len(ids),
+            'affected_ids': ids,
+            'protected_ids': protected,
+            'conflicts': [{
+                'schedule_id': schedule_id,
+                'date': by_id[schedule_id].date.isoformat(),
+                'start_time': by_id[schedule_id].start_time.isoformat(),
+                'message': message
+            } for schedule_id, message in conflicts.items()]
+        }
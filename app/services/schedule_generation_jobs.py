@@ -0,0 +1,209 @@
+# app/services/schedule_generation_jobs.py
+"""
+Фоновая генерация расписаний из шаблонов (schedule_generation_jobs).
+
+Запрос только ставит задачу; фоновый воркер выполняет её кусками по
+SCHEDULE_JOB_CHUNK_DAYS дней. Кусок — одна транзакция: строка задачи
+блокируется (FOR UPDATE SKIP LOCKED — параллельные воркеры берут разные
+задачи), затем строка шаблона — та же блокировка, что берёт догенерация
+горизонта (schedule_horizon), поэтому они не пишут слоты шаблона
+одновременно. Слоты куска и прогресс (счётчики, next_date) фиксируются
+одним commit. Поэтому падение воркера не оставляет полузаписанных кусков
+и не задваивает счётчики: задача продолжается с next_date.
+
+Отмена — перевод в cancelled; уже созданные слоты остаются. Отменённую
+или упавшую задачу можно продолжить с того же места (resume).
+
+Одна активная задача на шаблон гарантируется частичным уникальным
+индексом (проверка перед вставкой лишь даёт понятный ответ API).
+Таблицу и индекс в существующую базу добавляет python -m app.core.schema.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.schedule import ScheduleGenerationJob, ScheduleTemplate
+from app.services.schedule_generator import ScheduleGenerator
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'running')
+RESUMABLE_STATUSES = ('cancelled', 'failed')
+
+
+class ScheduleGenerationJobs:
+    """Постановка, выполнение и отмена задач генерации"""
+
+    @staticmethod
+    def active_for_template(db: Session, template_id: int) -> Optional[ScheduleGenerationJob]:
+        return db.query(ScheduleGenerationJob).filter(
+            ScheduleGenerationJob.template_id == template_id,
+            ScheduleGenerationJob.status.in_(ACTIVE_STATUSES)
+        ).first()
+
+    @staticmethod
+    def create(db: Session, template: ScheduleTemplate, data) -> ScheduleGenerationJob:
+        """
+        Поставить задачу по ScheduleGenerateRequest (без commit).
+        IntegrityError — у шаблона уже есть активная задача.
+        """
+        job = ScheduleGenerationJob(
+            template_id=template.id,
+            start_date=data.start_date,
+            end_date=data.end_date,
+            next_date=data.start_date,
+            overwrite_existing=data.overwrite_existing,
+            check_resource_conflicts=data.check_resource_conflicts,
+            status='pending',
+            conflicts=[]
+        )
+        db.add(job)
+        db.flush()
+        return job
+
+    @staticmethod
+    def cancel(db: Session, job_id: int) -> bool:
+        """
+        Отменить активную задачу (commit). Если кусок сейчас выполняется,
+        запрос дождётся его commit — следующий кусок уже не начнётся.
+        """
+        cancelled = db.execute(update(ScheduleGenerationJob).where(
+            ScheduleGenerationJob.id == job_id,
+            ScheduleGenerationJob.status.in_(ACTIVE_STATUSES)
+        ).values(
+            status='cancelled', finished_at=datetime.utcnow()
+        ).execution_options(synchronize_session=False)).rowcount
+        db.commit()
+        return bool(cancelled)
+
+    @staticmethod
+    def resume(db: Session, job: ScheduleGenerationJob) -> None:
+        """
+        Продолжить отменённую или упавшую задачу с next_date (commit).
+        ValueError — задачу продолжить нельзя.
+        """
+        if job.status not in RESUMABLE_STATUSES:
+            raise ValueError("Продолжить можно только отменённую или завершившуюся с ошибкой задачу")
+        if ScheduleGenerationJobs.active_for_template(db, job.template_id):
+            raise ValueError("Для шаблона уже выполняется генерация")
+        job.status = 'pending'
+        job.error = None
+        job.finished_at = None
+        try:
+            db.commit()
+        except IntegrityError:
+            # Параллельный запрос успел поставить задачу для шаблона
+            db.rollback()
+            raise ValueError("Для шаблона уже выполняется генерация")
+
+    @staticmethod
+    def run_chunk(db: Session, chunk_days: Optional[int] = None) -> Optional[int]:
+        """
+        Выполнить один кусок одной активной задачи (commit).
+
+        Returns:
+            id задачи или None, если работы нет
+        """
+        job = db.query(ScheduleGenerationJob).filter(
+            ScheduleGenerationJob.status.in_(ACTIVE_STATUSES)
+        ).order_by(
+            ScheduleGenerationJob.updated_at, ScheduleGenerationJob.id
+        ).with_for_update(skip_locked=True).first()
+        if not job:
+            db.rollback()
+            return None
+
+        job_id = job.id
+        chunk_end = min(job.end_date, job.next_date + timedelta(days=(chunk_days or settings.SCHEDULE_JOB_CHUNK_DAYS) - 1))
+        try:
+            # Ждём догенерацию горизонта этого шаблона, если она идёт, — и видим её слоты
+            template = db.query(ScheduleTemplate).filter(
+                ScheduleTemplate.id == job.template_id
+            ).with_for_update().one()
+            created, skipped, conflicts = ScheduleGenerator.generate_schedules_from_template(
+                db=db,
+                template=template,
+                start_date=job.next_date,
+                end_date=chunk_end,
+                overwrite_existing=job.overwrite_existing,
+                check_resource_conflicts=job.check_resource_conflicts,
+                commit=False
+            )
+        except Exception as e:
+            db.rollback()
+            logger.exception("Ошибка генерации расписания, задача %s", job_id)
+            job = db.query(ScheduleGenerationJob).filter(
+                ScheduleGenerationJob.id == job_id
+            ).with_for_update().first()
+            if job and job.status in ACTIVE_STATUSES:
+                job.status = 'failed'
+                job.error = str(e)
+                job.finished_at = datetime.utcnow()
+            db.commit()
+            return job_id
+
+        now = datetime.utcnow()
+        if job.status == 'pending':
+            job.status = 'running'
+            job.started_at = now
+        job.slots_created += created
+        job.slots_skipped += skipped
+        job.conflicts_count += len(conflicts)
+        room = settings.SCHEDULE_JOB_MAX_CONFLICTS - len(job.conflicts or [])
+        if conflicts and room > 0:
+            job.conflicts = list(job.conflicts or []) + conflicts[:room]
+        job.next_date = chunk_end + timedelta(days=1)
+        job.updated_at = now
+        if job.next_date > job.end_date:
+            job.status = 'completed'
+            job.finished_at = now
+        db.commit()
+        return job_id
+
+    @staticmethod
+    def run_pending(db: Session, budget_seconds: Optional[float] = None) -> int:
+        """
+        Выполнять куски задач (по очереди между задачами), пока есть
+        работа и не исчерпан бюджет времени.
+
+        Returns:
+            выполнено кусков
+        """
+        deadline = time.monotonic() + (budget_seconds or settings.SCHEDULE_JOB_BUDGET_SECONDS)
+        chunks = 0
+        while time.monotonic() < deadline:
+            if ScheduleGenerationJobs.run_chunk(db) is None:
+                break
+            chunks += 1
+        return chunks
+
+    @staticmethod
+    def progress(job: ScheduleGenerationJob) -> dict:
+        """Состояние задачи для API"""
+        days_total = (job.end_date - job.start_date).days + 1
+        days_done = min(days_total, max(0, (job.next_date - job.start_date).days))
+        return {
+            'job_id': job.id,
+            'template_id': job.template_id,
+            'status': job.status,
+            'start_date': job.start_date,
+            'end_date': job.end_date,
+            'next_date': job.next_date if job.next_date <= job.end_date else None,
+            'days_total': days_total,
+            'days_done': days_done,
+            'progress': round(days_done / days_total, 4),
+            'slots_created': job.slots_created or 0,
+            'slots_skipped': job.slots_skipped or 0,
+            'conflicts_count': job.conflicts_count or 0,
+            'conflicts': list(job.conflicts or []),
+            'error': job.error,
+            'created_at': job.created_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at,
+        }
@@ -1,10 +1,14 @@
+from sqlalchemy import delete, exists, insert
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import date, time, datetime, timedelta
-from typing import List, Tuple
-from app.models.tour import Tour, TourSchedule, TourResource
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Tuple
+from app.models.booking import Booking
+from app.models.tour import Tour, TourSchedule
 from app.models.schedule import ScheduleTemplate
-from app.models.resource import ScheduleResource, Resource
+from app.models.resource import ScheduleResource
+from app.services.pricing_engine import PricingEngine
+from app.services.resource_requirements import ResourceRequirements
+from app.services.resource_occupancy import ResourceOccupancy
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,7 +16,34 @@ logger = logging.getLogger(__name__)
 
 class ScheduleGenerator:
     """Сервис для генерации расписаний из шаблонов"""
-    
+
+    @staticmethod
+    def enumerate_slots(
+        template: ScheduleTemplate,
+        start_date: date,
+        end_date: date
+    ) -> List[Tuple[date, time, time]]:
+        """Все слоты шаблона на период: (дата, начало, конец) по порядку"""
+        duration = timedelta(minutes=template.slot_duration_minutes)
+        step = duration + timedelta(minutes=template.break_duration_minutes or 0)
+
+        # Времена слотов одинаковы для всех дней шаблона
+        day_slots = []
+        current_dt = datetime.combine(start_date, template.start_time)
+        end_dt = datetime.combine(start_date, template.end_time)
+        while current_dt + duration <= end_dt:
+            day_slots.append((current_dt.time(), (current_dt + duration).time()))
+            current_dt += step
+
+        slots = []
+        current_date = start_date
+        while current_date <= end_date:
+            # Python: 0=пн, 6=вс — приводим к нашему формату 1-7
+            if current_date.weekday() + 1 in template.week_days:
+                slots.extend((current_date, start, end) for start, end in day_slots)
+            current_date += timedelta(days=1)
+        return slots
+
     @staticmethod
     def generate_schedules_from_template(
         db: Session,
@@ -20,200 +51,124 @@ class ScheduleGenerator:
         start_date: date,
         end_date: date,
         overwrite_existing: bool = False,
-        check_resource_conflicts: bool = True
+        check_resource_conflicts: bool = True,
+        commit: bool = True
     ) -> Tuple[int, int, List[str]]:
         """
         Генерирует расписания из шаблона на указанный период
-        
+
+        Слоты перечисляются в памяти; существующие слоты тура и занятость
+        ресурсов читаются на весь период одним запросом каждое, конфликты
+        проверяются по ResourceOccupancy, запись — пакетными DELETE/INSERT.
+        Слоты с бронированиями не перезаписываются. commit=False — оставить
+        запись в транзакции вызывающего (фоновая генерация кусками).
+
         Возвращает: (создано_слотов, пропущено_слотов, конфликты)
         """
         tour = db.query(Tour).filter(Tour.id == template.tour_id).first()
         if not tour:
             raise ValueError(f"Тур {template.tour_id} не найден")
-        
-        # Получаем ресурсы тура
-        tour_resources = db.query(TourResource).filter(
-            TourResource.tour_id == tour.id
-        ).all()
-        
+
+        # Получаем ресурсы тура (один JOIN, с кешем по туру)
+        tour_resources = ResourceRequirements.for_tour(db, tour.id)
+
         if not tour_resources:
             logger.warning(f"Тур {tour.id} не имеет ресурсов")
-        
-        slots_created = 0
-        slots_skipped = 0
-        conflicts = []
-        
-        current_date = start_date
-        while current_date <= end_date:
-            # Проверяем день недели (Python: 0=пн, 6=вс)
-            weekday = current_date.weekday() + 1  # Приводим к нашему формату 1-7
-            
-            if weekday in template.week_days:
-                created, skipped, day_conflicts = ScheduleGenerator._generate_slots_for_day(
-                    db=db,
-                    tour=tour,
-                    template=template,
-                    schedule_date=current_date,
-                    tour_resources=tour_resources,
-                    overwrite_existing=overwrite_existing,
-                    check_resource_conflicts=check_resource_conflicts
-                )
-                
-                slots_created += created
-                slots_skipped += skipped
-                conflicts.extend(day_conflicts)
-            
-            current_date += timedelta(days=1)
-        
-        db.commit()
-        return slots_created, slots_skipped, conflicts
-    
-    @staticmethod
-    def _generate_slots_for_day(
-        db: Session,
-        tour: Tour,
-        template: ScheduleTemplate,
-        schedule_date: date,
-        tour_resources: List[TourResource],
-        overwrite_existing: bool,
-        check_resource_conflicts: bool
-    ) -> Tuple[int, int, List[str]]:
-        """Генерирует тайм-слоты на конкретный день"""
-        slots_created = 0
+
+        candidates = ScheduleGenerator.enumerate_slots(template, start_date, end_date)
+
+        # Существующие слоты тура на период — один запрос
+        existing: Dict[Tuple[date, time], list] = {}
+        if candidates:
+            for row in db.query(
+                TourSchedule.id,
+                TourSchedule.date,
+                TourSchedule.start_time,
+                exists().where(Booking.tour_schedule_id == TourSchedule.id).label('has_bookings')
+            ).filter(
+                TourSchedule.tour_id == tour.id,
+                TourSchedule.date.between(start_date, end_date)
+            ).order_by(TourSchedule.id):
+                existing.setdefault((row.date, row.start_time), []).append(row)
+
+        # Занятость ресурсов на весь период — один запрос, дальше дополняется новыми слотами
+        occupancy = None
+        if check_resource_conflicts and tour_resources and candidates:
+            occupancy = ResourceOccupancy.load(
+                db, [tr.resource_id for tr in tour_resources], start_date, end_date
+            )
+
         slots_skipped = 0
         conflicts = []
-        
-        current_time = template.start_time
-        end_time = template.end_time
-        
-        # Конвертируем в datetime для вычислений
-        current_dt = datetime.combine(schedule_date, current_time)
-        end_dt = datetime.combine(schedule_date, end_time)
-        
-        while current_dt < end_dt:
-            slot_end_dt = current_dt + timedelta(minutes=template.slot_duration_minutes)
-            
-            # Проверяем что слот не выходит за границы рабочего дня
-            if slot_end_dt > end_dt:
-                break
-            
-            # Проверяем существующий слот
-            existing_slot = db.query(TourSchedule).filter(
-                TourSchedule.tour_id == tour.id,
-                TourSchedule.date == schedule_date,
-                TourSchedule.start_time == current_dt.time()
-            ).first()
-            
-            if existing_slot and not overwrite_existing:
+        to_delete: List[int] = []
+        new_slots: List[dict] = []
+
+        for schedule_date, start_time, end_time in candidates:
+            found = existing.get((schedule_date, start_time), ())
+            if found and not overwrite_existing:
                 slots_skipped += 1
-                current_dt = slot_end_dt + timedelta(minutes=template.break_duration_minutes)
                 continue
-            
+
+            if any(row.has_bookings for row in found):
+                conflicts.append(f"{schedule_date} {start_time}: слот с бронированиями не перезаписан")
+                slots_skipped += 1
+                continue
+
             # Проверяем доступность ресурсов
-            resource_check = True
-            if check_resource_conflicts and tour_resources:
-                # Если мы собираемся перезаписать существующий слот, 
-                # не нужно исключать его из проверки доступности
-                exclude_id = None
-                if existing_slot and not overwrite_existing:
-                    exclude_id = existing_slot.id
-                
-                resource_check, conflict_msg = ScheduleGenerator._check_resource_availability(
-                    db=db,
-                    tour_resources=tour_resources,
-                    schedule_date=schedule_date,
-                    start_time=current_dt.time(),
-                    end_time=slot_end_dt.time(),
-                    exclude_schedule_id=exclude_id
+            if occupancy is not None:
+                # Перезаписываемый слот удаляется — его ресурсы не считаем
+                replaced = [i for row in found for i in occupancy.remove_schedule(row.id)]
+
+                resource_check, conflict_msg = occupancy.check(
+                    tour_resources, schedule_date, start_time, end_time
                 )
-                
+
                 if not resource_check:
-                    conflicts.append(f"{schedule_date} {current_dt.time()}: {conflict_msg}")
+                    occupancy.restore(replaced)
+                    conflicts.append(f"{schedule_date} {start_time}: {conflict_msg}")
                     slots_skipped += 1
-                    current_dt = slot_end_dt + timedelta(minutes=template.break_duration_minutes)
                     continue
-            
-            # Удаляем существующий слот если overwrite_existing = True
-            if existing_slot and overwrite_existing:
-                db.delete(existing_slot)
-                db.flush()
-            
-            # Создаем новый слот
-            schedule = TourSchedule(
-                tour_id=tour.id,
-                schedule_template_id=template.id,
-                date=schedule_date,
-                start_time=current_dt.time(),
-                end_time=slot_end_dt.time(),
-                available_slots=tour.max_participants or 10,
-                status='available'
-            )
-            db.add(schedule)
-            db.flush()  # Получаем ID
-            
-            # Бронируем ресурсы для этого слота
-            if resource_check and tour_resources:
-                for tr in tour_resources:
-                    schedule_resource = ScheduleResource(
-                        tour_schedule_id=schedule.id,
-                        resource_id=tr.resource_id,
-                        quantity_used=tr.quantity_needed
-                    )
-                    db.add(schedule_resource)
-            
-            slots_created += 1
-            
-            # Добавляем перерыв
-            current_dt = slot_end_dt + timedelta(minutes=template.break_duration_minutes)
-        
-        return slots_created, slots_skipped, conflicts
-    
-    @staticmethod
-    def _check_resource_availability(
-        db: Session,
-        tour_resources: List[TourResource],
-        schedule_date: date,
-        start_time: time,
-        end_time: time,
-        exclude_schedule_id: int = None
-    ) -> Tuple[bool, str]:
-        """
-        Проверяет доступность всех ресурсов тура на указанное время
-        
-        Возвращает: (доступно, сообщение_об_ошибке)
-        """
-        for tr in tour_resources:
-            resource = db.query(Resource).filter(Resource.id == tr.resource_id).first()
-            if not resource:
-                return False, f"Ресурс {tr.resource_id} не найден"
-            
-            # Находим все слоты, которые пересекаются с нашим временным интервалом
-            overlapping_schedules = db.query(TourSchedule).filter(
-                TourSchedule.date == schedule_date,
-                TourSchedule.status != 'cancelled',
-                # Проверка пересечения времени: НЕ (конец1 <= начало2 ИЛИ начало1 >= конец2)
-                # Т.е. слоты, которые пересекаются с нашим интервалом
-                ~((TourSchedule.end_time <= start_time) | (TourSchedule.start_time >= end_time))
+
+                occupancy.reserve(tour_resources, schedule_date, start_time, end_time)
+
+            to_delete.extend(row.id for row in found)
+            new_slots.append({
+                'tour_id': tour.id,
+                'schedule_template_id': template.id,
+                'date': schedule_date,
+                'start_time': start_time,
+                'end_time': end_time,
+                'available_slots': tour.max_participants or 10,
+                'status': 'available'
+            })
+
+        # Перезаписываемые слоты (ресурсы слотов удаляются каскадом)
+        if to_delete:
+            db.execute(
+                delete(TourSchedule).where(TourSchedule.id.in_(to_delete)).execution_options(synchronize_session=False)
             )
-            
-            if exclude_schedule_id:
-                overlapping_schedules = overlapping_schedules.filter(TourSchedule.id != exclude_schedule_id)
-            
-            overlapping_ids = [s.id for s in overlapping_schedules.all()]
-            
-            if overlapping_ids:
-                # Считаем сколько ресурсов уже занято в пересекающихся слотах
-                total_used = db.query(
-                    func.coalesce(func.sum(ScheduleResource.quantity_used), 0)
-                ).filter(
-                    ScheduleResource.resource_id == resource.id,
-                    ScheduleResource.tour_schedule_id.in_(overlapping_ids)
-                ).scalar() or 0
-            else:
-                total_used = 0
-            
-            available = resource.quantity - total_used
-            if tr.quantity_needed > available:
-                return False, f"Недостаточно '{resource.name}': нужно {tr.quantity_needed}, доступно {available}"
-        
-        return True, ""
\ No newline at end of file
+
+        if new_slots:
+            schedule_ids = db.scalars(
+                insert(TourSchedule).returning(TourSchedule.id, sort_by_parameter_order=True),
+                new_slots
+            ).all()
+
+            # Бронируем ресурсы для новых слотов
+            if tour_resources:
+                db.execute(insert(ScheduleResource), [
+                    {
+                        'tour_schedule_id': schedule_id,
+                        'resource_id': tr.resource_id,
+                        'quantity_used': tr.quantity_needed
+                    }
+                    for schedule_id in schedule_ids
+                    for tr in tour_resources
+                ])
+
+            # Динамические цены новых слотов — сразу, а не с периодическим пересчётом
+            PricingEngine.reprice(db, schedule_ids=schedule_ids)
+
+        if commit:
+            db.commit()
+        return len(new_slots), slots_skipped, conflicts
@@ -0,0 +1,159 @@
+# app/services/schedule_horizon.py
+"""
+Скользящий горизонт расписаний: каждый активный шаблон активного тура
+поддерживается сгенерированным на SCHEDULE_HORIZON_DAYS дней вперёд,
+чтобы туры не пропадали из публичного каталога без будущих слотов.
+
+Шаблон помнит, до какой даты слоты уже сгенерированы (generated_until;
+для старых шаблонов — дата последнего слота шаблона), и каждый запуск
+догенерирует только недостающий хвост — ScheduleGenerator без
+перезаписи. Слоты хвоста и новый generated_until фиксируются одним commit.
+
+Шаблоны обрабатываются пачками в пуле потоков, каждый — в своей сессии.
+Общий лимит SCHEDULE_HORIZON_CONCURRENCY действует на процесс целиком
+(семафор), строка шаблона блокируется FOR UPDATE SKIP LOCKED: шаблон,
+занятый другим воркером или куском задачи генерации (run_chunk берёт ту
+же блокировку), пропускается; шаблон с активной задачей — тоже.
+
+Колонку generated_until в существующую базу добавляет
+python -m app.core.schema. Один прогон:
+    python -m app.services.schedule_horizon
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.schedule import ScheduleTemplate
+from app.models.tour import Tour, TourSchedule
+from app.services.schedule_generation_jobs import ScheduleGenerationJobs
+from app.services.schedule_generator import ScheduleGenerator
+
+logger = logging.getLogger(__name__)
+
+# Общий лимит одновременно генерируемых шаблонов в процессе
+_slots = threading.BoundedSemaphore(settings.SCHEDULE_HORIZON_CONCURRENCY)
+
+
+class ScheduleHorizon:
+    """Догенерация хвоста расписаний активных шаблонов"""
+
+    @staticmethod
+    def due_templates(db: Session, horizon_end: date) -> List[Tuple[int, Optional[date]]]:
+        """
+        Шаблоны, сгенерированные не до конца горизонта.
+
+        Returns:
+            [(id шаблона, дата последнего слота шаблона или None)]
+        """
+        last_slot = db.query(func.max(TourSchedule.date)).filter(
+            TourSchedule.schedule_template_id == ScheduleTemplate.id
+        ).correlate(ScheduleTemplate).scalar_subquery()
+        generated_until = func.coalesce(ScheduleTemplate.generated_until, last_slot)
+
+        return [tuple(row) for row in db.query(ScheduleTemplate.id, last_slot).join(
+            Tour, Tour.id == ScheduleTemplate.tour_id
+        ).filter(
+            ScheduleTemplate.is_active == True,
+            Tour.is_active == True,
+            or_(generated_until.is_(None), generated_until < horizon_end)
+        ).order_by(ScheduleTemplate.id).all()]
+
+    @staticmethod
+    def extend_template(template_id: int, horizon_end: date, last_slot: Optional[date] = None) -> Optional[dict]:
+        """
+        Догенерировать хвост одного шаблона до horizon_end в своей сессии.
+
+        Returns:
+            итоги или None, если шаблон пропущен (занят, выключен, уже догенерирован)
+        """
+        with _slots:
+            db = SessionLocal()
+            try:
+                template = db.query(ScheduleTemplate).filter(
+                    ScheduleTemplate.id == template_id,
+                    ScheduleTemplate.is_active == True
+                ).with_for_update(skip_locked=True).first()
+                if not template or ScheduleGenerationJobs.active_for_template(db, template_id):
+                    db.rollback()
+                    return None
+
+                generated_until = template.generated_until or last_slot
+                start_date = max(date.today(), generated_until + timedelta(days=1)) if generated_until else date.today()
+                if start_date > horizon_end:
+                    db.rollback()
+                    return None
+
+                created, skipped, conflicts = ScheduleGenerator.generate_schedules_from_template(
+                    db=db,
+                    template=template,
+                    start_date=start_date,
+                    end_date=horizon_end,
+                    commit=False
+                )
+                template.generated_until = horizon_end
+                db.commit()
+                return {
+                    'template_id': template_id,
+                    'start_date': start_date,
+                    'created': created,
+                    'skipped': skipped,
+                    'conflicts': len(conflicts)
+                }
+            except Exception:
+                db.rollback()
+                logger.exception("Ошибка догенерации шаблона %s", template_id)
+                return {'template_id': template_id, 'error': True}
+            finally:
+                db.close()
+
+    @staticmethod
+    def run(
+        db: Session,
+        horizon_days: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ) -> dict:
+        """
+        Один прогон по всем шаблонам, которым не хватает горизонта.
+        db — только для выбора шаблонов; генерация идёт в сессиях потоков.
+
+        Returns:
+            {'templates', 'extended', 'created', 'conflicts', 'failed'}
+        """
+        horizon_end = date.today() + timedelta(days=horizon_days or settings.SCHEDULE_HORIZON_DAYS)
+        due = ScheduleHorizon.due_templates(db, horizon_end)
+        db.rollback()
+
+        summary = {'templates': len(due), 'extended': 0, 'created': 0, 'conflicts': 0, 'failed': 0}
+        batch_size = batch_size or settings.SCHEDULE_HORIZON_BATCH_SIZE
+        with ThreadPoolExecutor(max_workers=concurrency or settings.SCHEDULE_HORIZON_CONCURRENCY) as executor:
+            for i in range(0, len(due), batch_size):
+                batch = due[i:i + batch_size]
+                for result in executor.map(
+                    lambda item: ScheduleHorizon.extend_template(item[0], horizon_end, item[1]), batch
+                ):
+                    if result is None:
+                        continue
+                    if result.get('error'):
+                        summary['failed'] += 1
+                        continue
+                    summary['extended'] += 1
+                    summary['created'] += result['created']
+                    summary['conflicts'] += result['conflicts']
+        return summary
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    db = SessionLocal()
+    try:
+        logger.info("Горизонт расписаний: %s", ScheduleHorizon.run(db))
+    finally:
+        db.close()
@@ -0,0 +1,177 @@
+# app/services/slot_reconciliation.py
+"""
+Сверка счётчика TourSchedule.booked_slots с бронированиями.
+
+Счётчик ведут create_booking/update_status, а удаления и прямые правки
+из CRM его обходят. Истина — сумма участников бронирований в статусах
+ACTIVE_BOOKING_STATUSES (тот же набор, что при проверке мест).
+
+Инкрементальный режим идёт по booking_events от сохранённого курсора
+(job_cursors) и пересчитывает только затронутые слоты. Полный режим
+проходит все слоты пачками по id.
+
+Запуск вручную:
+    python -m app.services.slot_reconciliation [--full] [--dry-run]
+"""
+import argparse
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.booking import ACTIVE_BOOKING_STATUSES, Booking, BookingEvent
+from app.models.tour import TourSchedule
+from app.services.booking_events import BookingEvents
+
+logger = logging.getLogger(__name__)
+
+CURSOR_NAME = 'booked_slots_reconcile'
+
+
+class SlotReconciliation:
+    """Пересчёт booked_slots по бронированиям"""
+
+    @staticmethod
+    def reconcile(db: Session, schedule_ids: Iterable[int], fix: bool = True) -> List[dict]:
+        """
+        Сверка набора слотов (без commit).
+
+        Слоты блокируются (при fix=False — только читаются), фактическая
+        занятость считается одним агрегатом, расхождения исправляются
+        одним executemany UPDATE.
+
+        Returns:
+            расхождения: [{'tour_schedule_id', 'booked_slots', 'actual'}]
+        """
+        schedule_ids = sorted(set(schedule_ids))
+        if not schedule_ids:
+            return []
+
+        counters = db.query(TourSchedule.id, TourSchedule.booked_slots).filter(
+            TourSchedule.id.in_(schedule_ids)
+        ).order_by(TourSchedule.id)
+        if fix:
+            counters = counters.with_for_update()
+        counters = counters.all()
+
+        actual = dict(db.query(
+            Booking.tour_schedule_id, func.sum(Booking.participants_count)
+        ).filter(
+            Booking.tour_schedule_id.in_(schedule_ids),
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+        ).group_by(Booking.tour_schedule_id).all())
+
+        diffs = [
+            {'tour_schedule_id': schedule_id, 'booked_slots': booked or 0, 'actual': int(actual.get(schedule_id) or 0)}
+            for schedule_id, booked in counters
+            if (booked or 0) != int(actual.get(schedule_id) or 0)
+        ]
+
+        if diffs and fix:
+            schedules_table = TourSchedule.__table__
+            db.execute(
+                update(schedules_table).where(
+                    schedules_table.c.id == bindparam('schedule_id')
+                ).values(booked_slots=bindparam('actual')),
+                [{'schedule_id': d['tour_schedule_id'], 'actual': d['actual']} for d in diffs]
+            )
+
+        return diffs
+
+    @staticmethod
+    def log_diffs(diffs: List[dict]) -> None:
+        for d in diffs:
+            logger.warning(
+                "Слот %s: booked_slots=%s, по бронированиям %s",
+                d['tour_schedule_id'], d['booked_slots'], d['actual']
+            )
+
+    @staticmethod
+    def run_incremental(
+        db: Session,
+        fix: bool = True,
+        batch_size: Optional[int] = None,
+        lag_seconds: Optional[int] = None
+    ) -> Tuple[List[dict], int]:
+        """
+        Сверка слотов, затронутых событиями после курсора (одна пачка).
+
+        Returns:
+            (расхождения, обработано событий)
+        """
+        cursor = BookingEvents.lock_cursor(db, CURSOR_NAME)
+        events = BookingEvents.since(
+            db, cursor.position, batch_size or settings.RECONCILE_BATCH_SIZE, lag_seconds
+        )
+
+        if not events:
+            db.rollback()
+            return [], 0
+
+        diffs = SlotReconciliation.reconcile(
+            db, [event.tour_schedule_id for event in events if event.tour_schedule_id], fix=fix
+        )
+
+        if fix:
+            cursor.position = events[-1].id
+            db.commit()
+        else:
+            db.rollback()
+        return diffs, len(events)
+
+    @staticmethod
+    def run_full(db: Session, fix: bool = True, chunk_size: Optional[int] = None) -> List[dict]:
+        """
+        Сверка всех слотов пачками по id (commit на пачку; при fix=False
+        каждая пачка — отдельная читающая транзакция).
+        Курсор переносится на последнее событие на момент старта.
+        """
+        chunk_size = chunk_size or settings.RECONCILE_BATCH_SIZE
+        start_position = db.query(func.coalesce(func.max(BookingEvent.id), 0)).scalar()
+
+        diffs = []
+        last_id = 0
+        while True:
+            schedule_ids = [row[0] for row in db.query(TourSchedule.id).filter(
+                TourSchedule.id > last_id
+            ).order_by(TourSchedule.id).limit(chunk_size).all()]
+            if not schedule_ids:
+                break
+
+            diffs.extend(SlotReconciliation.reconcile(db, schedule_ids, fix=fix))
+            last_id = schedule_ids[-1]
+            if fix:
+                db.commit()
+            else:
+                db.rollback()
+
+        if fix:
+            cursor = BookingEvents.lock_cursor(db, CURSOR_NAME)
+            cursor.position = max(cursor.position, start_position)
+            db.commit()
+        else:
+            db.rollback()
+        return diffs
+
+
+if __name__ == "__main__":
+    from app.core.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Сверка booked_slots с бронированиями")
+    parser.add_argument("--full", action="store_true", help="проверить все слоты")
+    parser.add_argument("--dry-run", action="store_true", help="только показать расхождения")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    db = SessionLocal()
+    try:
+        if args.full:
+            found = SlotReconciliation.run_full(db, fix=not args.dry_run)
+        else:
+            found, _ = SlotReconciliation.run_incremental(db, fix=not args.dry_run)
+        SlotReconciliation.log_diffs(found)
+        logger.info("Расхождений: %s%s", len(found), " (не исправлены)" if args.dry_run else "")
+    finally:
+        db.close()
@@ -0,0 +1,110 @@
+# app/services/tour_relations.py
+"""
+Синхронизация связей тура (активности, ресурсы, локации) по разнице.
+
+Текущие строки сопоставляются с присланными по ключу (activity_id,
+resource_id, location_id; повторы ключа — по порядку). Совпавшие строки
+сохраняют id и обновляются только при изменении полей, недостающие
+добавляются, лишние удаляются — тремя массовыми запросами на связь.
+Результат сообщает, что изменилось, чтобы кеши сбрасывались только тогда,
+когда это нужно.
+"""
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Sequence
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session
+
+from app.models.tour import Tour, TourActivity, TourLocation, TourResource
+
+# Связь тура: (модель, ключ сопоставления, изменяемые поля)
+RELATIONS = {
+    'activities': (TourActivity, 'activity_id', ('order_index', 'duration_minutes', 'notes')),
+    'resources': (TourResource, 'resource_id', ('quantity_needed',)),
+    'locations': (TourLocation, 'location_id', ('is_meeting_point', 'is_activity_point', 'notes')),
+}
+# Коллекции Tour с этими связями
+RELATIONS_ATTRS = ('tour_activities', 'tour_resources', 'tour_locations')
+
+
+class RelationDiff(NamedTuple):
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.updated or self.removed)
+
+
+class TourRelations:
+    """Обновление тура и его связей без лишних записей"""
+
+    @staticmethod
+    def sync(
+        db: Session,
+        model,
+        tour_id: int,
+        key: str,
+        fields: Sequence[str],
+        items: List[dict]
+    ) -> RelationDiff:
+        """Привести строки связи тура к списку items (без commit)"""
+        columns = [model.id, getattr(model, key)] + [getattr(model, f) for f in fields]
+        current = defaultdict(list)
+        for row in db.query(*columns).filter(model.tour_id == tour_id).order_by(model.id):
+            current[row[1]].append(row)
+
+        to_insert, to_update = [], []
+        for item in items:
+            matches = current.get(item[key])
+            if not matches:
+                to_insert.append({'tour_id': tour_id, **item})
+                continue
+            row = matches.pop(0)
+            values = {f: item.get(f) for f in fields}
+            if any(values[f] != row[2 + i] for i, f in enumerate(fields)):
+                to_update.append({'id': row[0], **values})
+
+        to_delete = [row[0] for rows in current.values() for row in rows]
+
+        if to_delete:
+            db.execute(delete(model).where(model.id.in_(to_delete)))
+        if to_update:
+            db.execute(update(model), to_update)
+        if to_insert:
+            db.execute(insert(model), to_insert)
+
+        return RelationDiff(len(to_insert), len(to_update), len(to_delete))
+
+    @staticmethod
+    def update_tour(db: Session, tour: Tour, data) -> Dict[str, bool]:
+        """
+        Простые поля и связи тура из TourCreate (без commit).
+        Связь, не переданная в запросе (None), не трогается.
+
+        Returns:
+            {'fields': ..., 'activities': ..., 'resources': ..., 'locations': ...} —
+            что изменилось
+        """
+        changes = {'fields': False}
+
+        simple_fields = data.model_dump(exclude=set(RELATIONS), exclude_unset=True)
+        for field, value in simple_fields.items():
+            if value is not None and getattr(tour, field) != value:
+                setattr(tour, field, value)
+                changes['fields'] = True
+
+        for name, (model, key, fields) in RELATIONS.items():
+            items = getattr(data, name)
+            if items is None:
+                changes[name] = False
+                continue
+            diff = TourRelations.sync(db, model, tour.id, key, fields, [i.model_dump() for i in items])
+            changes[name] = diff.changed
+
+        # Связи менялись в обход ORM — коллекции загруженного тура устарели
+        if any(changes[name] for name in RELATIONS):
+            db.expire(tour, RELATIONS_ATTRS)
+
+        return changes
@@ -0,0 +1,173 @@
+# app/services/waitlist_service.py
+"""
+Лист ожидания на заполненные слоты.
+
+Клиент встаёт в очередь, когда мест нет. Фоновый воркер (promote_pending)
+проверяет слоты с очередью: под блокировкой слота считает свободные места
+и превращает заявки в бронирования строго по порядку — если первая заявка
+в очереди не помещается, следующие её не обгоняют. Уведомление клиенту
+уходит через outbox (событие waitlist_promoted).
+"""
+import logging
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.booking import ACTIVE_BOOKING_STATUSES, Booking, WaitlistEntry
+from app.models.tour import TourSchedule
+from app.services.booking_service import BookingService
+
+logger = logging.getLogger(__name__)
+
+
+class WaitlistService:
+    """Очередь ожидания и автоматическое бронирование освободившихся мест"""
+
+    @staticmethod
+    def join(
+        db: Session,
+        schedule: TourSchedule,
+        participants_count: int,
+        customer_name: str,
+        customer_phone: str,
+        customer_email: Optional[str] = None,
+        customer_id: Optional[int] = None,
+        notes: Optional[str] = None
+    ) -> Tuple[WaitlistEntry, int]:
+        """
+        Постановка в очередь
+
+        Returns:
+            (заявка, позиция в очереди начиная с 1)
+        """
+        entry = WaitlistEntry(
+            tour_schedule_id=schedule.id,
+            customer_id=customer_id,
+            participants_count=participants_count,
+            customer_name=customer_name,
+            customer_phone=customer_phone,
+            customer_email=customer_email,
+            notes=notes,
+            status='waiting'
+        )
+        db.add(entry)
+        db.commit()
+        db.refresh(entry)
+
+        return entry, WaitlistService.position(db, entry)
+
+    @staticmethod
+    def position(db: Session, entry: WaitlistEntry) -> int:
+        """Позиция заявки в очереди слота (0 — заявка уже не в очереди)"""
+        if entry.status != 'waiting':
+            return 0
+        return db.query(func.count(WaitlistEntry.id)).filter(
+            WaitlistEntry.tour_schedule_id == entry.tour_schedule_id,
+            WaitlistEntry.status == 'waiting',
+            WaitlistEntry.id <= entry.id
+        ).scalar()
+
+    @staticmethod
+    def cancel(db: Session, entry: WaitlistEntry) -> WaitlistEntry:
+        """Выход из очереди"""
+        entry.status = 'cancelled'
+        db.commit()
+        db.refresh(entry)
+        return entry
+
+    @staticmethod
+    def promote_schedule(db: Session, tour_schedule_id: int) -> List[Booking]:
+        """
+        Бронирование освободившихся мест слота по очереди.
+
+        Слот блокируется (SKIP LOCKED — слот, который сейчас обрабатывает
+        другой воркер, пропускаем), свободные места считаются по бронированиям
+        под блокировкой. Всё фиксируется одним commit.
+        """
+        schedule = db.query(TourSchedule).filter(
+            TourSchedule.id == tour_schedule_id
+        ).with_for_update(skip_locked=True).first()
+
+        if not schedule:
+            db.rollback()
+            return []
+
+        booked = db.query(func.coalesce(func.sum(Booking.participants_count), 0)).filter(
+            Booking.tour_schedule_id == tour_schedule_id,
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+        ).scalar() or 0
+        free = schedule.available_slots - booked
+
+        entries = db.query(WaitlistEntry).filter(
+            WaitlistEntry.tour_schedule_id == tour_schedule_id,
+            WaitlistEntry.status == 'waiting'
+        ).order_by(WaitlistEntry.id).all()
+
+        now = datetime.utcnow()
+        promoted = []
+        for entry in entries:
+            # Строгий FIFO: не помещается первая — ждут все
+            if entry.participants_count > free:
+                break
+
+            booking = BookingService.add_booking(
+                db, schedule, entry.participants_count,
+                customer_name=entry.customer_name,
+                customer_phone=entry.customer_phone,
+                customer_email=entry.customer_email,
+                customer_id=entry.customer_id,
+                notes=entry.notes,
+                status='pending',
+                event_type='waitlist_promoted'
+            )
+            entry.status = 'promoted'
+            entry.booking_id = booking.id
+            entry.promoted_at = now
+            free -= entry.participants_count
+            promoted.append(booking)
+
+        db.commit()
+        return promoted
+
+    @staticmethod
+    def expire_past(db: Session) -> int:
+        """Закрытие заявок на прошедшие слоты"""
+        past_schedules = db.query(TourSchedule.id).filter(TourSchedule.date < date.today())
+        expired = db.query(WaitlistEntry).filter(
+            WaitlistEntry.status == 'waiting',
+            WaitlistEntry.tour_schedule_id.in_(past_schedules)
+        ).update({'status': 'expired'}, synchronize_session=False)
+        db.commit()
+        return expired
+
+    @staticmethod
+    def promote_pending(db: Session) -> int:
+        """
+        Один проход воркера по всем будущим слотам с очередью.
+
+        Returns:
+            количество созданных бронирований
+        """
+        booked = db.query(func.coalesce(func.sum(Booking.participants_count), 0)).filter(
+            Booking.tour_schedule_id == TourSchedule.id,
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+        ).correlate(TourSchedule).scalar_subquery()
+
+        # Только слоты, где очередь есть и места уже освободились
+        schedule_ids = [row[0] for row in db.query(WaitlistEntry.tour_schedule_id).join(
+            TourSchedule, TourSchedule.id == WaitlistEntry.tour_schedule_id
+        ).filter(
+            WaitlistEntry.status == 'waiting',
+            TourSchedule.date >= date.today(),
+            TourSchedule.available_slots > booked
+        ).distinct().all()]
+
+        created = 0
+        for schedule_id in schedule_ids:
+            promoted = WaitlistService.promote_schedule(db, schedule_id)
+            if promoted:
+                logger.info("Слот %s: из листа ожидания забронировано %s", schedule_id, len(promoted))
+            created += len(promoted)
+        return created
@@ -0,0 +1,150 @@
+# app/services/worker.py
+"""
+Фоновый воркер.
+
+Запуск отдельным процессом:
+    python -m app.services.worker
+
+Периодически выполняет задачи из TASKS — каждую в своей сессии БД.
+Несколько экземпляров воркера можно запускать параллельно: задачи
+забирают работу через FOR UPDATE SKIP LOCKED.
+"""
+import logging
+import time
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.booking_events import BookingEvents
+from app.services.idempotency import IdempotencyService
+from app.services.notifications import NotificationSender, get_senders
+from app.services.slot_reconciliation import SlotReconciliation
+from app.services.metrics_rollup import MetricsRollup
+from app.services.pricing_engine import PricingEngine
+from app.services.schedule_generation_jobs import ScheduleGenerationJobs
+from app.services.schedule_horizon import ScheduleHorizon
+from app.services.waitlist_service import WaitlistService
+
+logger = logging.getLogger(__name__)
+
+_senders: Optional[List[NotificationSender]] = None
+
+
+def dispatch_booking_events(db: Session) -> None:
+    """Рассылка уведомлений из outbox booking_events"""
+    global _senders
+    if _senders is None:
+        _senders = get_senders()
+
+    # Разбираем очередь, пока есть полные пачки
+    while True:
+        sent, failed = BookingEvents.dispatch_pending(db, _senders)
+        if sent or failed:
+            logger.info("События бронирований: отправлено %s, ошибок %s", sent, failed)
+        if sent + failed < settings.NOTIFICATION_BATCH_SIZE:
+            break
+
+
+def purge_idempotency_keys(db: Session) -> None:
+    """Очистка просроченных ключей идемпотентности"""
+    deleted = IdempotencyService.purge_expired(db)
+    if deleted:
+        logger.info("Удалено просроченных ключей идемпотентности: %s", deleted)
+
+
+def promote_waitlist(db: Session) -> None:
+    """Бронирование освободившихся мест для листа ожидания"""
+    expired = WaitlistService.expire_past(db)
+    if expired:
+        logger.info("Закрыто заявок на прошедшие слоты: %s", expired)
+    WaitlistService.promote_pending(db)
+
+
+def reconcile_booked_slots(db: Session) -> None:
+    """Сверка booked_slots по слотам, затронутым новыми событиями"""
+    while True:
+        diffs, processed = SlotReconciliation.run_incremental(db)
+        SlotReconciliation.log_diffs(diffs)
+        if processed < settings.RECONCILE_BATCH_SIZE:
+            break
+
+
+def rollup_daily_metrics(db: Session) -> None:
+    """Пересчёт дневных итогов по новым событиям"""
+    while MetricsRollup.run_incremental(db) >= settings.RECONCILE_BATCH_SIZE:
+        pass
+
+
+def reprice_changed_slots(db: Session) -> None:
+    """Динамические цены слотов, у которых изменилась занятость"""
+    while PricingEngine.run_incremental(db) >= settings.RECONCILE_BATCH_SIZE:
+        pass
+
+
+def refresh_dynamic_prices(db: Session) -> None:
+    """Полный пересчёт динамических цен будущих слотов"""
+    changed = PricingEngine.reprice(db)['changed']
+    db.commit()
+    if changed:
+        logger.info("Динамические цены: обновлено слотов %s", changed)
+
+
+def run_schedule_generation(db: Session) -> None:
+    """Генерация расписаний из шаблонов кусками по задачам"""
+    chunks = ScheduleGenerationJobs.run_pending(db)
+    if chunks:
+        logger.info("Генерация расписаний: выполнено кусков %s", chunks)
+
+
+def extend_schedule_horizon(db: Session) -> None:
+    """Догенерация расписаний активных шаблонов на горизонт вперёд"""
+    summary = ScheduleHorizon.run(db)
+    if summary['extended'] or summary['failed']:
+        logger.info("Горизонт расписаний: %s", summary)
+
+
+# (имя, интервал в секундах, функция)
+TASKS: List[Tuple[str, float, Callable[[Session], None]]] = [
+    ('booking_events', settings.WORKER_POLL_SECONDS, dispatch_booking_events),
+    ('idempotency_keys', 3600, purge_idempotency_keys),
+    ('waitlist', settings.WORKER_POLL_SECONDS, promote_waitlist),
+    ('booked_slots', settings.RECONCILE_INTERVAL_SECONDS, reconcile_booked_slots),
+    ('daily_metrics', settings.METRICS_ROLLUP_INTERVAL_SECONDS, rollup_daily_metrics),
+    ('dynamic_pricing', settings.PRICING_INTERVAL_SECONDS, reprice_changed_slots),
+    ('dynamic_pricing_refresh', settings.PRICING_REFRESH_SECONDS, refresh_dynamic_prices),
+    ('schedule_generation', settings.WORKER_POLL_SECONDS, run_schedule_generation),
+    ('schedule_horizon', settings.SCHEDULE_HORIZON_INTERVAL_SECONDS, extend_schedule_horizon),
+]
+
+
+def run_task(name: str, func: Callable[[Session], None]) -> None:
+    """Выполнение одной задачи в отдельной сессии; ошибка не роняет воркер"""
+    db = SessionLocal()
+    try:
+        func(db)
+    except Exception:
+        db.rollback()
+        logger.exception("Ошибка фоновой задачи %s", name)
+    finally:
+        db.close()
+
+
+def run_forever() -> None:
+    logger.info("Воркер запущен, задач: %s", len(TASKS))
+    next_run = {name: 0.0 for name, _, _ in TASKS}
+
+    while True:
+        now = time.monotonic()
+        for name, interval, func in TASKS:
+            if now >= next_run[name]:
+                run_task(name, func)
+                next_run[name] = time.monotonic() + interval
+
+        time.sleep(max(0.1, min(next_run.values()) - time.monotonic()))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    run_forever()
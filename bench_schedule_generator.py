@@ -0,0 +1,119 @@
+"""
+Замер генерации расписания из шаблона (ScheduleGenerator).
+
+Почасовой шаблон 08:00–20:00 на все дни недели, тур с двумя ресурсами,
+соседний тур уже занимает часть ресурсов. Прогоны: первичная генерация
+и перезапись того же периода. Всё выполняется в транзакции, которая
+откатывается в конце, — данные в базе не остаются.
+
+    python bench_schedule_generator.py [--days 180]
+"""
+import sys
+sys.path.insert(0, '.')
+
+import argparse
+import time as timer
+import uuid
+from datetime import date, time, timedelta
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from app.core.database import Base, engine
+import app.models  # noqa: F401 — регистрируем все таблицы в Base.metadata
+from app.models.user import User, BusinessProfile
+from app.models.tour import Tour, TourResource, TourSchedule
+from app.models.resource import Resource, ScheduleResource
+from app.models.schedule import ScheduleTemplate
+from app.services.resource_requirements import ResourceRequirements
+from app.services.schedule_generator import ScheduleGenerator
+
+
+def prepare(db: Session, start_date: date, days: int) -> ScheduleTemplate:
+    user = User(email=f"bench-{uuid.uuid4().hex[:8]}@example.com", password_hash="x", user_type="business")
+    db.add(user)
+    db.flush()
+    business = BusinessProfile(user_id=user.id, business_name="Замер генератора")
+    db.add(business)
+    db.flush()
+
+    tour = Tour(business_id=business.id, name="Почасовой тур", base_price=1000, max_participants=6)
+    neighbour = Tour(business_id=business.id, name="Соседний тур", base_price=1000, max_participants=6)
+    boats = Resource(business_id=business.id, name="Лодка", resource_type="boat", quantity=3)
+    guides = Resource(business_id=business.id, name="Гид", resource_type="guide", quantity=2)
+    db.add_all([tour, neighbour, boats, guides])
+    db.flush()
+    db.add_all([
+        TourResource(tour_id=tour.id, resource_id=boats.id, quantity_needed=1),
+        TourResource(tour_id=tour.id, resource_id=guides.id, quantity_needed=1),
+    ])
+
+    # Соседний тур каждый день с 12:00 до 15:00 занимает обоих гидов
+    neighbour_ids = db.scalars(insert(TourSchedule).returning(TourSchedule.id), [{
+        'tour_id': neighbour.id,
+        'date': start_date + timedelta(days=i),
+        'start_time': time(12, 0),
+        'end_time': time(15, 0),
+        'available_slots': 6,
+        'booked_slots': 0
+    } for i in range(days)]).all()
+    db.execute(insert(ScheduleResource), [
+        {'tour_schedule_id': schedule_id, 'resource_id': guides.id, 'quantity_used': 2}
+        for schedule_id in neighbour_ids
+    ])
+
+    template = ScheduleTemplate(
+        tour_id=tour.id, week_days=[1, 2, 3, 4, 5, 6, 7],
+        start_time=time(8, 0), end_time=time(20, 0), slot_duration_minutes=60, break_duration_minutes=0
+    )
+    db.add(template)
+    db.flush()
+    ResourceRequirements.invalidate(tour_id=tour.id)
+    return template
+
+
+def run(db: Session, label: str, template: ScheduleTemplate, start_date: date, end_date: date, overwrite: bool) -> None:
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.get_bind(), 'before_cursor_execute', listener)
+    started = timer.perf_counter()
+    try:
+        created, skipped, conflicts = ScheduleGenerator.generate_schedules_from_template(
+            db, template, start_date, end_date, overwrite_existing=overwrite
+        )
+    finally:
+        elapsed = timer.perf_counter() - started
+        event.remove(db.get_bind(), 'before_cursor_execute', listener)
+    print(
+        f"{label:<12} {elapsed:8.3f} с  запросов: {len(statements):<5} "
+        f"создано: {created:<6} пропущено: {skipped:<6} конфликтов: {len(conflicts)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер ScheduleGenerator")
+    parser.add_argument("--days", type=int, default=180, help="длина периода в днях")
+    args = parser.parse_args()
+
+    start_date = date.today() + timedelta(days=1)
+    end_date = start_date + timedelta(days=args.days - 1)
+
+    connection = engine.connect()
+    transaction = connection.begin()
+    Base.metadata.create_all(connection)
+    # commit() генератора фиксирует savepoint, внешняя транзакция откатывается
+    db = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        template = prepare(db, start_date, args.days)
+        print(f"Шаблон: 08:00–20:00 по часу, {args.days} дней ({start_date} — {end_date})")
+        run(db, "генерация", template, start_date, end_date, overwrite=False)
+        run(db, "повтор", template, start_date, end_date, overwrite=False)
+        run(db, "перезапись", template, start_date, end_date, overwrite=True)
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import sys
+sys.path.insert(0, '.')
+
+import uuid
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.database import Base, engine
+import app.models  # noqa: F401 — регистрируем все таблицы в Base.metadata
+from app.models.user import User, BusinessProfile
+from app.models.tour import Tour, TourSchedule
+
+
+@pytest.fixture
+def db():
+    """
+    Сессия на тестовой БД (DATABASE_URL) внутри транзакции, которая
+    откатывается после теста. commit() в коде сервисов фиксирует savepoint.
+    """
+    try:
+        connection = engine.connect()
+    except OperationalError:
+        pytest.skip("PostgreSQL недоступен")
+
+    transaction = connection.begin()
+    # Недостающие новые таблицы создаются внутри транзакции и откатываются вместе с ней
+    Base.metadata.create_all(connection)
+
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture
+def make_schedule(db):
+    """Фабрика: бизнес + тур + слот расписания"""
+    def factory(available_slots: int = 10, base_price: float = 1000, days_ahead: int = 7, business=None):
+        if business is None:
+            user = User(
+                email=f"test-{uuid.uuid4().hex[:8]}@example.com",
+                password_hash="x",
+                user_type="business"
+            )
+            db.add(user)
+            db.flush()
+            business = BusinessProfile(user_id=user.id, business_name="Тестовый бизнес")
+            db.add(business)
+            db.flush()
+
+        tour = Tour(business_id=business.id, name="Тестовый тур", base_price=base_price, max_participants=available_slots)
+        db.add(tour)
+        db.flush()
+
+        schedule = TourSchedule(
+            tour_id=tour.id,
+            date=date.today() + timedelta(days=days_ahead),
+            start_time=time(10, 0),
+            end_time=time(12, 0),
+            available_slots=available_slots,
+            booked_slots=0
+        )
+        db.add(schedule)
+        db.flush()
+        return schedule
+
+    return factory
@@ -12,6 +12,7 @@ from app.api.routes.bookings_api import router as bookings_router
 from app.api.routes.public_api import router as public_router
 from app.api.routes.reviews import router as reviews_router
 from app.api.routes.customer_api import router as customer_router  # ЛК туриста
+from app.api.routes.pricing import router as pricing_router
 from app.core.config import settings
 
 app = FastAPI(
@@ -44,6 +45,7 @@ app.include_router(bookings_router, prefix="/api")
 app.include_router(public_router, prefix="/api")
 app.include_router(reviews_router, prefix="/api")
 app.include_router(customer_router, prefix="/api")  # ЛК туриста
+app.include_router(pricing_router, prefix="/api")
 
 @app.get("/")
 async def root():
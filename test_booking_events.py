@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.models.booking import BookingEvent
+from app.services.booking_events import BookingEvents
+from app.services.booking_service import BookingService
+from app.services.notifications import StubSender
+
+
+def create_booking(db, schedule, participants_count=2):
+    booking, message = BookingService.create_booking(
+        db=db,
+        tour_schedule_id=schedule.id,
+        participants_count=participants_count,
+        customer_name="Иван Петров",
+        customer_phone="+7 (900) 123-45-67"
+    )
+    assert booking, message
+    return booking
+
+
+def test_booking_writes_outbox_events(db, make_schedule):
+    booking = create_booking(db, make_schedule())
+    BookingService.update_status(db, booking.id, 'confirmed')
+
+    events = db.query(BookingEvent).filter(BookingEvent.booking_id == booking.id).order_by(BookingEvent.id).all()
+
+    assert [e.event_type for e in events] == ['created', 'confirmed']
+    assert events[1].payload['old_status'] == 'pending'
+    assert all(e.status == 'pending' for e in events)
+
+
+def test_dispatch_sends_events_to_stub_sender(db, make_schedule):
+    booking = create_booking(db, make_schedule())
+    sender = StubSender()
+
+    BookingEvents.dispatch_pending(db, [sender])
+
+    assert booking.id in [e.booking_id for e in sender.sent]
+    event = db.query(BookingEvent).filter(BookingEvent.booking_id == booking.id).one()
+    assert event.status == 'sent'
+    assert event.processed_at is not None
+
+
+def test_failed_dispatch_is_retried_later(db, make_schedule):
+    booking = create_booking(db, make_schedule())
+
+    BookingEvents.dispatch_pending(db, [StubSender(fail=True)])
+
+    event = db.query(BookingEvent).filter(BookingEvent.booking_id == booking.id).one()
+    assert event.status == 'pending'
+    assert event.attempts == 1
+    assert event.last_error
+    assert event.next_attempt_at > datetime.utcnow()
+
+    # До наступления next_attempt_at событие не забирается повторно
+    retry_sender = StubSender()
+    BookingEvents.dispatch_pending(db, [retry_sender])
+    assert booking.id not in [e.booking_id for e in retry_sender.sent]
+
+
+def test_bulk_status_update_releases_seats_once(db, make_schedule):
+    schedule = make_schedule(available_slots=10)
+    first = create_booking(db, schedule, participants_count=2)
+    second = create_booking(db, schedule, participants_count=3)
+    business_id = schedule.tour.business_id
+    other = make_schedule()
+    foreign = create_booking(db, other)
+
+    result = BookingService.bulk_update_status(
+        db, business_id, [first.id, second.id, foreign.id], 'cancelled', notes="Отмена группы"
+    )
+
+    assert sorted(result['updated']) == sorted([first.id, second.id])
+    assert result['not_found'] == [foreign.id]
+    db.refresh(schedule)
+    assert schedule.booked_slots == 0
+
+    # Повторная отмена ничего не меняет и места не освобождает дважды
+    result = BookingService.bulk_update_status(db, business_id, [first.id], 'cancelled')
+    assert result['unchanged'] == [first.id]
+
+    db.refresh(first)
+    assert first.cancelled_at is not None
+    assert "Отмена группы" in first.notes
+    events = db.query(BookingEvent).filter(
+        BookingEvent.booking_id == first.id, BookingEvent.event_type == 'cancelled'
+    ).all()
+    assert len(events) == 1
+    assert events[0].payload['old_status'] == 'pending'
+
+
+def test_dispatch_sends_outside_claim_and_keeps_foreign_claims(db, make_schedule):
+    booking = create_booking(db, make_schedule())
+
+    class TakeoverSender(StubSender):
+        """Пока идёт рассылка, событие по таймауту перехватывает другой воркер"""
+        def send(self, event):
+            row = db.query(BookingEvent).get(event.id)
+            assert row.status == 'sending' and row.claimed_at is not None
+            row.claimed_at = datetime.utcnow() + timedelta(seconds=1)
+            db.commit()
+            super().send(event)
+
+    sender = TakeoverSender()
+    assert BookingEvents.dispatch_pending(db, [sender]) == (1, 0)
+
+    # Результат чужого захвата не перезаписан
+    event = db.query(BookingEvent).filter(BookingEvent.booking_id == booking.id).one()
+    assert event.status == 'sending'
+
+
+def test_stale_claim_is_dispatched_again(db, make_schedule):
+    booking = create_booking(db, make_schedule())
+    event = db.query(BookingEvent).filter(BookingEvent.booking_id == booking.id).one()
+    event.status = 'sending'
+    event.claimed_at = datetime.utcnow() - timedelta(seconds=settings.NOTIFICATION_CLAIM_TIMEOUT_SECONDS + 1)
+    db.commit()
+
+    sender = StubSender()
+    BookingEvents.dispatch_pending(db, [sender])
+
+    assert booking.id in [e.booking_id for e in sender.sent]
+    event = db.query(BookingEvent).filter(BookingEvent.booking_id == booking.id).one()
+    assert event.status == 'sent'
+
+
+def test_bulk_restore_checks_capacity(db, make_schedule):
+    schedule = make_schedule(available_slots=5)
+    first = create_booking(db, schedule, participants_count=2)
+    second = create_booking(db, schedule, participants_count=3)
+    business_id = schedule.tour.business_id
+    BookingService.bulk_update_status(db, business_id, [first.id, second.id], 'cancelled')
+    # Пока бронирования отменены, места заняли другие
+    create_booking(db, schedule, participants_count=2)
+
+    result = BookingService.bulk_update_status(db, business_id, [first.id, second.id], 'confirmed')
+
+    assert result['updated'] == [first.id]
+    assert result['failed'] == [{
+        'booking_id': second.id, 'tour_schedule_id': schedule.id, 'error': "Недостаточно мест. Свободно: 1"
+    }]
+    db.refresh(schedule)
+    db.refresh(second)
+    assert schedule.booked_slots == 4
+    assert second.status == 'cancelled'
@@ -0,0 +1,94 @@
+import csv
+import io
+import zipfile
+
+import pytest
+
+from app.api.routes.bookings_api import filter_business_bookings
+from app.services import booking_export
+from app.services.booking_service import BookingService
+
+
+def test_csv_export_streams_filtered_rows(db, make_schedule, monkeypatch):
+    schedule = make_schedule()
+    business_id = schedule.tour.business_id
+    for name in ("Иван", "Пётр", "Анна"):
+        booking, message = BookingService.create_booking(
+            db=db,
+            tour_schedule_id=schedule.id,
+            participants_count=1,
+            customer_name=name,
+            customer_phone="+7 (900) 123-45-67"
+        )
+        assert booking, message
+    BookingService.update_status(db, booking.id, 'cancelled')
+
+    # Генератор открывает свою сессию — в тесте подставляем тестовую
+    monkeypatch.setattr(booking_export, 'SessionLocal', lambda: db)
+    monkeypatch.setattr(booking_export, 'BATCH_SIZE', 1)
+    monkeypatch.setattr(db, 'close', lambda: None)
+
+    content = b''.join(booking_export.stream_csv(
+        lambda session: filter_business_bookings(session, business_id, status='pending')[0]
+    )).decode('utf-8-sig')
+
+    rows = list(csv.reader(io.StringIO(content), delimiter=';'))
+    assert rows[0][0] == 'Код'
+    assert [row[10] for row in rows[1:]] == ["Иван", "Пётр"]
+    assert rows[1][3] == "Тестовый тур"
+
+
+def test_exports_do_not_emit_formulas(db, make_schedule, monkeypatch):
+    schedule = make_schedule()
+    booking, message = BookingService.create_booking(
+        db=db,
+        tour_schedule_id=schedule.id,
+        participants_count=1,
+        customer_name='=HYPERLINK("http://evil.example","Иван")',
+        customer_phone="+7 (900) 123-45-67",
+        notes="@SUM(1+1)"
+    )
+    assert booking, message
+
+    monkeypatch.setattr(booking_export, 'SessionLocal', lambda: db)
+    monkeypatch.setattr(db, 'close', lambda: None)
+    build_query = lambda session: filter_business_bookings(session, schedule.tour.business_id)[0]
+
+    content = b''.join(booking_export.stream_csv(build_query)).decode('utf-8-sig')
+    row = list(csv.reader(io.StringIO(content), delimiter=';'))[1]
+    assert row[10] == '\'=HYPERLINK("http://evil.example","Иван")'
+    # Телефон — не свободный текст: выгружается без апострофа
+    assert row[11] == "+7 (900) 123-45-67"
+    assert booking_export._csv_value('customer_phone', '=cmd|"/c calc"!A1') == '\'=cmd|"/c calc"!A1'
+    assert row[14] == "'@SUM(1+1)"
+    assert row[7] == '1'
+
+    if booking_export.xlsx_available():
+        content = b''.join(booking_export.stream_xlsx(build_query))
+        with zipfile.ZipFile(io.BytesIO(content)) as workbook:
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        assert '<f>' not in sheet
+        assert 'HYPERLINK' in sheet
+
+
+def test_xlsx_export_produces_workbook(db, make_schedule, monkeypatch):
+    if not booking_export.xlsx_available():
+        pytest.skip("xlsxwriter не установлен")
+
+    schedule = make_schedule()
+    booking, message = BookingService.create_booking(
+        db=db,
+        tour_schedule_id=schedule.id,
+        participants_count=2,
+        customer_name="Иван",
+        customer_phone="+7 (900) 123-45-67"
+    )
+    assert booking, message
+
+    monkeypatch.setattr(booking_export, 'SessionLocal', lambda: db)
+    monkeypatch.setattr(db, 'close', lambda: None)
+
+    content = b''.join(booking_export.stream_xlsx(
+        lambda session: filter_business_bookings(session, schedule.tour.business_id)[0]
+    ))
+    assert content[:2] == b'PK'  # zip-контейнер XLSX
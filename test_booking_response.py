@@ -0,0 +1,65 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.api.routes.bookings_api import bookings_to_response
+from app.models.booking import BookingResource
+from app.models.resource import Resource
+from app.services.booking_service import BookingService
+
+
+@contextmanager
+def count_queries(db):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+
+
+def create_bookings(db, make_schedule, count):
+    first = make_schedule()
+    business = first.tour.business
+    resource = Resource(business_id=business.id, name="Квадроцикл", resource_type="atv")
+    db.add(resource)
+    db.flush()
+
+    bookings = []
+    for i in range(count):
+        schedule = first if i == 0 else make_schedule(business=business)
+        booking, message = BookingService.create_booking(
+            db=db,
+            tour_schedule_id=schedule.id,
+            participants_count=1,
+            customer_name="Иван Петров",
+            customer_phone="+7 (900) 123-45-67"
+        )
+        assert booking, message
+        db.add(BookingResource(booking_id=booking.id, resource_id=resource.id, quantity=1))
+        bookings.append(booking)
+    db.commit()
+    return bookings
+
+
+def test_response_query_count_does_not_depend_on_page_size(db, make_schedule):
+    bookings = create_bookings(db, make_schedule, 5)
+
+    for booking in bookings:
+        db.refresh(booking)
+    with count_queries(db) as single:
+        bookings_to_response(bookings[:1], db)
+
+    for booking in bookings:
+        db.refresh(booking)
+    with count_queries(db) as page:
+        items = bookings_to_response(bookings, db)
+
+    assert len(page) == len(single) == 2
+    assert all(item['tour_name'] == "Тестовый тур" for item in items)
+    assert all(item['booking_resources'][0]['resource_name'] == "Квадроцикл" for item in items)
@@ -0,0 +1,47 @@
+from app.models.booking import Booking
+from app.services.booking_search import BookingSearch
+from app.services.booking_service import BookingService
+
+
+def create_booking(db, schedule, name, phone, email=None):
+    booking, message = BookingService.create_booking(
+        db=db,
+        tour_schedule_id=schedule.id,
+        participants_count=1,
+        customer_name=name,
+        customer_phone=phone,
+        customer_email=email
+    )
+    assert booking, message
+    return booking
+
+
+def search(db, schedule, term):
+    query, rank = BookingSearch.apply(
+        db.query(Booking).filter(Booking.tour_schedule_id == schedule.id), term
+    )
+    return query.order_by(rank, Booking.id).all()
+
+
+def test_phone_digits_are_kept_in_sync(db, make_schedule):
+    booking = create_booking(db, make_schedule(), "Иван Петров", "+7 (900) 123-45-67")
+    assert booking.customer_phone_digits == "79001234567"
+
+    booking.customer_phone = "8 900 765 43 21"
+    assert booking.customer_phone_digits == "89007654321"
+
+
+def test_search_matches_formatted_phone_and_ranks_exact_first(db, make_schedule):
+    schedule = make_schedule()
+    partial = create_booking(db, schedule, "Анна 900", "+7 (911) 900-12-34")
+    full = create_booking(db, schedule, "Иван Петров", "+7 (900) 123-45-67")
+    create_booking(db, schedule, "Мария", "+7 (999) 555-66-77", email="maria@example.com")
+
+    assert [b.id for b in search(db, schedule, "123-45")] == [full.id]
+    assert [b.id for b in search(db, schedule, "8 900 123 45 67")] == [full.id]
+    assert {b.id for b in search(db, schedule, "900")} == {full.id, partial.id}
+    assert [b.customer_name for b in search(db, schedule, "MARIA@")] == ["Мария"]
+
+    # Точное совпадение кода — первым
+    results = search(db, schedule, full.booking_code.lower())
+    assert results[0].id == full.id
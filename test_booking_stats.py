@@ -0,0 +1,46 @@
+import asyncio
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from app.api.routes.bookings_api import get_bookings_stats, get_bookings_stats_series
+from app.models.booking import Booking
+
+
+def add_booking(db, schedule, status, created_at, participants_count=2, total_price=2000):
+    db.add(Booking(
+        booking_code=f"BKST{db.query(Booking).count():05d}",
+        booking_type='tour',
+        tour_schedule_id=schedule.id,
+        participants_count=participants_count,
+        total_price=total_price,
+        status=status,
+        created_at=created_at
+    ))
+    db.flush()
+
+
+def test_stats_and_weekly_series(db, make_schedule):
+    schedule = make_schedule()
+    user = SimpleNamespace(business_profile=schedule.tour.business)
+    other = make_schedule()
+
+    add_booking(db, schedule, 'paid', datetime(2026, 3, 2, 10, 0))       # понедельник
+    add_booking(db, schedule, 'cancelled', datetime(2026, 3, 4, 10, 0))
+    add_booking(db, schedule, 'confirmed', datetime(2026, 3, 16, 23, 59))
+    add_booking(db, other, 'paid', datetime(2026, 3, 2, 10, 0))           # чужой бизнес
+
+    stats = asyncio.run(get_bookings_stats(
+        date_from=date(2026, 3, 1), date_to=date(2026, 3, 31), db=db, current_user=user
+    ))
+    assert stats['total'] == 3
+    assert stats['by_status'] == {'pending': 0, 'confirmed': 1, 'paid': 1, 'cancelled': 1, 'completed': 0}
+    assert stats['total_revenue'] == 4000
+    assert stats['total_participants'] == 4
+
+    series = asyncio.run(get_bookings_stats_series(
+        period='week', date_from=date(2026, 3, 1), date_to=date(2026, 3, 20), db=db, current_user=user
+    ))
+    assert [item['bucket'] for item in series['items']] == ['2026-02-23', '2026-03-02', '2026-03-09', '2026-03-16']
+    assert [item['bookings'] for item in series['items']] == [0, 2, 0, 1]
+    assert series['items'][1]['cancelled'] == 1
+    assert series['items'][1]['revenue'] == 2000
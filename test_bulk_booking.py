@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes.bookings_api import create_bookings_bulk
+from app.models.booking import Booking, BookingResource
+from app.models.resource import Resource
+from app.models.tour import TourResource, TourSchedule
+from app.schemas.booking_schemas import BookingBulkCreate
+from app.services.booking_service import BookingService
+
+
+def item(schedule, participants_count):
+    return {
+        'tour_schedule_id': schedule.id, 'participants_count': participants_count,
+        'customer_name': "Иван", 'customer_phone': "+7 900 000-00-00"
+    }
+
+
+def test_bulk_booking_prices_and_resources(db, make_schedule):
+    first = make_schedule(available_slots=5, base_price=1000)
+    business = first.tour.business
+    second = make_schedule(available_slots=5, base_price=800, business=business)
+    second.price_override = 900
+    boat = Resource(business_id=business.id, name="Катер", resource_type='boat', quantity=3, seats_per_unit=4)
+    db.add(boat)
+    db.flush()
+    db.add(TourResource(tour_id=first.tour_id, resource_id=boat.id, quantity_needed=2))
+    db.flush()
+
+    bookings, errors = BookingService.create_bookings_bulk(
+        db, business.id, [item(first, 3), item(first, 2), item(second, 4)]
+    )
+    assert errors == []
+    # Цена слота: price_override, иначе базовая цена тура
+    assert [b.total_price for b in bookings] == [3000, 2000, 3600]
+    ids = [b.id for b in bookings]
+    assert db.query(BookingResource).filter(BookingResource.booking_id.in_(ids)).count() == 2
+    db.expire_all()
+    assert (db.get(TourSchedule, first.id).booked_slots, db.get(TourSchedule, second.id).booked_slots) == (5, 4)
+
+
+def test_bulk_booking_is_all_or_nothing(db, make_schedule):
+    first = make_schedule(available_slots=5)
+    business = first.tour.business
+    second = make_schedule(available_slots=5, business=business)
+    # Откат внутри сервиса не должен унести тестовые данные
+    db.commit()
+    user = SimpleNamespace(business_profile=business)
+
+    # Второй слот переполняется третьей позицией — не создаётся ничего
+    data = BookingBulkCreate(items=[item(first, 2), item(second, 3), item(second, 3)])
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(create_bookings_bulk(data, db=db, current_user=user))
+    assert exc.value.status_code == 400
+    assert [e['index'] for e in exc.value.detail['errors']] == [2]
+    assert db.query(Booking).filter(Booking.tour_schedule_id.in_([first.id, second.id])).count() == 0
+    db.expire_all()
+    assert (db.get(TourSchedule, first.id).booked_slots, db.get(TourSchedule, second.id).booked_slots) == (0, 0)
+
+    # Без переполнения проходит вся пачка
+    data = BookingBulkCreate(items=[item(first, 2), item(second, 3), item(second, 2)])
+    created = asyncio.run(create_bookings_bulk(data, db=db, current_user=user))
+    assert len(created['bookings']) == 3
+    db.expire_all()
+    assert (db.get(TourSchedule, first.id).booked_slots, db.get(TourSchedule, second.id).booked_slots) == (2, 5)
@@ -0,0 +1,45 @@
+import json
+from datetime import time, timedelta
+
+from app.models.resource import Resource, ScheduleResource
+from app.models.tour import TourSchedule
+from app.services import compact_calendar
+
+
+def test_compact_calendar_streams_columns_by_day(db, make_schedule, monkeypatch):
+    schedule = make_schedule(base_price=1500)
+    business = schedule.tour.business
+    resource = Resource(business_id=business.id, name="Лодка", resource_type="boat", quantity=3)
+    db.add(resource)
+    db.flush()
+    db.add(ScheduleResource(tour_schedule_id=schedule.id, resource_id=resource.id, quantity_used=2))
+    later = TourSchedule(
+        tour_id=schedule.tour_id, date=schedule.date + timedelta(days=1), start_time=time(9, 0),
+        end_time=None, available_slots=4, booked_slots=1, price_override=900
+    )
+    db.add(later)
+    make_schedule(days_ahead=7)  # чужой бизнес
+    db.flush()
+
+    # Генератор открывает свою сессию — в тесте подставляем тестовую
+    monkeypatch.setattr(compact_calendar, 'SessionLocal', lambda: db)
+    monkeypatch.setattr(db, 'close', lambda: None)
+
+    chunks = list(compact_calendar.stream_compact_calendar(
+        business.id, schedule.date, schedule.date + timedelta(days=1)
+    ))
+    payload = json.loads(''.join(chunks))
+
+    assert len(chunks) >= 4  # заголовок, два дня, хвост — отдаются по мере сборки
+    assert payload['tours'] == {str(schedule.tour_id): {'name': "Тестовый тур", 'base_price': 1500.0}}
+    assert payload['resources'] == {str(resource.id): "Лодка"}
+    assert [d['date'] for d in payload['days']] == [str(schedule.date), str(later.date)]
+
+    first, second = payload['days']
+    assert first['id'] == [schedule.id]
+    assert first['start_time'] == ['10:00'] and first['end_time'] == ['12:00']
+    assert first['price_override'] == [None]
+    assert first['resources'] == [[[resource.id, 2]]]
+    assert second['end_time'] == [None]
+    assert second['price_override'] == [900.0]
+    assert second['resources'] == [[]]
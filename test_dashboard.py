@@ -0,0 +1,66 @@
+from datetime import date
+
+from sqlalchemy import event
+
+from app.models.booking import Booking
+from app.services.booking_service import BookingService
+from app.services.dashboard import DashboardService
+
+
+def test_dashboard_in_one_query(db, make_schedule):
+    today = make_schedule(available_slots=10, days_ahead=0)
+    business = today.tour.business
+    later = make_schedule(available_slots=10, days_ahead=3, business=business)
+
+    booking, message = BookingService.create_booking(
+        db=db, tour_schedule_id=today.id, participants_count=4,
+        customer_name="Иван Петров", customer_phone="+7 (900) 123-45-67"
+    )
+    assert booking, message
+    BookingService.update_status(db, booking.id, 'paid')
+    booking, message = BookingService.create_booking(
+        db=db, tour_schedule_id=later.id, participants_count=2,
+        customer_name="Анна", customer_phone="+7 (900) 765-43-21"
+    )
+    assert booking, message
+    business_id = business.id  # без refresh объекта после commit
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.get_bind(), 'before_cursor_execute', listener)
+    try:
+        data = DashboardService.build(db, business_id)
+    finally:
+        event.remove(db.get_bind(), 'before_cursor_execute', listener)
+    assert len([s for s in statements if s.lstrip().upper().startswith(('SELECT', 'WITH'))]) == 1
+
+    assert data['stats']['bookings'] == 2
+    assert data['stats']['tours'] == 2
+    assert data['bookings_today'] == 1
+    assert data['participants_today'] == 4
+    assert data['upcoming_bookings'] == 2
+    assert data['pending_confirmations'] == 1
+    assert data['revenue_month_to_date'] == 4000
+
+    week = data['occupancy_next_7_days']
+    assert (week['capacity'], week['booked']) == (20, 6)
+    assert week['days'][0] == {'date': str(date.today()), 'capacity': 10, 'booked': 4, 'occupancy': 0.4}
+    assert week['days'][1]['capacity'] == 0
+
+
+def test_dashboard_is_cached_per_business(db, make_schedule, monkeypatch):
+    schedule = make_schedule()
+    business_id = schedule.tour.business_id
+    DashboardService.invalidate()
+
+    calls = []
+    build = DashboardService.build
+    monkeypatch.setattr(DashboardService, 'build', staticmethod(lambda db, bid: calls.append(bid) or build(db, bid)))
+
+    DashboardService.get(db, business_id)
+    DashboardService.get(db, business_id)
+    assert calls == [business_id]
+
+    DashboardService.invalidate(business_id)
+    DashboardService.get(db, business_id)
+    assert calls == [business_id, business_id]
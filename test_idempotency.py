@@ -0,0 +1,75 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes.public_api import create_public_booking
+from app.models.booking import Booking
+from app.models.idempotency import IdempotencyKey
+from app.schemas.booking_schemas import BookingCreate
+from app.services import idempotency
+from app.services.idempotency import EXECUTE, IN_PROGRESS, MISMATCH, REPLAY, IdempotencyService
+
+
+@pytest.fixture
+def key(db, monkeypatch):
+    """Сервис открывает свои сессии — в тесте подставляем тестовую"""
+    monkeypatch.setattr(idempotency, 'SessionLocal', lambda: db)
+    monkeypatch.setattr(db, 'close', lambda: None)
+    monkeypatch.setattr(idempotency.settings, 'IDEMPOTENCY_WAIT_SECONDS', 0)
+    return f"key-{uuid.uuid4().hex}"
+
+
+def test_claim_replay_mismatch_and_stale_lease(db, key):
+    state, token = IdempotencyService.claim('test', key, 'hash-a')
+    assert state == EXECUTE and token
+    # Параллельный дубликат, пока первый запрос выполняется
+    assert IdempotencyService.claim('test', key, 'hash-a') == (IN_PROGRESS, None)
+    assert IdempotencyService.claim('test', key, 'hash-b') == (MISMATCH, None)
+
+    assert IdempotencyService.complete('test', key, token, 200, {'ok': True})
+    assert IdempotencyService.claim('test', key, 'hash-a') == (REPLAY, (200, {'ok': True}))
+    assert IdempotencyService.claim('test', key, 'hash-b') == (MISMATCH, None)
+
+    # Процесс умер после захвата: по истечении аренды ключ захватывается заново
+    other = f"{key}-lost"
+    state, lost_token = IdempotencyService.claim('test', other, 'hash-a')
+    assert state == EXECUTE
+    db.query(IdempotencyKey).filter(IdempotencyKey.key == other).update({
+        'created_at': datetime.utcnow() - timedelta(seconds=idempotency.settings.IDEMPOTENCY_PROCESSING_TIMEOUT_SECONDS + 1)
+    })
+    state, new_token = IdempotencyService.claim('test', other, 'hash-a')
+    assert state == EXECUTE and new_token != lost_token
+    assert IdempotencyService.claim('test', other, 'hash-a') == (IN_PROGRESS, None)
+
+    # Запрос, потерявший аренду, не затирает ключ нового владельца
+    assert not IdempotencyService.complete('test', other, lost_token, 500, {'stale': True})
+    IdempotencyService.release('test', other, lost_token)
+    assert IdempotencyService.claim('test', other, 'hash-a') == (IN_PROGRESS, None)
+    assert IdempotencyService.complete('test', other, new_token, 200, {'ok': True})
+    assert IdempotencyService.claim('test', other, 'hash-a') == (REPLAY, (200, {'ok': True}))
+
+
+def test_public_booking_replays_and_releases_key_on_error(db, make_schedule, key):
+    schedule = make_schedule()
+    data = BookingCreate(
+        tour_schedule_id=schedule.id, participants_count=2,
+        customer_name="Иван", customer_phone="+7 900 000-00-00"
+    )
+
+    first = asyncio.run(create_public_booking(data, idempotency_key=key, db=db))
+    replay = asyncio.run(create_public_booking(data, idempotency_key=key, db=db))
+    assert replay.headers['Idempotent-Replayed'] == 'true'
+    assert first['booking']['booking_code'] in replay.body.decode()
+    assert db.query(Booking).filter(Booking.tour_schedule_id == schedule.id).count() == 1
+
+    # Ошибка не запоминается: ключ освобождается, повтор выполняется заново
+    failing = f"{key}-error"
+    too_many = data.model_copy(update={'participants_count': 50})
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(create_public_booking(too_many, idempotency_key=failing, db=db))
+    assert exc.value.status_code == 400
+    assert db.query(IdempotencyKey).filter(IdempotencyKey.key == failing).count() == 0
+    assert IdempotencyService.claim('public_booking', failing, 'any')[0] == EXECUTE
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.deps import get_current_user, get_live_feed_business_user
+from app.api.routes.bookings_api import bookings_live_feed_token
+from app.core.security import create_access_token
+from app.services import live_feed
+from app.services.booking_service import BookingService
+from app.services.live_feed import BookingFeed, fetch_backlog, fetch_events, format_sse
+
+
+def test_fetch_events_filters_by_business(db, make_schedule):
+    schedule = make_schedule()
+    other = make_schedule()
+    for s in (schedule, other):
+        booking, message = BookingService.create_booking(
+            db=db,
+            tour_schedule_id=s.id,
+            participants_count=1,
+            customer_name="Иван Петров",
+            customer_phone="+7 (900) 123-45-67"
+        )
+        assert booking, message
+    BookingService.update_status(db, booking.id, 'cancelled')
+
+    events = fetch_events(db, 0, other.tour.business_id)
+
+    assert [e['event_type'] for e in events] == ['created', 'cancelled']
+    assert events[1]['booking']['old_status'] == 'pending'
+    assert 'event: cancelled' in format_sse(events[1])
+    assert fetch_events(db, events[-1]['id'], other.tour.business_id) == []
+
+
+def test_backlog_over_limit_becomes_resync(db, make_schedule, monkeypatch):
+    schedule = make_schedule()
+    business_id = schedule.tour.business_id
+    for name in ("Иван", "Пётр", "Анна"):
+        booking, message = BookingService.create_booking(
+            db=db, tour_schedule_id=schedule.id, participants_count=1,
+            customer_name=name, customer_phone="+7 (900) 123-45-67"
+        )
+        assert booking, message
+    events = fetch_events(db, 0, business_id)
+
+    monkeypatch.setattr(live_feed, 'FETCH_LIMIT', 3)
+    assert fetch_backlog(db, events[0]['id'] - 1, business_id) == events
+
+    monkeypatch.setattr(live_feed, 'FETCH_LIMIT', 2)
+    resync = fetch_backlog(db, events[0]['id'] - 1, business_id)
+    assert [e['event_type'] for e in resync] == ['resync']
+    assert resync[0]['id'] >= events[-1]['id']
+    assert format_sse(resync[0]).startswith(f"id: {resync[0]['id']}\nevent: resync\n")
+
+
+def test_live_feed_token_works_only_for_feed(db, make_schedule):
+    user = make_schedule().tour.business.user
+    token = asyncio.run(bookings_live_feed_token(current_user=user))['token']
+
+    assert asyncio.run(get_live_feed_business_user(token=token, credentials=None, db=db)) is user
+    # Токен из URL не открывает остальной API
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(get_current_user(SimpleNamespace(credentials=token), db=db))
+    assert exc.value.status_code == 401
+
+    # Обычный токен в URL не принимается, в заголовке — да
+    access = create_access_token({'sub': str(user.id)})
+    with pytest.raises(HTTPException):
+        asyncio.run(get_live_feed_business_user(token=access, credentials=None, db=db))
+    assert asyncio.run(get_live_feed_business_user(
+        token=None, credentials=SimpleNamespace(credentials=access), db=db
+    )) is user
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(get_live_feed_business_user(token=None, credentials=None, db=db))
+    assert exc.value.status_code == 401
+
+
+def test_dispatch_fans_out_to_business_subscribers(monkeypatch):
+    monkeypatch.setattr(BookingFeed, '_subscribers', {})
+    monkeypatch.setattr(BookingFeed, '_sent', {})
+    monkeypatch.setattr(BookingFeed, '_last_id', 0)
+    # Поток слушателя в тесте не нужен — события раздаём вручную
+    monkeypatch.setattr(BookingFeed, '_run', classmethod(lambda cls: None))
+
+    async def scenario():
+        first = BookingFeed.subscribe(1)
+        second = BookingFeed.subscribe(1)
+        stranger = BookingFeed.subscribe(2)
+
+        event = {'id': 10, 'event_type': 'created', 'business_id': 1}
+        assert BookingFeed.dispatch([event]) == 2
+        # Повтор при перечитывании окна не отправляется
+        assert BookingFeed.dispatch([event]) == 0
+
+        assert (await asyncio.wait_for(first.queue.get(), 1))['id'] == 10
+        assert (await asyncio.wait_for(second.queue.get(), 1))['id'] == 10
+        assert stranger.queue.empty()
+
+        BookingFeed.unsubscribe(first)
+        BookingFeed.unsubscribe(second)
+        BookingFeed.unsubscribe(stranger)
+        assert BookingFeed._subscribers == {}
+
+    asyncio.run(scenario())
+    assert BookingFeed._last_id == 10
+
+
+def test_stopped_listener_does_not_resume_next_to_new_one(monkeypatch):
+    monkeypatch.setattr(BookingFeed, '_subscribers', {})
+    monkeypatch.setattr(BookingFeed, '_thread', None)
+    started = []
+
+    def run(cls):
+        started.append(threading.current_thread())
+        while cls._active():
+            time.sleep(0.01)
+
+    monkeypatch.setattr(BookingFeed, '_run', classmethod(run))
+
+    async def scenario():
+        old = BookingFeed.subscribe(1)
+        old_thread = BookingFeed._thread
+        # Подписчики ушли — слушатель ещё не заметил, а уже пришёл новый
+        with BookingFeed._lock:
+            BookingFeed._subscribers.clear()
+            BookingFeed._thread = None
+        new = BookingFeed.subscribe(1)
+        old_thread.join(1)
+        assert not old_thread.is_alive()
+        assert BookingFeed._thread.is_alive() and BookingFeed._thread is not old_thread
+        BookingFeed.unsubscribe(new)
+        BookingFeed.unsubscribe(old)
+
+    asyncio.run(scenario())
+    assert len(started) == 2
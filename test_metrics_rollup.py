@@ -0,0 +1,59 @@
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+
+from app.api.routes.bookings_api import get_bookings_stats
+from app.models.metrics import BusinessDailyMetric
+from app.services.booking_service import BookingService
+from app.services.metrics_rollup import MetricsRollup
+
+
+def create_booking(db, schedule, participants_count):
+    booking, message = BookingService.create_booking(
+        db=db,
+        tour_schedule_id=schedule.id,
+        participants_count=participants_count,
+        customer_name="Иван Петров",
+        customer_phone="+7 (900) 123-45-67"
+    )
+    assert booking, message
+    return booking
+
+
+def stats(db, user, source):
+    return asyncio.run(get_bookings_stats(
+        date_from=date.today(), date_to=date.today(), source=source, db=db, current_user=user
+    ))
+
+
+def test_rollup_follows_booking_events(db, make_schedule):
+    schedule = make_schedule()
+    user = SimpleNamespace(business_profile=schedule.tour.business)
+
+    paid = create_booking(db, schedule, 2)
+    cancelled = create_booking(db, schedule, 3)
+    BookingService.update_status(db, paid.id, 'paid')
+    MetricsRollup.run_incremental(db, lag_seconds=0)
+    assert stats(db, user, 'rollup') == stats(db, user, 'live')
+
+    BookingService.update_status(db, cancelled.id, 'cancelled')
+    MetricsRollup.run_incremental(db, lag_seconds=0)
+
+    rollup = stats(db, user, 'rollup')
+    assert rollup == stats(db, user, 'live')
+    assert rollup['by_status']['cancelled'] == 1
+    assert rollup['total_revenue'] == 2000
+    assert rollup['total_participants'] == 2
+
+
+def test_backfill_rebuilds_rollup(db, make_schedule):
+    schedule = make_schedule()
+    user = SimpleNamespace(business_profile=schedule.tour.business)
+    create_booking(db, schedule, 2)
+
+    db.query(BusinessDailyMetric).delete()
+    db.commit()
+    assert stats(db, user, 'rollup')['total'] == 0
+
+    MetricsRollup.backfill(db, date.today(), date.today())
+    assert stats(db, user, 'rollup') == stats(db, user, 'live')
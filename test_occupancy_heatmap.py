@@ -0,0 +1,55 @@
+import asyncio
+from datetime import time, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.routes.tours import get_calendar
+from app.models.resource import Resource, ScheduleResource
+from app.models.tour import TourSchedule
+from app.services import occupancy_heatmap
+
+
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_heatmap_peak_utilisation(db, make_schedule, monkeypatch, vectorized):
+    if vectorized and occupancy_heatmap.np is None:
+        pytest.skip("NumPy не установлен")
+    if not vectorized:
+        monkeypatch.setattr(occupancy_heatmap, 'np', None)
+
+    schedule = make_schedule()  # 10:00–12:00
+    business = schedule.tour.business
+    user = SimpleNamespace(business_profile=business)
+    resource = Resource(business_id=business.id, name="Каяк", resource_type="kayak", quantity=4)
+    idle = Resource(business_id=business.id, name="Сап", resource_type="sup", quantity=2)
+    db.add_all([resource, idle])
+    db.flush()
+
+    evening = TourSchedule(
+        tour_id=schedule.tour_id, date=schedule.date, start_time=time(11, 30), end_time=time(13, 0),
+        available_slots=5, booked_slots=0
+    )
+    db.add(evening)
+    db.flush()
+    db.add(ScheduleResource(tour_schedule_id=schedule.id, resource_id=resource.id, quantity_used=2))
+    db.add(ScheduleResource(tour_schedule_id=evening.id, resource_id=resource.id, quantity_used=1))
+    db.flush()
+
+    day = schedule.date
+    daily = asyncio.run(get_calendar(
+        from_date=day - timedelta(days=1), to_date=day, mode='heatmap', bucket='day', db=db, current_user=user
+    ))
+    assert daily['buckets'] == [str(day - timedelta(days=1)), str(day)]
+    kayak = next(r for r in daily['resources'] if r['resource_id'] == resource.id)
+    sup = next(r for r in daily['resources'] if r['resource_id'] == idle.id)
+    # 11:30–12:00 заняты оба слота: 2 + 1 из 4
+    assert kayak['peak_used'] == [0, 3]
+    assert kayak['utilisation'] == [0, 0.75]
+    assert sup['utilisation'] == [0, 0]
+
+    hourly = asyncio.run(get_calendar(
+        from_date=day, to_date=day, mode='heatmap', bucket='hour', db=db, current_user=user
+    ))
+    kayak = next(r for r in hourly['resources'] if r['resource_id'] == resource.id)
+    assert hourly['buckets'][10] == f"{day}T10:00"
+    assert kayak['peak_used'][9:14] == [0, 2, 3, 1, 0]
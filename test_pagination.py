@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.booking import Booking
+from app.services.pagination import count_total, decode_cursor, encode_cursor, fetch_page
+
+
+def create_bookings(db, schedule, count):
+    start = datetime(2026, 1, 1, 12, 0)
+    for i in range(count):
+        db.add(Booking(
+            booking_code=f"BKPAGE{i:03d}",
+            booking_type='tour',
+            tour_schedule_id=schedule.id,
+            participants_count=1,
+            total_price=1000,
+            # Пары с одинаковым created_at — порядок решает id
+            created_at=start + timedelta(minutes=i // 2)
+        ))
+    db.flush()
+
+
+def test_cursor_pages_match_offset_pages(db, make_schedule):
+    schedule = make_schedule()
+    create_bookings(db, schedule, 7)
+    query = db.query(Booking).filter(Booking.tour_schedule_id == schedule.id)
+
+    by_cursor = []
+    cursor = None
+    while True:
+        rows, cursor = fetch_page(query, Booking.created_at, Booking.id, 3, cursor=cursor)
+        by_cursor.extend(b.id for b in rows)
+        if not cursor:
+            break
+
+    by_offset = []
+    for page in (1, 2, 3):
+        rows, _ = fetch_page(query, Booking.created_at, Booking.id, 3, page=page)
+        by_offset.extend(b.id for b in rows)
+
+    assert by_cursor == by_offset
+    assert len(set(by_cursor)) == 7
+
+    assert count_total(query, 'exact') == 7
+    assert count_total(query, 'none') is None
+    assert count_total(query, 'estimated') >= 0
+
+
+def test_cursor_roundtrip_and_invalid_cursor():
+    created_at = datetime(2026, 1, 1, 12, 0, 0, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+    with pytest.raises(ValueError):
+        decode_cursor("не-курсор")
+
@@ -0,0 +1,151 @@
+import asyncio
+from datetime import time, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+from app.api.routes.tours import create_tour_schedule, update_tour
+from app.models.pricing import PricingRule
+from app.models.schedule import ScheduleTemplate
+from app.models.tour import Tour, TourSchedule
+from app.schemas.tour import ScheduleBulkOperation, TourCreate, TourScheduleCreate
+from app.services import pricing_engine
+from app.services.booking_service import BookingService
+from app.services.pricing_engine import PricingEngine
+from app.services.schedule_bulk import ScheduleBulk
+from app.services.schedule_generator import ScheduleGenerator
+
+
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_rules_preview_apply_and_incremental_reprice(db, make_schedule, monkeypatch, vectorized):
+    if vectorized and pricing_engine.np is None:
+        pytest.skip("NumPy не установлен")
+    if not vectorized:
+        monkeypatch.setattr(pricing_engine, 'np', None)
+
+    schedule = make_schedule(base_price=1000)  # через 7 дней, 10 мест
+    tour_id = schedule.tour_id
+    manual = TourSchedule(
+        tour_id=tour_id, date=schedule.date, start_time=time(15, 0), end_time=time(16, 0),
+        available_slots=10, booked_slots=0, price_override=500
+    )
+    db.add(manual)
+    db.add_all([
+        PricingRule(tour_id=tour_id, rule_type='occupancy', min_occupancy=0.5, adjust_percent=20),
+        PricingRule(tour_id=tour_id, rule_type='occupancy', min_occupancy=0.8, adjust_percent=50),
+        PricingRule(tour_id=tour_id, rule_type='lead_time', lead_days_max=14, adjust_percent=-5),
+        PricingRule(tour_id=tour_id, rule_type='lead_time', lead_days_max=10, adjust_percent=-10),
+        PricingRule(tour_id=tour_id, rule_type='weekday', week_days=[schedule.date.isoweekday()], adjust_percent=10),
+        PricingRule(tour_id=tour_id, rule_type='season', date_from=schedule.date + timedelta(days=1), adjust_percent=30),
+    ])
+    db.flush()
+
+    # Предпросмотр ничего не пишет; ручная цена не участвует
+    preview = PricingEngine.reprice(db, tour_id=tour_id, dry_run=True)
+    assert preview['matched'] == 1
+    assert [(i['schedule_id'], i['current_price'], i['new_price']) for i in preview['items']] == [
+        (schedule.id, 1000.0, 990.0)  # 1000 × 0.9 × 1.1
+    ]
+    db.refresh(schedule)
+    assert schedule.price_override is None
+
+    assert PricingEngine.reprice(db, tour_id=tour_id)['changed'] == 1
+    db.refresh(schedule)
+    db.refresh(manual)
+    assert (float(schedule.price_override), schedule.dynamic_price) == (990.0, True)
+    assert (float(manual.price_override), manual.dynamic_price) == (500.0, False)
+    assert PricingEngine.reprice(db, tour_id=tour_id)['changed'] == 0
+
+    # Бронирование меняет занятость — пересчитывается только этот слот
+    booking, message = BookingService.create_booking(
+        db=db, tour_schedule_id=schedule.id, participants_count=5,
+        customer_name="Иван", customer_phone="+7 900 000-00-00"
+    )
+    assert booking, message
+    assert float(booking.total_price) == 990.0 * 5
+    while PricingEngine.run_incremental(db, lag_seconds=0):
+        pass
+    db.refresh(schedule)
+    assert float(schedule.price_override) == 1188.0  # 1000 × 1.2 × 0.9 × 1.1
+
+    # Котировка берёт цену слота из сессии без запросов к БД:
+    # тур и слот уже загружены, как в /calculate
+    tour = db.query(Tour).filter(Tour.id == tour_id).first()
+    BookingService.check_availability(db, schedule.id, 2)
+    BookingService.calculate_price(db, tour_id, schedule.id, 2)  # прогрев кеша ресурсов тура
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.get_bind(), 'before_cursor_execute', listener)
+    try:
+        total_price, _ = BookingService.calculate_price(db, tour_id, schedule.id, 2)
+    finally:
+        event.remove(db.get_bind(), 'before_cursor_execute', listener)
+    assert total_price == 2376.0
+    assert statements == []
+    assert tour.base_price == 1000
+
+    # Групповое бронирование — по той же цене слота (динамической и ручной)
+    bookings, errors = BookingService.create_bookings_bulk(db, schedule.tour.business_id, [
+        {'tour_schedule_id': schedule.id, 'participants_count': 2, 'customer_name': "Агентство", 'customer_phone': "+7 900 000-00-01"},
+        {'tour_schedule_id': manual.id, 'participants_count': 3, 'customer_name': "Агентство", 'customer_phone': "+7 900 000-00-01"},
+    ])
+    assert errors == []
+    assert [float(b.total_price) for b in bookings] == [2376.0, 1500.0]
+
+
+def test_schedule_writes_reprice_immediately(db, make_schedule):
+    schedule = make_schedule(base_price=1000)
+    tour = schedule.tour
+    user = SimpleNamespace(business_profile=tour.business)
+    db.add(PricingRule(tour_id=tour.id, rule_type='occupancy', min_occupancy=0.5, adjust_percent=20))
+    db.add(PricingRule(tour_id=tour.id, rule_type='lead_time', lead_days_max=30, adjust_percent=10))
+    db.flush()
+
+    def prices(*ids):
+        return [float(price) if price is not None else None for (price,) in db.query(
+            TourSchedule.price_override
+        ).filter(TourSchedule.id.in_(ids)).order_by(TourSchedule.id)]
+
+    # Слот, созданный вручную, сразу получает цену по правилам; ручная цена остаётся
+    created = asyncio.run(create_tour_schedule(tour.id, TourScheduleCreate(
+        date=schedule.date, start_time=time(14, 0), end_time=time(16, 0), available_slots=10
+    ), db=db, current_user=user))
+    manual = asyncio.run(create_tour_schedule(tour.id, TourScheduleCreate(
+        date=schedule.date, start_time=time(17, 0), end_time=time(19, 0), available_slots=10, price_override=700
+    ), db=db, current_user=user))
+    assert prices(created.id, manual.id) == [1100.0, 700.0]
+
+    # Слоты из шаблона — тоже
+    template = ScheduleTemplate(
+        tour_id=tour.id, week_days=[1, 2, 3, 4, 5, 6, 7],
+        start_time=time(8, 0), end_time=time(9, 0), slot_duration_minutes=60
+    )
+    db.add(template)
+    db.flush()
+    assert ScheduleGenerator.generate_schedules_from_template(
+        db, template, schedule.date, schedule.date + timedelta(days=1)
+    )[0] == 2
+    generated = [s.id for s in db.query(TourSchedule).filter(TourSchedule.schedule_template_id == template.id)]
+    assert prices(*generated) == [1100.0, 1100.0]
+
+    # Меньшая вместимость поднимает занятость — надбавка применяется сразу
+    booking, message = BookingService.create_booking(
+        db=db, tour_schedule_id=created.id, participants_count=3,
+        customer_name="Иван", customer_phone="+7 900 000-00-00"
+    )
+    assert booking, message
+    result = ScheduleBulk.apply(db, tour.business_id, ScheduleBulkOperation(
+        filter={'date_from': schedule.date, 'date_to': schedule.date, 'tour_id': tour.id,
+                'time_from': time(14, 0), 'time_to': time(16, 0)},
+        operation='set_capacity', available_slots=5
+    ))
+    assert result['affected_ids'] == [created.id]
+    assert prices(created.id) == [1320.0]  # 1000 × 1.2 × 1.1
+
+    # Новая базовая цена тура пересчитывает динамические цены его слотов
+    asyncio.run(update_tour(tour.id, TourCreate(
+        name=tour.name, base_price=2000, activities=None, resources=None, locations=None
+    ), db=db, current_user=user))
+    assert prices(created.id, manual.id) == [2640.0, 700.0]
+    assert prices(*generated) == [2200.0, 2200.0]
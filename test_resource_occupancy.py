@@ -0,0 +1,145 @@
+import asyncio
+from datetime import date, time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes.resources import check_resource_availability, get_resources_timeline
+from app.api.routes.tours import create_tour_schedule
+from app.models.resource import Resource, ScheduleResource
+from app.models.schedule import ScheduleTemplate
+from app.models.tour import TourResource, TourSchedule
+from app.schemas.tour import TourScheduleCreate
+from app.services.resource_occupancy import ResourceOccupancy
+from app.services.resource_requirements import ResourceRequirements
+from app.services.schedule_generator import ScheduleGenerator
+
+
+def test_max_usage_counts_only_concurrent_intervals():
+    day = date(2026, 7, 1)
+    occupancy = ResourceOccupancy()
+    occupancy.add(1, day, time(9, 0), time(11, 0), 2, schedule_id=1)
+    occupancy.add(1, day, time(11, 0), time(13, 0), 3, schedule_id=2)
+    occupancy.add(1, day, time(12, 0), time(14, 0), 1, schedule_id=3)
+
+    # Слоты 1 и 2 не пересекаются между собой — их занятость не суммируется
+    assert occupancy.max_usage(1, day, time(10, 0), time(12, 0)) == 3
+    assert occupancy.max_usage(1, day, time(12, 0), time(13, 0)) == 4
+    assert occupancy.max_usage(1, day, time(14, 0), time(15, 0)) == 0
+    assert occupancy.max_usage(1, day, time(8, 0), time(9, 0)) == 0
+    assert occupancy.max_usage(2, day, time(10, 0), time(12, 0)) == 0
+    # Без времени окончания — два часа
+    assert occupancy.max_usage(1, day, time(13, 30), None) == 1
+
+    removed = occupancy.remove_schedule(2)
+    assert occupancy.max_usage(1, day, time(12, 0), time(13, 0)) == 1
+    occupancy.restore(removed)
+    assert occupancy.max_usage(1, day, time(12, 0), time(13, 0)) == 4
+
+
+def test_generator_respects_resource_capacity(db, make_schedule):
+    existing = make_schedule(days_ahead=30)
+    tour = existing.tour
+    resource = Resource(business_id=tour.business_id, name="Квадроцикл", resource_type="atv", quantity=2)
+    db.add(resource)
+    db.flush()
+    db.add(TourResource(tour_id=tour.id, resource_id=resource.id, quantity_needed=1))
+    # Существующий слот занимает одну единицу с 10:00 до 12:00
+    db.add(ScheduleResource(tour_schedule_id=existing.id, resource_id=resource.id, quantity_used=1))
+    db.flush()
+    ResourceRequirements.invalidate(tour_id=tour.id)
+
+    other = make_schedule(days_ahead=30, business=tour.business)
+    other_template = ScheduleTemplate(
+        tour_id=other.tour_id, week_days=[1, 2, 3, 4, 5, 6, 7],
+        start_time=time(9, 0), end_time=time(13, 0), slot_duration_minutes=60
+    )
+    db.add(TourResource(tour_id=other.tour_id, resource_id=resource.id, quantity_needed=1))
+    db.add(other_template)
+    db.flush()
+    ResourceRequirements.invalidate(tour_id=other.tour_id)
+
+    template = ScheduleTemplate(
+        tour_id=tour.id, week_days=[1, 2, 3, 4, 5, 6, 7],
+        start_time=time(9, 0), end_time=time(13, 0), slot_duration_minutes=60
+    )
+    db.add(template)
+    db.flush()
+
+    day = existing.date
+    created, skipped, conflicts = ScheduleGenerator.generate_schedules_from_template(db, template, day, day)
+    # 10:00 уже занят этим туром (пропуск), остальные три слота помещаются
+    assert (created, skipped, conflicts) == (3, 1, [])
+
+    # Второй тур: 10:00 уже есть, в 11:00 обе единицы заняты (существующий слот + новый 11:00)
+    created, skipped, conflicts = ScheduleGenerator.generate_schedules_from_template(db, other_template, day, day)
+    assert created == 2 and skipped == 2
+    assert conflicts == [f"{day} 11:00:00: Недостаточно 'Квадроцикл': нужно 1, доступно 0"]
+
+    usage = db.query(ScheduleResource).join(TourSchedule).filter(
+        TourSchedule.date == day, ScheduleResource.resource_id == resource.id
+    ).count()
+    assert usage == 6
+
+
+def test_timeline_and_availability_use_time_of_day(db, make_schedule):
+    schedule = make_schedule()  # 10:00–12:00
+    business = schedule.tour.business
+    user = SimpleNamespace(business_profile=business)
+    resource = Resource(business_id=business.id, name="Лодка", resource_type="boat", quantity=3)
+    db.add(resource)
+    db.flush()
+    db.add(ScheduleResource(tour_schedule_id=schedule.id, resource_id=resource.id, quantity_used=2))
+    db.flush()
+
+    timeline = asyncio.run(get_resources_timeline(
+        date_from=schedule.date, date_to=None, resource_id=None, db=db, current_user=user
+    ))
+    (item,) = timeline['resources']
+    assert item['days'][0]['steps'] == [
+        {'start': '00:00', 'end': '10:00', 'used': 0, 'free': 3},
+        {'start': '10:00', 'end': '12:00', 'used': 2, 'free': 1},
+        {'start': '12:00', 'end': '24:00', 'used': 0, 'free': 3},
+    ]
+
+    morning = asyncio.run(check_resource_availability(
+        resource_id=resource.id, check_date=schedule.date, start_time=time(8, 0), end_time=time(10, 0),
+        db=db, current_user=user
+    ))
+    assert morning['available_quantity'] == 3
+    noon = asyncio.run(check_resource_availability(
+        resource_id=resource.id, check_date=schedule.date, start_time=time(11, 0), end_time=time(13, 0),
+        db=db, current_user=user
+    ))
+    assert noon['available_quantity'] == 1
+
+
+def test_schedule_without_end_time_uses_tour_duration(db, make_schedule):
+    existing = make_schedule(days_ahead=30)  # 10:00–12:00
+    tour = existing.tour
+    user = SimpleNamespace(business_profile=tour.business)
+    resource = Resource(business_id=tour.business_id, name="Катамаран", resource_type="boat", quantity=1)
+    db.add(resource)
+    db.flush()
+    db.add(TourResource(tour_id=tour.id, resource_id=resource.id, quantity_needed=1))
+    db.add(ScheduleResource(tour_schedule_id=existing.id, resource_id=resource.id, quantity_used=1))
+    db.flush()
+    ResourceRequirements.invalidate(tour_id=tour.id)
+    data = TourScheduleCreate(date=existing.date, start_time=time(9, 0), available_slots=5)
+
+    # Длительность тура не задана — ресурсы не проверяются (как раньше)
+    tour.duration_minutes = None
+    created = asyncio.run(create_tour_schedule(tour.id, data, db=db, current_user=user))
+    assert created.end_time is None
+
+    # 9:00 + 90 минут пересекается с занятым 10:00–12:00
+    tour.duration_minutes = 90
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(create_tour_schedule(tour.id, data, db=db, current_user=user))
+    assert exc.value.status_code == 400
+
+    # 8:00 + 60 минут заканчивается до 9:00 (слот без окончания выше — 9:00–11:00)
+    tour.duration_minutes = 60
+    early = data.model_copy(update={'start_time': time(8, 0)})
+    asyncio.run(create_tour_schedule(tour.id, early, db=db, current_user=user))
@@ -0,0 +1,75 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event, update
+
+from app.models.resource import Resource
+from app.models.tour import TourResource
+from app.services import resource_requirements
+from app.services.resource_requirements import ResourceRequirements
+
+
+@pytest.fixture
+def statements(db):
+    """SQL-запросы, выполненные сессией за время теста"""
+    executed = []
+    listener = lambda *args: executed.append(args[2])
+    event.listen(db.get_bind(), 'before_cursor_execute', listener)
+    ResourceRequirements.invalidate()
+    try:
+        yield executed
+    finally:
+        event.remove(db.get_bind(), 'before_cursor_execute', listener)
+        ResourceRequirements.invalidate()
+
+
+def add_boat(db, tour, seats_per_unit=4):
+    boat = Resource(business_id=tour.business_id, name="Катер", resource_type='boat', quantity=3, seats_per_unit=seats_per_unit)
+    db.add(boat)
+    db.flush()
+    db.add(TourResource(tour_id=tour.id, resource_id=boat.id, quantity_needed=2))
+    db.commit()
+    return boat
+
+
+def test_cache_hit_ttl_and_orm_invalidation(db, make_schedule, statements, monkeypatch):
+    tour = make_schedule().tour
+    boat = add_boat(db, tour)
+
+    assert [row.seats_per_unit for row in ResourceRequirements.for_tour(db, tour.id)] == [4]
+    loaded = len(statements)
+    assert ResourceRequirements.for_tour(db, tour.id)[0].seats_per_unit == 4
+    assert len(statements) == loaded  # из кеша
+
+    # Изменение в обход ORM (как из другого процесса) видно только по истечении TTL
+    db.execute(update(Resource).where(Resource.id == boat.id).values(seats_per_unit=6))
+    db.commit()
+    assert ResourceRequirements.for_tour(db, tour.id)[0].seats_per_unit == 4
+    later = time.monotonic() + resource_requirements.settings.RESOURCE_REQUIREMENTS_TTL_SECONDS + 1
+    monkeypatch.setattr(resource_requirements, 'time', SimpleNamespace(monotonic=lambda: later))
+    assert ResourceRequirements.for_tour(db, tour.id)[0].seats_per_unit == 6
+    monkeypatch.undo()
+
+    # Изменение через ORM сбрасывает кеш
+    db.refresh(boat)
+    boat.seats_per_unit = 8
+    db.commit()
+    assert ResourceRequirements.for_tour(db, tour.id)[0].seats_per_unit == 8
+
+
+def test_uncommitted_changes_are_not_cached_and_rollback_invalidates(db, make_schedule, statements):
+    tour = make_schedule().tour
+    boat = add_boat(db, tour)
+    assert ResourceRequirements.for_tour(db, tour.id)[0].seats_per_unit == 4
+
+    # Внутри транзакции сессия видит свои изменения, но кеш ими не заполняется
+    boat.seats_per_unit = 10
+    assert ResourceRequirements.for_tour(db, tour.id)[0].seats_per_unit == 10
+    assert tour.id not in ResourceRequirements._cache
+    assert db.info[resource_requirements.DIRTY_KEY]
+
+    db.rollback()
+    assert resource_requirements.DIRTY_KEY not in db.info
+    assert ResourceRequirements.for_tour(db, tour.id)[0].seats_per_unit == 4
+    assert tour.id in ResourceRequirements._cache
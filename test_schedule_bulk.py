@@ -0,0 +1,98 @@
+from datetime import time, timedelta
+
+import pytest
+
+from app.models.resource import Resource, ScheduleResource
+from app.models.tour import TourSchedule
+from app.schemas.tour import ScheduleBulkOperation
+from app.services.booking_service import BookingService
+from app.services.schedule_bulk import ScheduleBulk
+
+
+def operation(schedule, name, **params):
+    return ScheduleBulkOperation(
+        filter={'date_from': schedule.date, 'date_to': schedule.date + timedelta(days=1), 'tour_id': schedule.tour_id},
+        operation=name,
+        **params
+    )
+
+
+def add_slot(db, schedule, start_hour, days=0):
+    slot = TourSchedule(
+        tour_id=schedule.tour_id, date=schedule.date + timedelta(days=days),
+        start_time=time(start_hour, 0), end_time=time(start_hour + 1, 0), available_slots=10, booked_slots=0
+    )
+    db.add(slot)
+    db.flush()
+    return slot
+
+
+def test_shift_skips_booked_slots_and_resource_conflicts(db, make_schedule):
+    booked = make_schedule()  # 10:00–12:00
+    business_id = booked.tour.business_id
+    booking, message = BookingService.create_booking(
+        db=db, tour_schedule_id=booked.id, participants_count=1,
+        customer_name="Иван", customer_phone="+7 900 000-00-00"
+    )
+    assert booking, message
+
+    boat = Resource(business_id=business_id, name="Лодка", resource_type="boat", quantity=1)
+    db.add(boat)
+    db.flush()
+    early = add_slot(db, booked, 7)    # 07:00 → 07:30 — свободно
+    blocked = add_slot(db, booked, 13)  # 13:00 → 13:30 — лодка занята другим туром в 14:00
+    other_tour = make_schedule(business=booked.tour.business)
+    other = TourSchedule(
+        tour_id=other_tour.tour_id, date=booked.date, start_time=time(14, 0), end_time=time(15, 0),
+        available_slots=5, booked_slots=0
+    )
+    db.add(other)
+    db.flush()
+    db.add_all([
+        ScheduleResource(tour_schedule_id=early.id, resource_id=boat.id, quantity_used=1),
+        ScheduleResource(tour_schedule_id=blocked.id, resource_id=boat.id, quantity_used=1),
+        ScheduleResource(tour_schedule_id=other.id, resource_id=boat.id, quantity_used=1),
+    ])
+    db.flush()
+
+    preview = ScheduleBulk.apply(db, business_id, operation(booked, 'shift', shift_minutes=30, dry_run=True))
+    assert preview['matched'] == 3
+    assert preview['protected_ids'] == [booked.id]
+    assert preview['affected_ids'] == [early.id]
+    assert [c['schedule_id'] for c in preview['conflicts']] == [blocked.id]
+    db.refresh(early)
+    assert early.start_time == time(7, 0)  # dry_run ничего не пишет
+
+    result = ScheduleBulk.apply(db, business_id, operation(booked, 'shift', shift_minutes=30))
+    assert result['affected_ids'] == [early.id]
+    db.refresh(early)
+    db.refresh(booked)
+    assert (early.start_time, early.end_time) == (time(7, 30), time(8, 30))
+    assert booked.start_time == time(10, 0)
+
+
+def test_capacity_price_and_delete_protect_bookings(db, make_schedule):
+    booked = make_schedule()
+    business_id = booked.tour.business_id
+    booking, message = BookingService.create_booking(
+        db=db, tour_schedule_id=booked.id, participants_count=4,
+        customer_name="Иван", customer_phone="+7 900 000-00-00"
+    )
+    assert booking, message
+    weekend_id = add_slot(db, booked, 15, days=1).id
+
+    result = ScheduleBulk.apply(db, business_id, operation(booked, 'set_capacity', available_slots=3))
+    assert result['protected_ids'] == [booked.id]
+    assert result['affected_ids'] == [weekend_id]
+
+    result = ScheduleBulk.apply(db, business_id, operation(booked, 'set_price', price_override=2500))
+    assert result['affected'] == 2
+
+    result = ScheduleBulk.apply(db, business_id, operation(booked, 'delete'))
+    assert result['protected_ids'] == [booked.id]
+    assert db.query(TourSchedule).filter(TourSchedule.id == weekend_id).count() == 0
+    db.refresh(booked)
+    assert (booked.available_slots, float(booked.price_override)) == (10, 2500.0)
+
+    with pytest.raises(ValueError):
+        ScheduleBulk.apply(db, business_id, operation(booked, 'shift'))
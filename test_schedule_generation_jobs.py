@@ -0,0 +1,86 @@
+import asyncio
+from datetime import date, time, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes.schedule_templates import cancel_generation_job, generate_schedules, get_generation_job
+from app.models.schedule import ScheduleGenerationJob, ScheduleTemplate
+from app.models.tour import TourSchedule
+from app.schemas.schedule import ScheduleGenerateRequest
+from app.services.schedule_generation_jobs import ScheduleGenerationJobs
+
+
+def test_job_runs_in_chunks_and_resumes_after_cancel(db, make_schedule):
+    existing = make_schedule(days_ahead=3)  # 10:00–12:00, будет пропущен
+    tour = existing.tour
+    user = SimpleNamespace(business_profile=tour.business)
+    template = ScheduleTemplate(
+        tour_id=tour.id, week_days=[1, 2, 3, 4, 5, 6, 7],
+        start_time=time(10, 0), end_time=time(14, 0), slot_duration_minutes=120
+    )
+    db.add(template)
+    db.flush()
+    request = ScheduleGenerateRequest(
+        template_id=template.id, start_date=existing.date, end_date=existing.date + timedelta(days=19)
+    )
+
+    job = asyncio.run(generate_schedules(template.id, request, db=db, current_user=user))
+    assert (job['status'], job['days_done'], job['slots_created']) == ('pending', 0, 0)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(generate_schedules(template.id, request, db=db, current_user=user))
+    assert exc.value.status_code == 409
+
+    # Первый кусок: 7 дней × 2 слота, один слот уже был
+    assert ScheduleGenerationJobs.run_chunk(db, chunk_days=7) == job['job_id']
+    progress = asyncio.run(get_generation_job(job['job_id'], db=db, current_user=user))
+    assert progress['status'] == 'running'
+    assert (progress['days_done'], progress['slots_created'], progress['slots_skipped']) == (7, 13, 1)
+    assert progress['next_date'] == existing.date + timedelta(days=7)
+
+    cancelled = asyncio.run(cancel_generation_job(job['job_id'], db=db, current_user=user))
+    assert cancelled['status'] == 'cancelled'
+    assert ScheduleGenerationJobs.run_chunk(db, chunk_days=7) is None
+
+    # Продолжение с первого необработанного дня — без повторов
+    ScheduleGenerationJobs.resume(db, db.get(ScheduleGenerationJob, job['job_id']))
+    while ScheduleGenerationJobs.run_chunk(db, chunk_days=7):
+        pass
+    done = ScheduleGenerationJobs.progress(db.get(ScheduleGenerationJob, job['job_id']))
+    assert (done['status'], done['days_done'], done['progress']) == ('completed', 20, 1.0)
+    assert (done['slots_created'], done['slots_skipped']) == (39, 1)
+    assert db.query(TourSchedule).filter(TourSchedule.schedule_template_id == template.id).count() == 39
+
+
+def test_concurrent_generate_requests_leave_one_active_job(db, make_schedule, monkeypatch):
+    tour = make_schedule().tour
+    user = SimpleNamespace(business_profile=tour.business)
+    template = ScheduleTemplate(
+        tour_id=tour.id, week_days=[1, 2, 3, 4, 5, 6, 7],
+        start_time=time(10, 0), end_time=time(12, 0), slot_duration_minutes=120
+    )
+    db.add(template)
+    db.commit()
+    request = ScheduleGenerateRequest(
+        template_id=template.id, start_date=date.today(), end_date=date.today() + timedelta(days=3)
+    )
+
+    first = asyncio.run(generate_schedules(template.id, request, db=db, current_user=user))
+    # Второй запрос прошёл проверку раньше, чем первый записал задачу
+    monkeypatch.setattr(ScheduleGenerationJobs, 'active_for_template', staticmethod(lambda db, template_id: None))
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(generate_schedules(template.id, request, db=db, current_user=user))
+    assert exc.value.status_code == 409
+
+    cancelled = db.get(ScheduleGenerationJob, first['job_id'])
+    ScheduleGenerationJobs.cancel(db, cancelled.id)
+    second = asyncio.run(generate_schedules(template.id, request, db=db, current_user=user))
+    db.refresh(cancelled)
+    with pytest.raises(ValueError):
+        ScheduleGenerationJobs.resume(db, cancelled)
+    statuses = [j.status for j in db.query(ScheduleGenerationJob).filter(
+        ScheduleGenerationJob.template_id == template.id
+    ).order_by(ScheduleGenerationJob.id)]
+    assert statuses == ['cancelled', 'pending']
+    assert second['job_id'] != first['job_id']
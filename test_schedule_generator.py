@@ -0,0 +1,60 @@
+from datetime import time, timedelta
+
+from sqlalchemy import event
+
+from app.models.resource import Resource, ScheduleResource
+from app.models.schedule import ScheduleTemplate
+from app.models.tour import TourResource, TourSchedule
+from app.services.booking_service import BookingService
+from app.services.resource_requirements import ResourceRequirements
+from app.services.schedule_generator import ScheduleGenerator
+
+
+def test_generator_overwrites_in_bulk_and_keeps_booked_slots(db, make_schedule):
+    booked = make_schedule(days_ahead=10)  # 10:00–12:00
+    tour = booked.tour
+    booking, message = BookingService.create_booking(
+        db=db, tour_schedule_id=booked.id, participants_count=1,
+        customer_name="Иван", customer_phone="+7 900 000-00-00"
+    )
+    assert booking, message
+    free = TourSchedule(
+        tour_id=tour.id, date=booked.date + timedelta(days=1), start_time=time(9, 0), end_time=time(9, 30),
+        available_slots=3, booked_slots=0
+    )
+    boat = Resource(business_id=tour.business_id, name="Лодка", resource_type="boat", quantity=5)
+    db.add_all([free, boat])
+    db.flush()
+    db.add(TourResource(tour_id=tour.id, resource_id=boat.id, quantity_needed=2))
+    template = ScheduleTemplate(
+        tour_id=tour.id, week_days=[1, 2, 3, 4, 5, 6, 7],
+        start_time=time(9, 0), end_time=time(17, 0), slot_duration_minutes=60, break_duration_minutes=0
+    )
+    db.add(template)
+    db.flush()
+    ResourceRequirements.invalidate(tour_id=tour.id)
+    free_id = free.id
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.get_bind(), 'before_cursor_execute', listener)
+    try:
+        created, skipped, conflicts = ScheduleGenerator.generate_schedules_from_template(
+            db, template, booked.date, booked.date + timedelta(days=29), overwrite_existing=True
+        )
+    finally:
+        event.remove(db.get_bind(), 'before_cursor_execute', listener)
+
+    # 30 дней × 8 слотов; слот 10:00 с бронированием остаётся
+    assert (created, skipped) == (239, 1)
+    assert conflicts == [f"{booked.date} 10:00:00: слот с бронированиями не перезаписан"]
+    # Число запросов не зависит от длины периода
+    assert len(statements) <= 12
+
+    assert db.query(TourSchedule).filter(TourSchedule.id == free_id).count() == 0
+    assert db.query(TourSchedule).filter(TourSchedule.id == booked.id).count() == 1
+    assert db.query(ScheduleResource).join(TourSchedule).filter(
+        TourSchedule.schedule_template_id == template.id,
+        ScheduleResource.resource_id == boat.id,
+        ScheduleResource.quantity_used == 2
+    ).count() == 239
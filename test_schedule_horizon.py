@@ -0,0 +1,157 @@
+import threading
+import uuid
+from datetime import date, time, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+from app.core.schema import upgrade
+from app.models.schedule import ScheduleGenerationJob, ScheduleTemplate
+from app.models.tour import Tour, TourSchedule
+from app.models.user import BusinessProfile, User
+from app.services import schedule_horizon
+from app.services.schedule_generation_jobs import ScheduleGenerationJobs
+from app.services.schedule_generator import ScheduleGenerator
+from app.services.schedule_horizon import ScheduleHorizon
+
+
+def template_slots(db, template):
+    return [d for (d,) in db.query(TourSchedule.date).filter(
+        TourSchedule.schedule_template_id == template.id
+    ).order_by(TourSchedule.date)]
+
+
+def test_horizon_extends_only_missing_tail(db, make_schedule, monkeypatch):
+    today = date.today()
+    fresh_tour = make_schedule().tour
+    old_tour = make_schedule(business=fresh_tour.business).tour
+
+    def template(tour, **kwargs):
+        t = ScheduleTemplate(
+            tour_id=tour.id, week_days=[1, 2, 3, 4, 5, 6, 7],
+            start_time=time(13, 0), end_time=time(15, 0), slot_duration_minutes=120, **kwargs
+        )
+        db.add(t)
+        return t
+
+    fresh = template(fresh_tour)
+    old = template(old_tour)      # сгенерирован вручную до today + 5
+    disabled = template(old_tour, is_active=False)
+    db.flush()
+    db.add(TourSchedule(
+        tour_id=old_tour.id, schedule_template_id=old.id, date=today + timedelta(days=5),
+        start_time=time(13, 0), end_time=time(15, 0), available_slots=10
+    ))
+    db.commit()
+
+    # Потоки работают с тестовой сессией
+    monkeypatch.setattr(schedule_horizon, 'SessionLocal', lambda: db)
+    monkeypatch.setattr(db, 'close', lambda: None)
+
+    summary = ScheduleHorizon.run(db, horizon_days=10, concurrency=1, batch_size=1)
+    assert (summary['extended'], summary['failed']) == (2, 0)
+    assert summary['created'] == 11 + 5
+    assert template_slots(db, fresh) == [today + timedelta(days=i) for i in range(11)]
+    assert template_slots(db, old) == [today + timedelta(days=i) for i in range(5, 11)]
+    assert template_slots(db, disabled) == []
+    db.refresh(fresh)
+    assert fresh.generated_until == today + timedelta(days=10)
+
+    # Горизонт уже покрыт — работы нет; сдвиг горизонта догенерирует только хвост
+    assert ScheduleHorizon.run(db, horizon_days=10, concurrency=1)['templates'] == 0
+    summary = ScheduleHorizon.run(db, horizon_days=12, concurrency=1)
+    assert (summary['templates'], summary['created']) == (2, 4)
+
+
+@pytest.fixture
+def committed():
+    """
+    Данные, видимые из разных соединений: тест блокировок не может жить
+    в откатываемой транзакции db. Удаляются после теста.
+    """
+    try:
+        session = Session(engine)
+        upgrade(engine)
+    except OperationalError:
+        pytest.skip("PostgreSQL недоступен")
+
+    user = User(email=f"test-{uuid.uuid4().hex[:8]}@example.com", password_hash="x", user_type="business")
+    session.add(user)
+    session.flush()
+    business = BusinessProfile(user_id=user.id, business_name="Тестовый бизнес")
+    session.add(business)
+    session.flush()
+    tour = Tour(business_id=business.id, name="Тестовый тур", base_price=1000, max_participants=10)
+    session.add(tour)
+    session.flush()
+    template = ScheduleTemplate(
+        tour_id=tour.id, week_days=[1, 2, 3, 4, 5, 6, 7],
+        start_time=time(10, 0), end_time=time(14, 0), slot_duration_minutes=120
+    )
+    session.add(template)
+    session.commit()
+    try:
+        yield session, template
+    finally:
+        session.rollback()
+        session.query(TourSchedule).filter(TourSchedule.tour_id == tour.id).delete()
+        session.query(ScheduleGenerationJob).filter(ScheduleGenerationJob.template_id == template.id).delete()
+        session.delete(template)
+        session.delete(tour)
+        session.delete(business)
+        session.delete(user)
+        session.commit()
+        session.close()
+
+
+def test_job_chunk_waits_for_horizon_of_the_same_template(committed, monkeypatch):
+    session, template = committed
+    today = date.today()
+    job = ScheduleGenerationJob(
+        template_id=template.id, start_date=today + timedelta(days=1), end_date=today + timedelta(days=2),
+        next_date=today + timedelta(days=1), status='cancelled', conflicts=[]
+    )
+    session.add(job)
+    session.commit()
+
+    # Пока горизонт держит шаблон с незафиксированным хвостом, задачу продолжают
+    worker = {}
+
+    def resume_and_run():
+        db = Session(engine)
+        try:
+            ScheduleGenerationJobs.resume(db, db.get(ScheduleGenerationJob, job.id))
+            worker['job_id'] = ScheduleGenerationJobs.run_chunk(db, chunk_days=7)
+        finally:
+            db.close()
+
+    def generate_and_overlap(**kwargs):
+        result = ScheduleGenerator.generate_schedules_from_template(**kwargs)
+        thread = threading.Thread(target=resume_and_run)
+        thread.start()
+        thread.join(0.5)
+        worker['blocked'] = thread.is_alive()
+        worker['thread'] = thread
+        return result
+
+    monkeypatch.setattr(schedule_horizon, 'ScheduleGenerator', SimpleNamespace(
+        generate_schedules_from_template=generate_and_overlap
+    ))
+    summary = ScheduleHorizon.extend_template(template.id, today + timedelta(days=2))
+    worker['thread'].join(10)
+
+    assert summary['created'] == 6
+    assert worker['blocked']
+    assert worker['job_id'] == job.id
+    # Кусок задачи увидел слоты горизонта и не задвоил их
+    session.expire_all()
+    job = session.get(ScheduleGenerationJob, job.id)
+    assert (job.status, job.slots_created, job.slots_skipped) == ('completed', 0, 4)
+    duplicates = session.query(TourSchedule.date, TourSchedule.start_time).filter(
+        TourSchedule.schedule_template_id == template.id
+    ).group_by(TourSchedule.date, TourSchedule.start_time).having(func.count() > 1).all()
+    assert duplicates == []
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.database import Base, engine
+from app.core.schema import COLUMNS, INDEXES, TABLES, upgrade
+from app.models.booking import BOOKING_SEARCH_INDEXES_DDL
+
+
+def test_upgrade_brings_existing_database_to_models():
+    try:
+        upgrade(engine)
+    except OperationalError:
+        pytest.skip("PostgreSQL недоступен")
+    # Повторный запуск (каждый деплой) ничего не ломает
+    upgrade(engine)
+
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    assert {table.name for table in TABLES} <= tables
+    for table_name, column, _ in COLUMNS:
+        assert column in {c['name'] for c in inspector.get_columns(table_name)}
+    with engine.connect() as connection:
+        extensions = set(connection.execute(text("SELECT name FROM pg_available_extensions")).scalars())
+    for name, definition, extension in INDEXES:
+        if extension and extension not in extensions:
+            continue
+        table_name = definition.split()[0]
+        assert name in {index['name'] for index in inspector.get_indexes(table_name)}
+
+
+def test_indexes_match_models():
+    """DDL для существующей базы совпадает с индексами моделей"""
+    model_indexes = {
+        index.name: f"{table.name} ({', '.join(column.name for column in index.columns)})"
+        for table in Base.metadata.tables.values()
+        for index in table.indexes
+    }
+    for name, definition, _ in INDEXES:
+        if name in model_indexes:
+            assert model_indexes[name] == definition
+
+
+def test_search_indexes_match_create_all_ddl():
+    """Триграммные индексы новой базы (after_create) и существующей совпадают"""
+    schema_indexes = {f"{name} ON {definition}" for name, definition, _ in INDEXES}
+    for line in BOOKING_SEARCH_INDEXES_DDL.splitlines():
+        line = line.strip()
+        if line.startswith('CREATE INDEX'):
+            assert line[len('CREATE INDEX IF NOT EXISTS '):].rstrip(';') in schema_indexes
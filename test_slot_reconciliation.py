@@ -0,0 +1,97 @@
+from sqlalchemy import event
+
+from app.models.booking import Booking
+from app.services.booking_events import BookingEvents
+from app.services.booking_service import BookingService
+from app.services.slot_reconciliation import SlotReconciliation
+
+
+def create_booking(db, schedule, participants_count):
+    booking, message = BookingService.create_booking(
+        db=db,
+        tour_schedule_id=schedule.id,
+        participants_count=participants_count,
+        customer_name="Иван Петров",
+        customer_phone="+7 (900) 123-45-67"
+    )
+    assert booking, message
+    return booking
+
+
+def test_restoring_cancelled_booking_takes_seats_again(db, make_schedule):
+    schedule = make_schedule(available_slots=10)
+    booking = create_booking(db, schedule, 3)
+
+    BookingService.update_status(db, booking.id, 'cancelled')
+    BookingService.update_status(db, booking.id, 'confirmed')
+
+    db.refresh(schedule)
+    db.refresh(booking)
+    assert schedule.booked_slots == 3
+    assert booking.cancelled_at is None
+
+
+def test_counter_and_reconciliation_share_active_statuses(db, make_schedule):
+    schedule = make_schedule(available_slots=10)
+    completed = create_booking(db, schedule, 3)
+    create_booking(db, schedule, 2)
+
+    # Завершённое бронирование мест не занимает ни в счётчике, ни при сверке
+    BookingService.update_status(db, completed.id, 'completed')
+    db.refresh(schedule)
+    assert schedule.booked_slots == 2
+    assert SlotReconciliation.reconcile(db, [schedule.id]) == []
+    assert BookingService.check_availability(db, schedule.id, 8)[0]
+
+
+def test_incremental_reconciliation_fixes_touched_slots(db, make_schedule):
+    schedule = make_schedule(available_slots=10)
+    untouched = make_schedule(available_slots=10)
+    create_booking(db, schedule, 2)
+    deleted = create_booking(db, schedule, 3)
+    SlotReconciliation.run_incremental(db, lag_seconds=0)
+
+    # Удаление в обход счётчика (как DELETE из CRM)
+    BookingEvents.record(db, deleted, 'deleted', old_status=deleted.status)
+    db.delete(deleted)
+    untouched.booked_slots = 5
+    db.commit()
+
+    diffs, processed = SlotReconciliation.run_incremental(db, lag_seconds=0)
+
+    assert processed == 1
+    assert diffs == [{'tour_schedule_id': schedule.id, 'booked_slots': 5, 'actual': 2}]
+    db.refresh(schedule)
+    assert schedule.booked_slots == 2
+
+    # Слот без событий чинит только полная сверка
+    db.refresh(untouched)
+    assert untouched.booked_slots == 5
+    diffs = SlotReconciliation.run_full(db)
+    assert {'tour_schedule_id': untouched.id, 'booked_slots': 5, 'actual': 0} in diffs
+    assert db.query(Booking).filter(Booking.tour_schedule_id == untouched.id).count() == 0
+    db.refresh(untouched)
+    assert untouched.booked_slots == 0
+
+
+def test_dry_run_full_reconciliation_holds_no_locks(db, make_schedule):
+    first = make_schedule(available_slots=10)
+    second = make_schedule(available_slots=10)
+    first.booked_slots = 4
+    second.booked_slots = 2
+    db.commit()
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.get_bind(), 'before_cursor_execute', listener)
+    try:
+        diffs = SlotReconciliation.run_full(db, fix=False, chunk_size=1)
+    finally:
+        event.remove(db.get_bind(), 'before_cursor_execute', listener)
+
+    assert {'tour_schedule_id': first.id, 'booked_slots': 4, 'actual': 0} in diffs
+    assert {'tour_schedule_id': second.id, 'booked_slots': 2, 'actual': 0} in diffs
+    assert not any('FOR UPDATE' in statement for statement in statements)
+    assert not any(statement.startswith('UPDATE') for statement in statements)
+    db.refresh(first)
+    assert first.booked_slots == 4
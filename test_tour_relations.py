@@ -0,0 +1,51 @@
+from app.models.activity import Activity
+from app.models.resource import Resource
+from app.models.tour import TourActivity, TourResource
+from app.schemas.tour import TourCreate
+from app.services.tour_relations import TourRelations
+
+
+def test_update_tour_keeps_unchanged_relation_rows(db, make_schedule):
+    tour = make_schedule().tour
+    business_id = tour.business_id
+    kayak = Resource(business_id=business_id, name="Каяк", resource_type="kayak", quantity=5)
+    boat = Resource(business_id=business_id, name="Лодка", resource_type="boat", quantity=2)
+    walk = Activity(business_id=business_id, name="Прогулка", base_price=100)
+    db.add_all([kayak, boat, walk])
+    db.flush()
+    db.add_all([
+        TourResource(tour_id=tour.id, resource_id=kayak.id, quantity_needed=2),
+        TourResource(tour_id=tour.id, resource_id=boat.id, quantity_needed=1),
+        TourActivity(tour_id=tour.id, activity_id=walk.id, order_index=0),
+    ])
+    db.flush()
+    kayak_row_id = db.query(TourResource.id).filter(TourResource.resource_id == kayak.id).scalar()
+    activity_row_id = db.query(TourActivity.id).filter(TourActivity.tour_id == tour.id).scalar()
+
+    def payload(**overrides):
+        data = dict(
+            name=tour.name, base_price=tour.base_price,
+            activities=[{'activity_id': walk.id}],
+            resources=[{'resource_id': kayak.id, 'quantity_needed': 2}, {'resource_id': boat.id}],
+        )
+        data.update(overrides)
+        return TourCreate(**data)
+
+    # Сохранение без изменений ничего не пишет
+    changes = TourRelations.update_tour(db, tour, payload())
+    assert not any(changes.values())
+
+    # Меняется только название — связи не трогаем
+    changes = TourRelations.update_tour(db, tour, payload(name="Новое имя"))
+    assert changes == {'fields': True, 'activities': False, 'resources': False, 'locations': False}
+
+    # Каяк: новое количество (та же строка), лодка убрана
+    changes = TourRelations.update_tour(db, tour, payload(resources=[{'resource_id': kayak.id, 'quantity_needed': 3}]))
+    assert changes['resources'] and not changes['activities']
+
+    rows = db.query(TourResource.id, TourResource.resource_id, TourResource.quantity_needed).filter(
+        TourResource.tour_id == tour.id
+    ).all()
+    assert rows == [(kayak_row_id, kayak.id, 3)]
+    assert db.query(TourActivity.id).filter(TourActivity.tour_id == tour.id).scalar() == activity_row_id
+    assert [tr.quantity_needed for tr in tour.tour_resources] == [3]
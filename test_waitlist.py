@@ -0,0 +1,65 @@
+from app.models.booking import BookingEvent
+from app.services.booking_service import BookingService
+from app.services.waitlist_service import WaitlistService
+
+
+def create_booking(db, schedule, participants_count):
+    booking, message = BookingService.create_booking(
+        db=db,
+        tour_schedule_id=schedule.id,
+        participants_count=participants_count,
+        customer_name="Иван Петров",
+        customer_phone="+7 (900) 123-45-67"
+    )
+    assert booking, message
+    return booking
+
+
+def join(db, schedule, participants_count, name):
+    entry, _ = WaitlistService.join(
+        db, schedule, participants_count,
+        customer_name=name,
+        customer_phone="+7 (900) 765-43-21"
+    )
+    return entry
+
+
+def test_cancellation_promotes_waitlist_in_fifo_order(db, make_schedule):
+    schedule = make_schedule(available_slots=4)
+    booking = create_booking(db, schedule, 4)
+
+    first = join(db, schedule, 3, "Первый")
+    second = join(db, schedule, 1, "Второй")
+    assert WaitlistService.position(db, second) == 2
+
+    # Мест нет — никого не продвигаем
+    assert WaitlistService.promote_pending(db) == 0
+
+    BookingService.update_status(db, booking.id, 'cancelled')
+    assert WaitlistService.promote_pending(db) == 2
+
+    db.refresh(first)
+    db.refresh(second)
+    db.refresh(schedule)
+    assert first.status == second.status == 'promoted'
+    assert first.booking_id < second.booking_id
+    assert schedule.booked_slots == 4
+
+    event = db.query(BookingEvent).filter(BookingEvent.booking_id == first.booking_id).one()
+    assert event.event_type == 'waitlist_promoted'
+
+
+def test_large_head_blocks_smaller_entries(db, make_schedule):
+    schedule = make_schedule(available_slots=4)
+    big = create_booking(db, schedule, 2)
+    create_booking(db, schedule, 2)
+
+    head = join(db, schedule, 3, "Большая группа")
+    tail = join(db, schedule, 1, "Один")
+
+    BookingService.update_status(db, big.id, 'cancelled')
+    assert WaitlistService.promote_pending(db) == 0
+
+    db.refresh(head)
+    db.refresh(tail)
+    assert head.status == tail.status == 'waiting'